@@ -0,0 +1,217 @@
+"""
+Module: detection_benchmark.py
+Author: Jacob Pitsenberger
+Last Updated: 10/17/26
+
+Description:
+    This module times the detection hot paths stage by stage. Every image of the 'test files/test images' set and a
+    test image resized to several synthetic resolutions is run through each detector backend, timing the color
+    conversion, the model call (detectMultiScale or faceMesh.process), the whole detect_faces call, rendering and
+    JPEG encoding separately. Results are written as JSON and can be compared against a stored baseline; the run exits
+    with status 1 when a stage got slower than the baseline by more than the tolerance so regressions are caught
+    before deploying.
+
+Usage:
+    python benchmarks/detection_benchmark.py --save-baseline benchmarks/detection_baseline.json
+    python benchmarks/detection_benchmark.py --baseline benchmarks/detection_baseline.json [--json results.json]
+
+Note:
+    - Baselines are only comparable on the same machine; record one on the machine the comparison runs on.
+    - Run from any directory; the benchmark switches to the project root so the cascade file is found.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import cv2
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from face_detection_package.detector_registry import available_backends, create_detector  # noqa: E402
+from face_detection_package.headless_settings import HeadlessSettings  # noqa: E402
+from face_detection_package.rendering import render_detections  # noqa: E402
+
+TEST_IMAGES_DIR = os.path.join(ROOT_DIR, 'test files', 'test images')
+SYNTHETIC_RESOLUTIONS = ['640x480', '1280x720', '1920x1080', '3840x2160']
+JPEG_QUALITY = 95
+
+
+def load_inputs(resolutions: list) -> dict:
+    """
+    Load the test images and build the synthetic frames.
+
+    Args:
+        resolutions (list): The synthetic frame sizes as WIDTHxHEIGHT.
+
+    Returns:
+        dict: The frames (BGR format) keyed by input name.
+    """
+    inputs = {}
+    for path in sorted(glob.glob(os.path.join(TEST_IMAGES_DIR, '*.jpg'))):
+        image = cv2.imread(path)
+        if image is not None:
+            inputs[os.path.basename(path)] = image
+    if not inputs:
+        raise FileNotFoundError(f"No test images found in {TEST_IMAGES_DIR}.")
+    source = next(iter(inputs.values()))
+    for resolution in resolutions:
+        width, height = (int(v) for v in resolution.lower().split('x'))
+        inputs[f'synthetic_{width}x{height}'] = cv2.resize(source, (width, height), interpolation=cv2.INTER_LINEAR)
+    return inputs
+
+
+def stage_functions(backend: str, detector) -> tuple:
+    """
+    Get the color conversion and model call of a backend as separate functions.
+
+    Args:
+        backend (str): The name of the detector backend.
+        detector: The detector.
+
+    Returns:
+        tuple: The conversion function (frame -> model input) and the model function (model input -> result).
+    """
+    if backend == 'mesh':
+        return (lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)), detector.faceMesh.process
+    if hasattr(detector, 'face_cascade'):
+        return (lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)), detector._detect
+    return None, None
+
+
+def _median_ms(function, argument, repeat: int) -> float:
+    function(argument)  # warm up
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def benchmark_backend(backend: str, inputs: dict, repeat: int) -> dict:
+    """
+    Time every stage of a backend over every input.
+
+    Args:
+        backend (str): The name of the detector backend.
+        inputs (dict): The frames keyed by input name.
+        repeat (int): The runs per measurement (the median is reported).
+
+    Returns:
+        dict: Median milliseconds keyed by 'backend/input/stage', plus the faces found keyed by 'backend/input/faces'.
+    """
+    settings = HeadlessSettings(draw_box=True, draw_blur=True)
+    detector = create_detector(backend, settings, static_mode=True)
+    convert, model = stage_functions(backend, detector)
+    results = {}
+    for name, frame in inputs.items():
+        prefix = f'{backend}/{name}'
+        if convert is not None:
+            converted = convert(frame)
+            results[f'{prefix}/convert'] = _median_ms(convert, frame, repeat)
+            results[f'{prefix}/model'] = _median_ms(model, converted, repeat)
+        results[f'{prefix}/detect_faces'] = _median_ms(detector.detect_faces, frame, repeat)
+        detections = detector.detect_faces(frame)
+        results[f'{prefix}/render'] = _median_ms(lambda f: render_detections(f.copy(), detections, settings),
+                                                 frame, repeat)
+        rendered = frame.copy()
+        render_detections(rendered, detections, settings)
+        results[f'{prefix}/encode'] = _median_ms(
+            lambda f: cv2.imencode('.jpg', f, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]), rendered, repeat)
+        results[f'{prefix}/faces'] = len(detections)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_ms: float) -> list:
+    """
+    Compare timings against a baseline.
+
+    Args:
+        results (dict): The current timings.
+        baseline (dict): The baseline timings.
+        tolerance (float): The allowed slowdown as a fraction of the baseline time.
+        min_ms (float): Differences smaller than this many milliseconds are ignored as noise.
+
+    Returns:
+        list: A (key, baseline ms, current ms) tuple for every regression.
+    """
+    regressions = []
+    for key, current in results.items():
+        if key.endswith('/faces') or key not in baseline:
+            continue
+        previous = baseline[key]
+        if current > previous * (1 + tolerance) and current - previous > min_ms:
+            regressions.append((key, previous, current))
+    return regressions
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Time the detection stages and compare them against a baseline.')
+    parser.add_argument('--backends', nargs='+', default=None, help='Backends to measure (default: all).')
+    parser.add_argument('--resolutions', nargs='+', default=SYNTHETIC_RESOLUTIONS,
+                        help='Synthetic frame sizes as WIDTHxHEIGHT.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (median).')
+    parser.add_argument('--opencv-threads', type=int, default=None,
+                        help='Limit the threads OpenCV uses for steadier measurements.')
+    parser.add_argument('--json', default=None, help='Write the results to this JSON file.')
+    parser.add_argument('--baseline', default=None, help='Compare the results against this baseline JSON file.')
+    parser.add_argument('--save-baseline', default=None, help='Write the results to this file as the new baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed slowdown against the baseline as a fraction (default: 0.2).')
+    parser.add_argument('--min-ms', type=float, default=0.1,
+                        help='Ignore slowdowns smaller than this many milliseconds (default: 0.1).')
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT_DIR)
+    if args.opencv_threads is not None:
+        cv2.setNumThreads(args.opencv_threads)
+
+    inputs = load_inputs(args.resolutions)
+    results = {}
+    for backend in args.backends or available_backends():
+        try:
+            results.update(benchmark_backend(backend, inputs, args.repeat))
+        except Exception as e:
+            print(f"Skipping the {backend} backend: {e}")
+
+    print(f"{'backend/input':<36} {'convert':>8} {'model':>8} {'detect':>8} {'render':>8} {'encode':>8} {'faces':>5}")
+    for prefix in dict.fromkeys(key.rsplit('/', 1)[0] for key in results):
+        row = [results.get(f'{prefix}/{stage}') for stage in ('convert', 'model', 'detect_faces', 'render', 'encode')]
+        cells = ' '.join(f"{'-':>8}" if value is None else f"{value:>8.2f}" for value in row)
+        print(f"{prefix:<36} {cells} {results[f'{prefix}/faces']:>5}")
+    print("(median milliseconds)")
+
+    report = {
+        'machine': {'platform': platform.platform(), 'processor': platform.processor(), 'cpu_count': os.cpu_count(),
+                    'python': platform.python_version(), 'opencv': cv2.__version__},
+        'repeat': args.repeat,
+        'results': results,
+    }
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('machine') != report['machine']:
+            print("Warning: the baseline was recorded on a different machine or software version.")
+        regressions = compare(results, baseline['results'], args.tolerance, args.min_ms)
+        for key, previous, current in regressions:
+            print(f"REGRESSION {key}: {previous:.2f} ms -> {current:.2f} ms ({current / previous - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Module: memory_benchmark.py
+Author: Jacob Pitsenberger
+Last Updated: 10/17/26
+
+Description:
+    This module measures the memory the video loop allocates per frame. A synthetic 4K video (a test image scaled to
+    3840x2160, shifted a little every frame) is run through the read, detect, render and write loop twice, each time in
+    a fresh interpreter so the peak resident set size belongs to that run alone:
+    - allocating: the loop before buffer reuse. Every read decodes into a new frame and the detector's conversion
+      buffers are dropped before every frame, so cvtColor and resize allocate their outputs again.
+    - reused: frames are decoded into a FramePool and the detectors convert into the buffers of the previous frame.
+
+    For each run it reports the steady-state allocation per frame, the frames the capture allocated, the peak resident
+    set size of the process and the time per frame. The allocation of a frame is the sum over its stages of the peak
+    memory traced by tracemalloc during the stage above the level the stage started at (NumPy and OpenCV output arrays
+    are traced), as a median over the frames after the warm-up. Frames are encoded on the loop's thread here, unlike in
+    detect_over_video_file, so that a writer thread freeing earlier frames in the middle of a stage cannot hide what
+    the stage allocates.
+
+Usage:
+    python benchmarks/memory_benchmark.py [--resolution 3840x2160] [--frames 60] [--backend haar]
+                                          [--detection-width 960] [--json results.json]
+
+Note:
+    - Run from any directory; the benchmark switches to the project root so the cascade file is found.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_IMAGE = os.path.join(ROOT_DIR, 'test files', 'test images', 'img1.jpg')
+MODES = ('allocating', 'reused')
+
+
+def make_video(path: str, width: int, height: int, frames: int) -> None:
+    """
+    Write a synthetic video of a test image scaled to the given size, shifted by a few pixels every frame.
+
+    Args:
+        path (str): The video path (MJPG in an .avi container).
+        width (int): The frame width.
+        height (int): The frame height.
+        frames (int): The number of frames.
+
+    Returns:
+        None
+    """
+    import cv2
+    import numpy as np
+    image = cv2.resize(cv2.imread(TEST_IMAGE), (width, height), interpolation=cv2.INTER_LINEAR)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (width, height))
+    for i in range(frames):
+        out.write(np.roll(image, 4 * i, axis=1))
+    out.release()
+
+
+def _release_buffers(face_detector) -> None:
+    while face_detector is not None:
+        if hasattr(face_detector, 'release_buffers'):
+            face_detector.release_buffers()
+        face_detector = getattr(face_detector, 'face_detector', None)
+
+
+def _measure(mode: str, video_path: str, output_path: str, backend: str, detection_width: int, warmup: int) -> dict:
+    import cv2
+    from face_detection_package.detector_registry import create_detector
+    from face_detection_package.frame_buffers import MAX_BUFFERS, FramePool
+    from face_detection_package.headless_settings import HeadlessSettings
+    from face_detection_package.rendering import render_detections
+    from face_detection_package.tiled_detection import peak_rss_bytes
+
+    def stage(function, *stage_args):
+        tracemalloc.reset_peak()
+        level = tracemalloc.get_traced_memory()[0]
+        result = function(*stage_args)
+        return result, tracemalloc.get_traced_memory()[1] - level
+
+    settings = HeadlessSettings(draw_box=True, draw_blur=True)
+    detector = create_detector(backend, settings, detection_width=detection_width)
+    allocating = mode == 'allocating'
+    frame_pool = FramePool(0 if allocating else MAX_BUFFERS)
+    cap = cv2.VideoCapture(video_path)
+    out = None
+
+    tracemalloc.start()
+    per_frame, times = [], []
+    ret, frame = frame_pool.read(cap)
+    while ret:
+        if out is None:
+            out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'MJPG'), 30,
+                                  (frame.shape[1], frame.shape[0]))
+        if allocating:
+            _release_buffers(detector)
+        start = time.perf_counter()
+        detections, detected = stage(detector.detect_faces, frame)
+        _, rendered = stage(render_detections, frame, detections, settings)
+        _, written = stage(out.write, frame)
+        (ret, frame), read = stage(frame_pool.read, cap)
+        times.append(time.perf_counter() - start)
+        per_frame.append(detected + rendered + written + read)
+    if out is not None:
+        out.release()
+    cap.release()
+    tracemalloc.stop()
+    steady = per_frame[warmup:] or per_frame
+    return {'frames': len(per_frame), 'allocated_per_frame_bytes': statistics.median(steady),
+            'max_allocated_per_frame_bytes': max(steady), 'frames_allocated': frame_pool.allocated,
+            'peak_rss_bytes': peak_rss_bytes(), 'ms_per_frame': statistics.median(times[warmup:] or times) * 1000}
+
+
+def _run_child(mode: str, video_path: str, output_path: str, args: argparse.Namespace) -> dict:
+    """
+    Run one mode in a fresh interpreter.
+
+    Args:
+        mode (str): One of MODES.
+        video_path (str): The synthetic video.
+        output_path (str): The path the processed video is written to.
+        args (argparse.Namespace): The benchmark options.
+
+    Returns:
+        dict: The measurement (or an 'error').
+    """
+    command = [sys.executable, os.path.abspath(__file__), '--child', mode, '--video', video_path,
+               '--output', output_path, '--backend', args.backend, '--warmup', str(args.warmup)]
+    if args.detection_width:
+        command += ['--detection-width', str(args.detection_width)]
+    completed = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _mib(value) -> str:
+    return 'n/a' if value is None else f"{value / 2 ** 20:.1f}"
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Measure the memory allocated per frame by the video loop.')
+    parser.add_argument('--resolution', default='3840x2160', help='Resolution of the synthetic video.')
+    parser.add_argument('--frames', type=int, default=60, help='Frames of the synthetic video.')
+    parser.add_argument('--warmup', type=int, default=10, help='Frames left out of the steady-state figures.')
+    parser.add_argument('--backend', default='haar', help='Detector backend (default: %(default)s).')
+    parser.add_argument('--detection-width', type=int, default=960,
+                        help='Detection resolution of the detector (0 for full resolution, default: %(default)s).')
+    parser.add_argument('--json', default=None, help='Write the results to this JSON file.')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--video', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--output', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, ROOT_DIR)
+    os.chdir(ROOT_DIR)
+
+    if args.child:
+        result = _measure(args.child, args.video, args.output, args.backend, args.detection_width or None,
+                          args.warmup)
+        print(json.dumps(result))
+        return
+
+    width, height = (int(v) for v in args.resolution.lower().split('x'))
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, 'input.avi')
+        make_video(video_path, width, height, args.frames)
+        results = {mode: _run_child(mode, video_path, os.path.join(directory, f'{mode}.avi'), args) for mode in MODES}
+
+    print(f"{args.resolution}, {args.frames} frames, {args.backend} detector "
+          f"(detection width {args.detection_width or 'full'})")
+    print(f"{'mode':<12} {'MiB/frame':>10} {'max MiB':>8} {'frames allocated':>17} {'peak RSS MiB':>13} "
+          f"{'ms/frame':>9}")
+    for mode, result in results.items():
+        if 'error' in result:
+            print(f"{mode:<12} error: {result['error']}")
+            continue
+        print(f"{mode:<12} {_mib(result['allocated_per_frame_bytes']):>10} "
+              f"{_mib(result['max_allocated_per_frame_bytes']):>8} {result['frames_allocated']:>17} "
+              f"{_mib(result['peak_rss_bytes']):>13} {result['ms_per_frame']:>9.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'resolution': args.resolution, 'frames': args.frames, 'backend': args.backend,
+                       'detection_width': args.detection_width, 'results': results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
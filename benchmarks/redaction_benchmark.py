@@ -0,0 +1,109 @@
+"""
+Module: redaction_benchmark.py
+Author: Jacob Pitsenberger
+Last Updated: 10/17/26
+
+Description:
+    This module measures the cost of redacting faces. Synthetic frames are filled with a given number of face boxes
+    (a third of them overlapping a neighbour, as in crowded frames) and redacted with the original per-box path, which
+    blurs every box separately with a fixed 50x50 kernel, and with every mode of the redaction engine. It reports the
+    time per frame and per face and the speedup of each mode over the original path.
+
+Usage:
+    python benchmarks/redaction_benchmark.py [--resolutions 1280x720 1920x1080] [--faces 1 5 20] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from face_detection_package.headless_settings import HeadlessSettings  # noqa: E402
+from face_detection_package.rendering import REDACTION_MODES, draw_rectangle, redact  # noqa: E402
+
+
+def make_boxes(width: int, height: int, faces: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Place face boxes on a frame, making every third box overlap the previous one.
+
+    Args:
+        width (int): The frame width.
+        height (int): The frame height.
+        faces (int): The number of boxes.
+        rng (np.random.Generator): The random generator.
+
+    Returns:
+        np.ndarray: An (N, 4) array of x, y, w, h boxes.
+    """
+    size = max(24, min(width, height) // 6)
+    boxes = []
+    for i in range(faces):
+        if i % 3 == 2:
+            x, y = boxes[-1][0] + size // 3, boxes[-1][1] + size // 3
+        else:
+            x, y = rng.integers(0, width - size), rng.integers(0, height - size)
+        boxes.append([min(x, width - size), min(y, height - size), size, size])
+    return np.array(boxes, dtype=np.int32)
+
+
+def _time(function, frame: np.ndarray, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        work = frame.copy()
+        start = time.perf_counter()
+        function(work)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run(resolutions: list, face_counts: list, repeat: int) -> list:
+    rng = np.random.default_rng(0)
+    legacy_settings = HeadlessSettings(draw_box=False, draw_blur=True)
+    results = []
+    for width, height in resolutions:
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        for faces in face_counts:
+            boxes = make_boxes(width, height, faces, rng)
+            timings = {'per_box_blur': _time(lambda f: [draw_rectangle(f, box, legacy_settings) for box in boxes],
+                                             frame, repeat)}
+            for mode in REDACTION_MODES:
+                timings[mode] = _time(lambda f: redact(f, boxes, mode), frame, repeat)
+            for path, seconds in timings.items():
+                results.append({'resolution': f'{width}x{height}', 'faces': faces, 'path': path,
+                                'ms_per_frame': seconds * 1000, 'ms_per_face': seconds * 1000 / faces,
+                                'speedup': timings['per_box_blur'] / seconds if seconds else float('inf')})
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Compare the cost per face of the redaction modes.')
+    parser.add_argument('--resolutions', nargs='+', default=['1280x720', '1920x1080'],
+                        help='Frame sizes as WIDTHxHEIGHT.')
+    parser.add_argument('--faces', nargs='+', type=int, default=[1, 5, 20], help='Faces per frame.')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement (median).')
+    parser.add_argument('--json', default=None, help='Write the results to this JSON file.')
+    args = parser.parse_args(argv)
+
+    resolutions = [tuple(int(v) for v in resolution.lower().split('x')) for resolution in args.resolutions]
+    results = run(resolutions, args.faces, args.repeat)
+
+    print(f"{'resolution':<11} {'faces':>5} {'path':<13} {'ms/frame':>9} {'ms/face':>8} {'speedup':>8}")
+    for r in results:
+        print(f"{r['resolution']:<11} {r['faces']:>5} {r['path']:<13} {r['ms_per_frame']:>9.3f} "
+              f"{r['ms_per_face']:>8.3f} {r['speedup']:>7.1f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Module: startup_benchmark.py
+Author: Jacob Pitsenberger
+Last Updated: 10/17/26
+
+Description:
+    This module measures the cold-start cost of the Face Detection Software. Every measurement runs in a fresh
+    Python interpreter so module caches from earlier measurements do not hide import costs. For the GUI it reports
+    the time to import the application modules (the window appears once these are imported). For every detector
+    backend it reports the time to import the backend, to build the detector and to finish the first detection on a
+    test image (time-to-first-detection), and compares them with the cold-start budget.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--backends haar mesh] [--repeat 3] [--json results.json]
+
+Note:
+    - Run from any directory; the benchmark switches to the project root so the cascade file is found.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_IMAGE = os.path.join(ROOT_DIR, 'test files', 'test images', 'img1.jpg')
+
+# Cold-start budget in seconds for each measurement.
+BUDGETS = {
+    'gui_import': 1.0,
+    'backend_import': 1.5,
+    'time_to_first_detection': 3.0,
+}
+
+
+def _measure_gui() -> dict:
+    start = time.perf_counter()
+    import face_detection_package.gui  # noqa: F401
+    return {'gui_import': time.perf_counter() - start, 'cv2_imported': 'cv2' in sys.modules}
+
+
+def _measure_backend(backend: str) -> dict:
+    start = time.perf_counter()
+    from face_detection_package.detector_registry import create_detector, load_backend
+    from face_detection_package.headless_settings import HeadlessSettings
+    load_backend(backend)
+    imported = time.perf_counter()
+    detector = create_detector(backend, HeadlessSettings(), static_mode=True)
+    built = time.perf_counter()
+    import cv2
+    image = cv2.imread(TEST_IMAGE)
+    detections = detector.detect_faces(image)
+    detected = time.perf_counter()
+    return {
+        'backend_import': imported - start,
+        'detector_build': built - imported,
+        'first_detection': detected - built,
+        'time_to_first_detection': detected - start,
+        'faces': len(detections),
+    }
+
+
+def _run_child(target: str) -> dict:
+    """
+    Run one measurement in a fresh interpreter.
+
+    Args:
+        target (str): 'gui' or the name of a detector backend.
+
+    Returns:
+        dict: The measurement, including the wall time of the whole interpreter run.
+    """
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', target],
+                               cwd=ROOT_DIR, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['process_wall'] = wall
+    return result
+
+
+def _summarize(runs: list) -> dict:
+    if any('error' in run for run in runs):
+        return {'error': next(run['error'] for run in runs if 'error' in run)}
+    summary = {}
+    for key, value in runs[0].items():
+        if isinstance(value, float):
+            summary[key] = statistics.median(run[key] for run in runs)
+        else:
+            summary[key] = value
+    return summary
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Measure import time and time-to-first-detection.')
+    parser.add_argument('--backends', nargs='+', default=None, help='Backends to measure (default: all).')
+    parser.add_argument('--repeat', type=int, default=3, help='Fresh interpreter runs per measurement (median).')
+    parser.add_argument('--no-gui', action='store_true', help='Skip the GUI import measurement.')
+    parser.add_argument('--json', default=None, help='Write the results to this JSON file.')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, ROOT_DIR)
+    os.chdir(ROOT_DIR)
+
+    if args.child:
+        result = _measure_gui() if args.child == 'gui' else _measure_backend(args.child)
+        print(json.dumps(result))
+        return
+
+    from face_detection_package.detector_registry import available_backends
+    targets = ([] if args.no_gui else ['gui']) + (args.backends or available_backends())
+    results = {target: _summarize([_run_child(target) for _ in range(args.repeat)]) for target in targets}
+
+    print(f"{'target':<8} {'measurement':<24} {'seconds':>8} {'budget':>8}")
+    for target, result in results.items():
+        if 'error' in result:
+            print(f"{target:<8} {'error':<24} {result['error']}")
+            continue
+        for key, value in result.items():
+            if not isinstance(value, float):
+                continue
+            budget = BUDGETS.get(key)
+            status = '' if budget is None else f"{budget:>8.2f}{'  OVER' if value > budget else ''}"
+            print(f"{target:<8} {key:<24} {value:>8.3f} {status}")
+        if result.get('cv2_imported'):
+            print(f"{target:<8} note: OpenCV is imported before the window appears")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'budgets': BUDGETS, 'results': results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
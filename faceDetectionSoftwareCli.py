@@ -0,0 +1,351 @@
+"""
+Module: faceDetectionSoftwareCli.py
+Author: Jacob Pitsenberger
+Last Updated: 10/17/26
+
+Description:
+    This module serves as the headless entry point for the Face Detection Software application. It runs detections
+    without opening the GUI so that large numbers of files can be processed unattended.
+
+Usage:
+    python faceDetectionSoftwareCli.py batch <directories, globs or files> [options]
+    python faceDetectionSoftwareCli.py segments <video file> [options]
+    python faceDetectionSoftwareCli.py cameras <device indices, stream URLs or video files> [options]
+    python faceDetectionSoftwareCli.py autotune <annotation file> [options]
+    python faceDetectionSoftwareCli.py evaluate <annotation file> [options]
+    python faceDetectionSoftwareCli.py annotate <directories, globs or images> --output <annotation file> [options]
+
+Note:
+    - Outputs are saved to the 'video_detections' and 'image_detections' directories like the 'pp' version, and
+      camera recordings to the 'recorded_detections' directory like the 'rf' version.
+    - Detector profiles written by 'autotune' are selected with '--profile <name>' ('--profile default' for the
+      default profile of the profiles file).
+    - 'evaluate' exits with status 1 when a configuration misses the '--min-recall' gate, so it can guard a change to
+      the detector settings in a script.
+    - 'batch' exits with status 1 when any file failed, and every command exits with status 1 when it stops on an
+      error, so scheduled jobs can detect failed runs.
+    - Run 'python faceDetectionSoftwareCli.py <command> -h' to list the available options of a command.
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import sys
+
+import cv2
+
+from face_detection_package.autotune import (DEFAULT_MIN_PRECISION, DEFAULT_TARGET_RECALL, PARAMETER_GRIDS, autotune,
+                                             parse_grid_values)
+from face_detection_package.batch_processing import collect_media_files, run_batch
+from face_detection_package.detector_pool import DetectorPool
+from face_detection_package.detector_registry import DEFAULT_BACKEND, available_backends, create_detector
+from face_detection_package.detector_profiles import PROFILES_FILE, get_profile, load_profiles
+from face_detection_package.directory_manager import DirectoryManager
+from face_detection_package.evaluation import IOU_THRESHOLD, evaluate_configurations, write_draft_annotations
+from face_detection_package.headless_settings import HeadlessSettings
+from face_detection_package.media_processing import IMAGE_EXTENSIONS, make_output_path
+from face_detection_package.metrics import EXPORT_FORMATS
+from face_detection_package.multi_source import MultiSourceProcessor
+from face_detection_package.output_writers import DEFAULT_FOURCC, DEFAULT_WRITER, WRITER_BACKENDS
+from face_detection_package.rendering import DEFAULT_REDACTION_MODE, REDACTION_MODES
+from face_detection_package.segment_processing import process_video_segments
+from face_detection_package.sidecar import SIDECAR_FORMATS
+from face_detection_package.tiled_detection import TILE_OVERLAP
+
+# Defaults of the ROI search options, applied when neither the command line nor the profile sets them.
+ROI_DEFAULTS = {'roi_search': False, 'full_scan_interval': 10, 'roi_padding': 0.5}
+
+
+def add_detector_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--backend', choices=available_backends(), default=None,
+                        help=f'Detector backend to use (default: the profile\'s backend or {DEFAULT_BACKEND}).')
+    parser.add_argument('--profile', default=None,
+                        help="Load the backend and detector parameters of this autotuned profile ('default' for the "
+                             "default profile of the profiles file).")
+    parser.add_argument('--profiles-file', default=PROFILES_FILE,
+                        help='The detector profiles file (default: %(default)s).')
+    parser.add_argument('--detection-width', type=int, default=None,
+                        help='Downscale frames wider than this before detection (default: full resolution).')
+    parser.add_argument('--detection-scale', type=float, default=None,
+                        help='Downscale frames by this factor before detection when no width is given.')
+    parser.add_argument('--roi-search', action='store_true', default=None,
+                        help='Between full-frame scans, only search for faces around the previous faces.')
+    parser.add_argument('--full-scan-interval', type=int, default=None,
+                        help=f"With --roi-search, scan the full frame every N frames "
+                             f"(default: the profile's or {ROI_DEFAULTS['full_scan_interval']}).")
+    parser.add_argument('--roi-padding', type=float, default=None,
+                        help=f"With --roi-search, pad the search windows by this fraction of the face size "
+                             f"(default: the profile's or {ROI_DEFAULTS['roi_padding']}).")
+    parser.add_argument('--motion-gating', choices=('mog2', 'knn'), default=None,
+                        help='Between full-frame scans, only search moving regions found by this background '
+                             'subtractor and around previous faces (Haar backend).')
+    parser.add_argument('--detect-interval', type=int, default=1,
+                        help='Run the full detector every N video frames and track faces in between (default: 1).')
+
+
+def apply_profile(args: argparse.Namespace) -> None:
+    # The profile gives the backend unless one is chosen explicitly.
+    args.profile_options = {}
+    if args.profile:
+        backend, args.profile_options = get_profile(args.profiles_file,
+                                                    None if args.profile == 'default' else args.profile)
+        args.backend = args.backend or backend
+    args.backend = args.backend or DEFAULT_BACKEND
+
+
+def detector_options(args: argparse.Namespace) -> dict:
+    options = dict(getattr(args, 'profile_options', {}))
+    # Options given on the command line take precedence over the profile's.
+    options.update((key, value) for key, value in {
+        'detection_width': args.detection_width, 'detection_scale': args.detection_scale,
+        'roi_search': args.roi_search, 'full_scan_interval': args.full_scan_interval,
+        'roi_padding': args.roi_padding, 'motion_gating': args.motion_gating}.items() if value is not None)
+    # Options neither the command line nor the profile sets keep their defaults.
+    for key, value in ROI_DEFAULTS.items():
+        options.setdefault(key, value)
+    return options
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Face Detection Software - headless processing.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    batch = subparsers.add_parser('batch', help='Process directories, globs or files of images and videos.')
+    batch.add_argument('inputs', nargs='+', help='Directories, glob patterns or media files to process.')
+    batch.add_argument('--workers', type=int, default=None,
+                       help='Number of worker processes (default: number of cores).')
+    batch.add_argument('--opencv-threads', type=int, default=None,
+                       help='OpenCV threads per worker (default: cores divided by workers).')
+    batch.add_argument('--recursive', action='store_true', help='Descend into subdirectories of input directories.')
+    batch.add_argument('--no-box', action='store_true', help='Do not draw detection bounding boxes.')
+    batch.add_argument('--blur', action='store_true', help='Blur detections.')
+    batch.add_argument('--redaction', choices=REDACTION_MODES, default=DEFAULT_REDACTION_MODE,
+                       help='How blurred detections are redacted (default: %(default)s).')
+    batch.add_argument('--writer', choices=list(WRITER_BACKENDS), default=DEFAULT_WRITER,
+                       help='How processed videos are saved: cv2.VideoWriter, a pipe to ffmpeg or a JPEG sequence '
+                            '(default: %(default)s).')
+    batch.add_argument('--fourcc', default=DEFAULT_FOURCC,
+                       help='Codec of the video writer, e.g. mp4v, MJPG or avc1 (default: %(default)s).')
+    batch.add_argument('--sidecar', choices=SIDECAR_FORMATS, default=None,
+                       help='Detect only: save the detections of every file to a sidecar of this format instead of '
+                            'drawing them and re-encoding the media.')
+    batch.add_argument('--cache', action='store_true',
+                       help='Reuse the detections of files processed before with the same detector parameters from '
+                            "the 'detection_cache' directory, so only rendering runs.")
+    batch.add_argument('--cache-size', type=int, default=512,
+                       help='Size limit of the detection cache in MiB; least recently used entries are evicted '
+                            '(default: %(default)s).')
+    batch.add_argument('--skip-threshold', type=float, default=0.0,
+                       help='Reuse the previous detections for video frames whose change from the last detected '
+                            'frame (largest mean absolute difference of a thumbnail grid cell, 0-255) stays below '
+                            'this; around 4 suits fixed cameras (default: 0, off).')
+    batch.add_argument('--tile-size', type=int, default=None,
+                       help='Search images larger than this in overlapping tiles of this size in pixels, e.g. 1024 '
+                            'for 50-100 MP stills (default: whole images).')
+    batch.add_argument('--tile-overlap', type=int, default=TILE_OVERLAP,
+                       help='Overlap of neighbouring tiles in pixels (default: %(default)s).')
+    batch.add_argument('--tile-workers', type=int, default=None,
+                       help='Tile threads per worker process (default: cores divided by workers).')
+    add_detector_arguments(batch)
+
+    segments = subparsers.add_parser('segments', help='Process one long video as parallel frame-range segments.')
+    segments.add_argument('video', help='The video file to process.')
+    segments.add_argument('--workers', type=int, default=None,
+                          help='Number of segments and worker processes (default: number of cores).')
+    segments.add_argument('--opencv-threads', type=int, default=1, help='OpenCV threads per worker (default: 1).')
+    segments.add_argument('--compare-serial', action='store_true',
+                          help='Also time a serial run, report the speedup and check the boundary frames.')
+    segments.add_argument('--no-box', action='store_true', help='Do not draw detection bounding boxes.')
+    segments.add_argument('--blur', action='store_true', help='Blur detections.')
+    segments.add_argument('--redaction', choices=REDACTION_MODES, default=DEFAULT_REDACTION_MODE,
+                          help='How blurred detections are redacted (default: %(default)s).')
+    add_detector_arguments(segments)
+
+    cameras = subparsers.add_parser('cameras', help='Process several cameras, streams or videos at once over a '
+                                                    'shared pool of worker threads.')
+    cameras.add_argument('sources', nargs='+',
+                         help='Camera device indices (e.g. 0), stream URLs (e.g. rtsp://...) or video files.')
+    cameras.add_argument('--workers', type=int, default=None,
+                         help='Number of detection worker threads shared by the sources (default: number of cores, '
+                              'at most one per source).')
+    cameras.add_argument('--duration', type=float, default=None,
+                         help='Stop after this many seconds (default: run until the sources end or Ctrl+C).')
+    cameras.add_argument('--display', action='store_true',
+                         help="Show every processed feed in its own window (press 'q' to stop).")
+    cameras.add_argument('--no-record', action='store_true', help='Do not record the processed feeds.')
+    cameras.add_argument('--no-box', action='store_true', help='Do not draw detection bounding boxes.')
+    cameras.add_argument('--blur', action='store_true', help='Blur detections.')
+    cameras.add_argument('--redaction', choices=REDACTION_MODES, default=DEFAULT_REDACTION_MODE,
+                         help='How blurred detections are redacted (default: %(default)s).')
+    cameras.add_argument('--writer', choices=list(WRITER_BACKENDS), default=DEFAULT_WRITER,
+                         help='How the recordings are saved (default: %(default)s).')
+    cameras.add_argument('--fourcc', default=DEFAULT_FOURCC,
+                         help='Codec of the video writer (default: %(default)s).')
+    cameras.add_argument('--metrics', choices=EXPORT_FORMATS, default=None,
+                         help="Export the metrics of every source to the 'metrics' directory in this format.")
+    cameras.add_argument('--show-fps', action='store_true', help='Draw the frame rate of each source onto it.')
+    cameras.add_argument('--skip-threshold', type=float, default=0.0,
+                         help='Reuse the previous detections for frames that changed less than this from the last '
+                              'detected frame (default: 0, off).')
+    add_detector_arguments(cameras)
+
+    tune = subparsers.add_parser('autotune', help='Sweep detector parameters over an annotated sample set and write '
+                                                  'the profiles that are Pareto-optimal for speed and recall.')
+    tune.add_argument('annotations', help='JSON or CSV annotation file of the sample images (see the README).')
+    tune.add_argument('--backends', nargs='+', choices=available_backends(), default=[DEFAULT_BACKEND],
+                      help='Backends to tune (default: %(default)s).')
+    tune.add_argument('--grid', action='append', default=[], metavar='[BACKEND:]OPTION=VALUES',
+                      help="Replace the values swept for an option, e.g. 'scaleFactor=1.1,1.15,1.2', "
+                           "'minSize=none,30x30,60x60' or 'mesh:minDetectionCon=0.3,0.5'.")
+    tune.add_argument('--output', default=PROFILES_FILE, help='The profiles file to write (default: %(default)s).')
+    tune.add_argument('--repeat', type=int, default=3, help='Timed runs per image and combination (median).')
+    tune.add_argument('--target-recall', type=float, default=DEFAULT_TARGET_RECALL,
+                      help='The default profile is the fastest one reaching this recall (default: %(default)s).')
+    tune.add_argument('--min-precision', type=float, default=DEFAULT_MIN_PRECISION,
+                      help='Leave out combinations below this precision (default: %(default)s).')
+    tune.add_argument('--iou', type=float, default=IOU_THRESHOLD,
+                      help='Intersection over union a detection needs to match a face (default: %(default)s).')
+    tune.add_argument('--opencv-threads', type=int, default=None,
+                      help='Limit the threads OpenCV uses, e.g. to the threads a deployment gives each detector.')
+
+    evaluate = subparsers.add_parser('evaluate', help='Report the precision, recall, IoU and throughput of detector '
+                                                      'configurations on an annotated image set side by side.')
+    evaluate.add_argument('annotations', help='JSON or CSV annotation file of the images (see the README).')
+    evaluate.add_argument('--config', action='append', default=[], metavar='[NAME=]BACKEND[:OPTION=VALUE,...]',
+                          help="A detector configuration to evaluate, e.g. 'haar', 'fast=haar:detection_width=640' "
+                               "or 'haar:minNeighbors=3,minSize=40x40'. Can be repeated.")
+    evaluate.add_argument('--profile', action='append', default=[],
+                          help="An autotuned profile to evaluate ('default' for the default profile). Can be "
+                               "repeated.")
+    evaluate.add_argument('--all-profiles', action='store_true', help='Evaluate every profile of the profiles file.')
+    evaluate.add_argument('--profiles-file', default=PROFILES_FILE,
+                          help='The detector profiles file (default: %(default)s).')
+    evaluate.add_argument('--repeat', type=int, default=1, help='Timed runs per image (median, default: 1).')
+    evaluate.add_argument('--iou', type=float, default=IOU_THRESHOLD,
+                          help='Intersection over union a detection needs to match a face (default: %(default)s).')
+    evaluate.add_argument('--min-recall', type=float, default=None,
+                          help='Fail (exit status 1) when a configuration finds fewer than this fraction of the '
+                               'annotated faces.')
+    evaluate.add_argument('--output', default=None, help='Also write the results to this JSON or CSV file.')
+    evaluate.add_argument('--opencv-threads', type=int, default=None,
+                          help='Limit the threads OpenCV uses, e.g. to the threads a deployment gives each detector.')
+
+    annotate = subparsers.add_parser('annotate', help='Write the boxes a detector finds in images as a draft '
+                                                      'annotation file to be checked and corrected by hand.')
+    annotate.add_argument('inputs', nargs='+', help='Directories, glob patterns or image files to annotate.')
+    annotate.add_argument('--output', required=True, help='The JSON annotation file to write.')
+    annotate.add_argument('--recursive', action='store_true', help='Descend into subdirectories of input directories.')
+    add_detector_arguments(annotate)
+    return parser
+
+
+def parse_grids(values: list, backends: list) -> dict:
+    grids = {}
+    for value in values:
+        target, assignment = None, value
+        if ':' in value.split('=', 1)[0]:
+            target, assignment = value.split(':', 1)
+        option, _, text = assignment.partition('=')
+        if not text:
+            raise ValueError(f"Invalid grid '{value}', expected [BACKEND:]OPTION=VALUES.")
+        # Without a backend the values apply to every tuned backend that sweeps the option (or all of them).
+        targets = [target] if target else [b for b in backends if option in PARAMETER_GRIDS.get(b, {})] or backends
+        for backend in targets:
+            grids.setdefault(backend, {})[option] = parse_grid_values(text)
+    return grids
+
+
+def parse_configuration(text: str) -> tuple:
+    name, _, options_text = text.partition(':')
+    name, _, backend = name.rpartition('=')
+    backend = backend.strip()
+    if backend not in available_backends():
+        raise ValueError(f"Unknown backend in configuration '{text}'. Available backends: "
+                         f"{', '.join(available_backends())}")
+    options = {}
+    for assignment in filter(None, options_text.split(',')):
+        option, _, value = assignment.partition('=')
+        if not value:
+            raise ValueError(f"Invalid option '{assignment}' in configuration '{text}', expected OPTION=VALUE.")
+        options[option.strip()] = parse_grid_values(value)[0]
+    return name.strip() or text, (backend, options)
+
+
+def evaluation_configurations(args: argparse.Namespace) -> dict:
+    configurations = dict(parse_configuration(text) for text in args.config)
+    profiles = list(load_profiles(args.profiles_file)['profiles']) if args.all_profiles else args.profile
+    for name in profiles:
+        configurations[name] = get_profile(args.profiles_file, None if name == 'default' else name)
+    # Without a configuration, the default settings of the default backend are evaluated.
+    return configurations or {DEFAULT_BACKEND: (DEFAULT_BACKEND, {})}
+
+
+def main(argv=None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'segments' and args.motion_gating:
+        parser.error('--motion-gating cannot be used with segments: each segment would start a new background model.')
+    if args.command in ('batch', 'segments', 'cameras', 'annotate'):
+        apply_profile(args)
+    if args.command == 'batch':
+        summary = run_batch(args.inputs, workers=args.workers, opencv_threads=args.opencv_threads,
+                            draw_box=not args.no_box, draw_blur=args.blur, recursive=args.recursive,
+                            detector_options=detector_options(args), detect_interval=args.detect_interval,
+                            backend=args.backend, redaction_mode=args.redaction, writer=args.writer,
+                            fourcc=args.fourcc, sidecar_format=args.sidecar, cache=args.cache,
+                            cache_size=args.cache_size * 2 ** 20, skip_threshold=args.skip_threshold,
+                            tile_size=args.tile_size, tile_overlap=args.tile_overlap, tile_workers=args.tile_workers)
+        if summary['failed']:
+            sys.exit(1)
+    elif args.command == 'segments':
+        directory_manager = DirectoryManager('pp')
+        directory_manager.create_directories()
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        video_path_out = make_output_path(directory_manager.videos_dir, args.video, timestamp, '.mp4')
+        process_video_segments(args.video, video_path_out, workers=args.workers, opencv_threads=args.opencv_threads,
+                               draw_box=not args.no_box, draw_blur=args.blur, compare_serial=args.compare_serial,
+                               detector_options=detector_options(args), detect_interval=args.detect_interval,
+                               backend=args.backend, redaction_mode=args.redaction)
+    elif args.command == 'cameras':
+        directory_manager = DirectoryManager('rf')
+        directory_manager.create_directories()
+        settings = HeadlessSettings(draw_box=not args.no_box, draw_blur=args.blur, redaction_mode=args.redaction)
+        workers = args.workers or None
+        # Enough instances for one per source (stateful detectors) plus one per worker (shared detectors).
+        pool = DetectorPool(settings, max_instances=len(args.sources) + (workers or os.cpu_count() or 1))
+        processor = MultiSourceProcessor(args.sources, pool, args.backend, detector_options(args), workers=workers,
+                                         detect_interval=args.detect_interval, skip_threshold=args.skip_threshold,
+                                         output_dir=None if args.no_record else directory_manager.recordings_dir,
+                                         writer=args.writer, fourcc=args.fourcc, metrics_format=args.metrics,
+                                         metrics_dir=directory_manager.metrics_dir, show_fps=args.show_fps)
+        processor.run(duration=args.duration, display=args.display)
+    elif args.command == 'autotune':
+        if args.opencv_threads is not None:
+            cv2.setNumThreads(args.opencv_threads)
+        autotune(args.annotations, args.backends, parse_grids(args.grid, args.backends), args.output,
+                 repeat=args.repeat, target_recall=args.target_recall, min_precision=args.min_precision,
+                 iou_threshold=args.iou)
+    elif args.command == 'evaluate':
+        if args.opencv_threads is not None:
+            cv2.setNumThreads(args.opencv_threads)
+        results = evaluate_configurations(args.annotations, evaluation_configurations(args), repeat=args.repeat,
+                                          iou_threshold=args.iou, min_recall=args.min_recall,
+                                          output_path=args.output)
+        if args.min_recall is not None and not all(result['passed'] for result in results):
+            sys.exit(1)
+    elif args.command == 'annotate':
+        images = [path for path in collect_media_files(args.inputs, args.recursive)
+                  if path.lower().endswith(IMAGE_EXTENSIONS)]
+        detector = create_detector(args.backend, HeadlessSettings(), static_mode=True, **detector_options(args))
+        boxes = write_draft_annotations(images, detector, args.output)
+        print(f"Wrote {boxes} draft boxes for {len(images)} images to {args.output}. Check every box, add the faces "
+              f"the detector missed and remove false detections before using the file as ground truth.")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        logging.error(f"Error in main: {e}")
+        sys.exit(1)
@@ -0,0 +1,213 @@
+"""
+Module: autotune.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module tunes detector parameters against a labelled sample set. For every backend it sweeps a grid of
+    constructor options (the cascade's scaleFactor, minNeighbors and minSize, the detection resolution and the mesh
+    confidences), runs every combination over the annotated images and measures its latency (median per image) and
+    its recall and precision against the annotations. The combinations that are Pareto-optimal for speed and recall
+    (no other combination is both faster and finds more faces) become detector profiles. The fastest profile that
+    reaches the target recall is marked as the default, and the profiles are written with detector_profiles so
+    deployments can load them.
+
+    Combinations below a minimum precision are left out before the Pareto front is taken, as a cascade that accepts
+    every window would otherwise always have the best recall.
+
+Functions:
+- parameter_combinations(grid) -> list: Expand a parameter grid into option dicts.
+- parse_grid_values(text) -> list: Parse command line grid values such as '1.1,1.2' or 'none,40x40'.
+- evaluate_options(backend, options, samples, settings, repeat, iou_threshold) -> dict: Measure one combination.
+- pareto_front(results) -> list: Get the results no other result beats on both latency and recall.
+- autotune(annotations_path, backends, grids, output_path, repeat, target_recall, min_precision,
+  iou_threshold) -> dict: Sweep the grids and write the Pareto-optimal profiles.
+
+Constants:
+- PARAMETER_GRIDS: Default grid of options swept for every backend.
+- DEFAULT_TARGET_RECALL: Default recall the default profile must reach.
+- DEFAULT_MIN_PRECISION: Default precision below which combinations are left out.
+"""
+
+import itertools
+import os
+import platform
+
+import cv2
+
+from face_detection_package.detector_profiles import save_profiles
+from face_detection_package.detector_registry import create_detector
+from face_detection_package.evaluation import IOU_THRESHOLD, evaluate_detector, load_samples
+from face_detection_package.headless_settings import HeadlessSettings
+
+PARAMETER_GRIDS = {
+    'haar': {'scaleFactor': [1.05, 1.1, 1.2, 1.3], 'minNeighbors': [3, 4, 5, 6], 'minSize': [None, (40, 40)],
+             'detection_width': [None, 960, 640]},
+    'mesh': {'minDetectionCon': [0.2, 0.35, 0.5, 0.7], 'maxFaces': [5, 10]},
+    'hybrid': {'scaleFactor': [1.1, 1.2], 'minNeighbors': [2, 3, 4], 'detection_width': [960, 640, 480],
+               'minDetectionCon': [0.3, 0.5]},
+}
+DEFAULT_TARGET_RECALL = 0.9
+DEFAULT_MIN_PRECISION = 0.5
+
+
+def parameter_combinations(grid: dict) -> list:
+    """
+    Expand a parameter grid into option dicts.
+
+    Args:
+        grid (dict): The values to try for every option.
+
+    Returns:
+        list: An option dict for every combination of values.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def parse_grid_values(text: str) -> list:
+    """
+    Parse the comma separated values of a grid option given on the command line. 'none' is None, 'WxH' is a size
+    tuple, 'true'/'false' are booleans and anything else is an int or float.
+
+    Args:
+        text (str): The values, e.g. '1.1,1.2' or 'none,40x40'.
+
+    Raises:
+        ValueError: If a value cannot be parsed.
+
+    Returns:
+        list: The values.
+    """
+    values = []
+    for value in text.split(','):
+        value = value.strip().lower()
+        if value == 'none':
+            values.append(None)
+        elif value in ('true', 'false'):
+            values.append(value == 'true')
+        elif 'x' in value:
+            width, height = value.split('x')
+            values.append((int(width), int(height)))
+        else:
+            values.append(float(value) if '.' in value else int(value))
+    return values
+
+
+def evaluate_options(backend: str, options: dict, samples: list, settings=None, repeat: int = 3,
+                     iou_threshold: float = IOU_THRESHOLD) -> dict:
+    """
+    Measure the latency, recall and precision of one combination of detector options.
+
+    Args:
+        backend (str): The name of the detector backend.
+        options (dict): The detector constructor options.
+        samples (list): An (image path, image, (N, 4) array of annotated boxes) tuple for every sample image.
+        settings: The settings object given to the detector.
+        repeat (int): The timed runs per image (the median is used).
+        iou_threshold (float): The intersection over union a detection needs to match an annotated face.
+
+    Returns:
+        dict: The backend, options, mean of the per-image median latencies in milliseconds, recall, precision and
+              match counts.
+    """
+    detector = create_detector(backend, settings or HeadlessSettings(), static_mode=True, **options)
+    result = evaluate_detector(detector, samples, repeat, iou_threshold)
+    return {'backend': backend, 'options': options, 'latency_ms': result['latency_ms'],
+            'recall': result['recall'], 'precision': result['precision'],
+            'true_positives': result['true_positives'], 'false_positives': result['false_positives'],
+            'false_negatives': result['false_negatives']}
+
+
+def pareto_front(results: list) -> list:
+    """
+    Get the results no other result beats on both latency and recall.
+
+    Args:
+        results (list): The results of evaluate_options.
+
+    Returns:
+        list: The Pareto-optimal results, fastest first.
+    """
+    front = []
+    # Fastest first (higher recall first on ties); a result is kept when it finds more faces than every faster one.
+    for result in sorted(results, key=lambda r: (r['latency_ms'], -r['recall'], -r['precision'])):
+        if not front or result['recall'] > front[-1]['recall']:
+            front.append(result)
+    return front
+
+
+def _options_text(options: dict) -> str:
+    return ', '.join(f"{key}={value}" for key, value in options.items())
+
+
+def autotune(annotations_path: str, backends: list, grids: dict = None, output_path: str = None, repeat: int = 3,
+             target_recall: float = DEFAULT_TARGET_RECALL, min_precision: float = DEFAULT_MIN_PRECISION,
+             iou_threshold: float = IOU_THRESHOLD) -> dict:
+    """
+    Sweep the parameter grids of the backends over an annotated sample set and write the Pareto-optimal profiles.
+
+    Args:
+        annotations_path (str): The annotation file of the sample set (see the evaluation module).
+        backends (list): The backends to tune.
+        grids (dict): Grid overrides per backend; options not given keep the default grid of PARAMETER_GRIDS.
+        output_path (str): The profiles file to write (None to only print the results).
+        repeat (int): The timed runs per image and combination.
+        target_recall (float): The default profile is the fastest one reaching this recall (or the one with the
+                               highest recall when none does).
+        min_precision (float): Combinations below this precision are left out.
+        iou_threshold (float): The intersection over union a detection needs to match an annotated face.
+
+    Raises:
+        ValueError: If the annotations cannot be loaded or an annotated image cannot be read.
+
+    Returns:
+        dict: The profiles keyed by name, the name of the default profile and every measured result.
+    """
+    samples = load_samples(annotations_path)
+    faces = sum(len(boxes) for _, _, boxes in samples)
+    print(f"Tuning on {len(samples)} images with {faces} annotated faces")
+
+    results = []
+    for backend in backends:
+        grid = dict(PARAMETER_GRIDS.get(backend, {}))
+        grid.update((grids or {}).get(backend, {}))
+        combinations = parameter_combinations(grid)
+        print(f"{backend}: {len(combinations)} combinations")
+        for number, options in enumerate(combinations, 1):
+            try:
+                result = evaluate_options(backend, options, samples, repeat=repeat, iou_threshold=iou_threshold)
+            except Exception as e:
+                print(f"  Skipping {backend} ({_options_text(options)}): {e}")
+                continue
+            results.append(result)
+            print(f"  [{number}/{len(combinations)}] {result['latency_ms']:8.2f} ms  recall {result['recall']:.3f}  "
+                  f"precision {result['precision']:.3f}  {_options_text(options)}")
+
+    eligible = [result for result in results if result['precision'] >= min_precision]
+    front = pareto_front(eligible)
+    profiles = {}
+    for number, result in enumerate(front, 1):
+        profiles[f"{result['backend']}_{number}"] = {
+            'backend': result['backend'], 'options': result['options'],
+            'latency_ms': round(result['latency_ms'], 3), 'recall': round(result['recall'], 4),
+            'precision': round(result['precision'], 4)}
+    reaching = [name for name, profile in profiles.items() if profile['recall'] >= target_recall]
+    default = reaching[0] if reaching else (list(profiles)[-1] if profiles else None)
+
+    print(f"Pareto-optimal profiles (precision >= {min_precision}):")
+    for name, profile in profiles.items():
+        marker = '  (default)' if name == default else ''
+        print(f"  {name:<12} {profile['latency_ms']:8.2f} ms  recall {profile['recall']:.3f}  "
+              f"precision {profile['precision']:.3f}  {_options_text(profile['options'])}{marker}")
+    if not reaching and profiles:
+        print(f"No profile reaches the target recall of {target_recall}; the default is the most accurate one.")
+
+    if output_path:
+        metadata = {'annotations': os.path.abspath(annotations_path), 'images': len(samples), 'faces': faces,
+                    'iou_threshold': iou_threshold, 'target_recall': target_recall, 'min_precision': min_precision,
+                    'machine': {'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+                                'opencv': cv2.__version__}}
+        save_profiles(output_path, profiles, default, metadata)
+        print(f"Profiles written to {output_path}")
+    return {'profiles': profiles, 'default': default, 'results': results}
@@ -0,0 +1,405 @@
+"""
+Module: batch_processing.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides headless batch processing of image and video files. Input directories, glob patterns and
+    file paths are expanded into a list of media files which are spread over a pool of worker processes. Every worker
+    builds its own detector of the selected backend once (one for images and one for videos if the backend has a
+    static mode) and limits the number of threads OpenCV uses internally so that the pool
+    does not oversubscribe the available cores. Outputs are saved to the DirectoryManager output directories and a
+    throughput summary is printed when the run is done. In detect-only mode every file gets a detection sidecar
+    instead of a rendered copy. With the detection cache enabled, workers share one cache directory so files processed
+    by an earlier run with the same detector parameters are only rendered, and the hits and misses are summarized.
+    With tiling enabled, images larger than a tile are searched tile by tile on threads of the worker, and the peak
+    memory of the largest image is summarized.
+
+Functions:
+- collect_media_files(inputs, recursive) -> list: Expand directories, globs and files into media file paths.
+- output_names(files) -> dict: Give every file a unique name to build its output paths from.
+- default_opencv_threads(workers) -> int: The OpenCV thread count that fills the cores for a given pool size.
+- run_batch(inputs, workers, opencv_threads, draw_box, draw_blur, recursive, detector_options, detect_interval,
+  backend, redaction_mode, writer, fourcc, sidecar_format, cache, cache_size, skip_threshold, tile_size,
+  tile_overlap, tile_workers) -> dict: Process files on a process pool.
+- print_summary(summary) -> None: Print the throughput summary of a batch run.
+"""
+
+import datetime
+import glob
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from face_detection_package.detection_cache import DEFAULT_MAX_BYTES, DetectionCache
+from face_detection_package.detector_pool import DetectorPool
+from face_detection_package.directory_manager import DirectoryManager
+from face_detection_package.frame_skipping import skip_unchanged_frames
+from face_detection_package.detector_registry import DEFAULT_BACKEND, create_detector
+from face_detection_package.headless_settings import HeadlessSettings
+from face_detection_package.tracking import wrap_detector
+from face_detection_package.media_processing import (VIDEO_EXTENSIONS, IMAGE_EXTENSIONS, make_output_path,
+                                                     detect_over_video_file, detect_over_image_file,
+                                                     detect_video_to_sidecar, detect_image_to_sidecar)
+from face_detection_package.output_writers import DEFAULT_FOURCC, DEFAULT_WRITER, output_extension
+from face_detection_package.sidecar import sidecar_extension
+from face_detection_package.tiled_detection import TILE_OVERLAP, TiledDetector
+
+# Per-process state set up by _init_worker.
+_worker_detectors = {}
+_worker_backend = DEFAULT_BACKEND
+_worker_settings = None
+_worker_detector_options = {}
+_worker_directories = None
+_worker_detect_interval = 1
+_worker_writer = (DEFAULT_WRITER, {})
+_worker_sidecar_format = None
+_worker_cache = None
+_worker_skip_threshold = 0.0
+_worker_tiling = None
+_worker_tiled_detector = None
+
+
+def collect_media_files(inputs: list, recursive: bool = False) -> list:
+    """
+    Expand directories, glob patterns and file paths into a sorted list of media files.
+
+    Args:
+        inputs (list): Directories, glob patterns or file paths.
+        recursive (bool): Whether to descend into subdirectories of input directories.
+
+    Returns:
+        list: The unique media file paths with a video or image extension.
+    """
+    valid_extensions = VIDEO_EXTENSIONS + IMAGE_EXTENSIONS
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*') if recursive else os.path.join(item, '*')
+            candidates = glob.glob(pattern, recursive=recursive)
+        elif glob.has_magic(item):
+            candidates = glob.glob(item, recursive=True)
+        else:
+            candidates = [item]
+        for path in candidates:
+            if os.path.isfile(path) and path.lower().endswith(valid_extensions):
+                files.add(os.path.abspath(path))
+            elif not os.path.exists(path):
+                print(f"Skipping missing input: {path}")
+    return sorted(files)
+
+
+def output_names(files: list) -> dict:
+    """
+    Give every file a unique name to build its output paths from. Files keep their file name unless another file of
+    the batch has the same one (e.g. 'a/clip.mp4' and 'b/clip.mp4' from a recursive run); those are named after their
+    path below the deepest directory they share ('a_clip.mp4' and 'b_clip.mp4'). A name that is still taken (compared
+    without case, as on case-insensitive file systems) gets a short hash of the absolute path appended.
+
+    Args:
+        files (list): The absolute media file paths of the batch.
+
+    Returns:
+        dict: The output name of every file.
+    """
+    by_name = {}
+    for path in files:
+        by_name.setdefault(os.path.basename(path).lower(), []).append(path)
+    names, taken = {}, set()
+    # Files with a name of their own are named first so they keep it even when a renamed file would take it.
+    for paths in sorted(by_name.values(), key=len):
+        root = os.path.commonpath(paths) if len(paths) > 1 else None
+        for path in paths:
+            name = os.path.relpath(path, root).replace(os.sep, '_') if root else os.path.basename(path)
+            if name.lower() in taken:
+                stem, extension = os.path.splitext(name)
+                name = f"{stem}_{hashlib.sha1(path.encode('utf-8')).hexdigest()[:8]}{extension}"
+            taken.add(name.lower())
+            names[path] = name
+    return names
+
+
+def default_opencv_threads(workers: int) -> int:
+    """
+    Get the number of OpenCV threads per worker that fills the cores without oversubscribing them.
+
+    Args:
+        workers (int): The number of worker processes.
+
+    Returns:
+        int: The OpenCV thread count for each worker.
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _init_worker(settings: HeadlessSettings, opencv_threads: int, directories: tuple, detector_options: dict,
+                 detect_interval: int, backend: str, writer: tuple, sidecar_format: str = None,
+                 cache: tuple = None, skip_threshold: float = 0.0, tiling: tuple = None) -> None:
+    """
+    Initialize a worker process with its own detector and OpenCV thread limit.
+
+    Args:
+        settings (HeadlessSettings): The effect settings used by the detector.
+        opencv_threads (int): The number of threads OpenCV may use in this process.
+        directories (tuple): The (videos_dir, images_dir) output directories.
+        detector_options (dict): Keyword arguments passed to the detector (e.g. detection_width).
+        detect_interval (int): Number of video frames between full detections.
+        backend (str): The name of the detector backend.
+        writer (tuple): The output writer backend and its options.
+        sidecar_format (str): If set, only the detections are saved, to a sidecar of this format.
+        cache (tuple): The (directory, size limit in bytes) of the detection cache, or None to always detect.
+        skip_threshold (float): The change below which video frames reuse the previous detections (0 to disable).
+        tiling (tuple): The (tile size, overlap, threads) of tiled image detection, or None to detect whole images.
+
+    Returns:
+        None
+    """
+    global _worker_backend, _worker_settings, _worker_detector_options, _worker_directories, _worker_detect_interval
+    global _worker_writer, _worker_sidecar_format, _worker_cache, _worker_skip_threshold, _worker_tiling
+    cv2.setNumThreads(opencv_threads)
+    _worker_backend = backend
+    _worker_settings = settings
+    _worker_detector_options = detector_options
+    _worker_directories = directories
+    _worker_detect_interval = detect_interval
+    _worker_writer = writer
+    _worker_sidecar_format = sidecar_format
+    _worker_cache = DetectionCache(*cache) if cache else None
+    _worker_skip_threshold = skip_threshold
+    _worker_tiling = tiling
+    # Build the video detector up front so model loading is not counted against the first file.
+    _get_worker_detector(static_mode=False)
+
+
+def _get_worker_detector(static_mode: bool):
+    """
+    Get this worker's detector for images (static mode) or videos, building it the first time it is needed.
+
+    Args:
+        static_mode (bool): True for images, False for videos.
+
+    Returns:
+        The detector.
+    """
+    if static_mode not in _worker_detectors:
+        _worker_detectors[static_mode] = create_detector(_worker_backend, _worker_settings, static_mode=static_mode,
+                                                         **_worker_detector_options)
+    return _worker_detectors[static_mode]
+
+
+def _get_worker_image_detector():
+    """
+    Get this worker's detector for images, wrapped for tiled detection when tiling is enabled.
+
+    Returns:
+        The detector.
+    """
+    global _worker_tiled_detector
+    if not _worker_tiling:
+        return _get_worker_detector(static_mode=True)
+    if _worker_tiled_detector is None:
+        tile_size, overlap, threads = _worker_tiling
+        pool = DetectorPool(_worker_settings, max_instances=threads)
+        _worker_tiled_detector = TiledDetector(_get_worker_detector(static_mode=True), pool, _worker_backend,
+                                               _worker_detector_options, tile_size, overlap, threads)
+    return _worker_tiled_detector
+
+
+def _process_file(path: str, timestamp: str, name: str = None) -> dict:
+    """
+    Process a single media file in a worker process.
+
+    Args:
+        path (str): The media file to process.
+        timestamp (str): The timestamp of the batch run used in output names.
+        name (str): The unique name of the file in the batch its output path is built from.
+
+    Returns:
+        dict: The file path, kind, output path, frame count, elapsed seconds, error message (if any) and detection
+              cache outcome ('hit', 'miss' or None), number of unchanged video frames skipped and tiled detection
+              report (None for files that were not tiled).
+    """
+    videos_dir, images_dir = _worker_directories
+    result = {'path': path, 'kind': None, 'output': None, 'frames': 0, 'seconds': 0.0, 'error': None, 'cache': None,
+              'evicted': 0, 'skipped': 0, 'tiled': None}
+    face_detector = None
+    cache_counts = (_worker_cache.hits, _worker_cache.evictions) if _worker_cache else None
+    start = time.perf_counter()
+    try:
+        if _worker_sidecar_format and path.lower().endswith(VIDEO_EXTENSIONS):
+            result['kind'] = 'video'
+            result['output'] = make_output_path(videos_dir, path, timestamp,
+                                                sidecar_extension(_worker_sidecar_format), name)
+            face_detector = skip_unchanged_frames(wrap_detector(_get_worker_detector(static_mode=False),
+                                                                _worker_detect_interval), _worker_skip_threshold)
+            result['frames'] = detect_video_to_sidecar(face_detector, path, result['output'], _worker_sidecar_format)
+        elif _worker_sidecar_format:
+            result['kind'] = 'image'
+            result['output'] = make_output_path(images_dir, path, timestamp,
+                                                sidecar_extension(_worker_sidecar_format), name)
+            face_detector = _get_worker_image_detector()
+            detect_image_to_sidecar(face_detector, path, result['output'], _worker_sidecar_format)
+            result['frames'] = 1
+        elif path.lower().endswith(VIDEO_EXTENSIONS):
+            result['kind'] = 'video'
+            writer, writer_options = _worker_writer
+            extension = output_extension(writer, writer_options.get('fourcc', DEFAULT_FOURCC))
+            result['output'] = make_output_path(videos_dir, path, timestamp, extension, name)
+            face_detector = skip_unchanged_frames(wrap_detector(_get_worker_detector(static_mode=False),
+                                                                _worker_detect_interval), _worker_skip_threshold)
+            result['frames'] = detect_over_video_file(face_detector, path, result['output'], writer=writer,
+                                                      writer_options=writer_options, cache=_worker_cache)
+        else:
+            result['kind'] = 'image'
+            result['output'] = make_output_path(images_dir, path, timestamp, '.jpg', name)
+            face_detector = _get_worker_image_detector()
+            detect_over_image_file(face_detector, path, result['output'], _worker_cache)
+            result['frames'] = 1
+    except Exception as e:
+        result['error'] = str(e)
+    result['skipped'] = getattr(face_detector, 'skipped_frames', 0)
+    if isinstance(face_detector, TiledDetector):
+        result['tiled'], face_detector.last_report = face_detector.last_report, None
+    if cache_counts and not _worker_sidecar_format:
+        result['cache'] = 'hit' if _worker_cache.hits > cache_counts[0] else 'miss'
+        result['evicted'] = _worker_cache.evictions - cache_counts[1]
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_batch(inputs: list, workers: int = None, opencv_threads: int = None, draw_box: bool = True,
+              draw_blur: bool = False, recursive: bool = False, detector_options: dict = None,
+              detect_interval: int = 1, backend: str = DEFAULT_BACKEND, redaction_mode: str = 'blur',
+              writer: str = DEFAULT_WRITER, fourcc: str = DEFAULT_FOURCC, sidecar_format: str = None,
+              cache: bool = False, cache_size: int = DEFAULT_MAX_BYTES, skip_threshold: float = 0.0,
+              tile_size: int = None, tile_overlap: int = TILE_OVERLAP, tile_workers: int = None) -> dict:
+    """
+    Process every media file found in the inputs on a pool of worker processes.
+
+    Args:
+        inputs (list): Directories, glob patterns or file paths.
+        workers (int): The number of worker processes (defaults to the number of cores).
+        opencv_threads (int): The number of OpenCV threads per worker (defaults to cores // workers).
+        draw_box (bool): Whether to draw bounding boxes around detections.
+        draw_blur (bool): Whether to blur detections.
+        recursive (bool): Whether to descend into subdirectories of input directories.
+        detector_options (dict): Keyword arguments passed to each worker's detector (e.g. detection_width).
+        detect_interval (int): Number of video frames between full detections (faces are tracked in between).
+        backend (str): The name of the detector backend.
+        redaction_mode (str): The redaction mode applied to detections when draw_blur is set.
+        writer (str): The output writer backend for videos ('video', 'ffmpeg' or 'jpeg').
+        fourcc (str): The codec of the 'video' writer backend.
+        sidecar_format (str): If set ('jsonl' or 'npz'), only the detections of every file are saved to a sidecar
+                              of this format; nothing is drawn or re-encoded.
+        cache (bool): Whether to load and store the detections of rendered files in the detection cache.
+        cache_size (int): The size limit of the detection cache in bytes.
+        skip_threshold (float): Video frames whose change from the last detected frame stays below this reuse its
+                                detections instead of running the detector (0 to disable).
+        tile_size (int): If set, images larger than this are searched in overlapping tiles of this size.
+        tile_overlap (int): The overlap of neighbouring tiles in pixels.
+        tile_workers (int): The number of tile threads per worker (defaults to cores // workers).
+
+    Returns:
+        dict: The run summary with per-file results and throughput totals.
+    """
+    if sidecar_format:
+        sidecar_extension(sidecar_format)
+    files = collect_media_files(inputs, recursive)
+    names = output_names(files)
+    workers = workers or os.cpu_count() or 1
+    opencv_threads = opencv_threads or default_opencv_threads(workers)
+
+    directory_manager = DirectoryManager('pp')
+    directory_manager.create_directories()
+    directories = (directory_manager.videos_dir, directory_manager.images_dir)
+    cache_config = (directory_manager.cache_dir, cache_size) if cache else None
+    tiling = (tile_size, tile_overlap, tile_workers or default_opencv_threads(workers)) if tile_size else None
+
+    settings = HeadlessSettings(draw_box=draw_box, draw_blur=draw_blur, redaction_mode=redaction_mode)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    print(f"Processing {len(files)} files with the '{backend}' detector on {workers} workers "
+          f"with {opencv_threads} OpenCV threads each")
+    results = []
+    start = time.perf_counter()
+    if files:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(settings, opencv_threads, directories, detector_options or {},
+                                           detect_interval, backend, (writer, {'fourcc': fourcc}),
+                                           sidecar_format, cache_config, skip_threshold, tiling)) as executor:
+            futures = [executor.submit(_process_file, path, timestamp, names[path]) for path in files]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if result['error']:
+                    print(f"Error processing {result['path']}: {result['error']}")
+                else:
+                    print(f"Processed {result['path']} -> {result['output']} ({result['seconds']:.2f}s)")
+    wall_seconds = time.perf_counter() - start
+
+    succeeded = [r for r in results if not r['error']]
+    summary = {
+        'files': len(files),
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'videos': sum(1 for r in succeeded if r['kind'] == 'video'),
+        'images': sum(1 for r in succeeded if r['kind'] == 'image'),
+        'frames': sum(r['frames'] for r in succeeded),
+        'skipped_frames': sum(r['skipped'] for r in succeeded),
+        'wall_seconds': wall_seconds,
+        'worker_seconds': sum(r['seconds'] for r in results),
+        'workers': workers,
+        'opencv_threads': opencv_threads,
+        'results': results,
+    }
+    tiled = [r['tiled'] for r in succeeded if r['tiled']]
+    if tiled:
+        summary['tiling'] = {'images': len(tiled), 'tiles': sum(t['tiles'] for t in tiled),
+                             'traced_peak_bytes': max(t['traced_peak_bytes'] for t in tiled),
+                             'peak_rss_bytes': max((t['peak_rss_bytes'] or 0) for t in tiled) or None}
+    if cache_config:
+        summary['cache'] = DetectionCache(*cache_config).stats()
+        summary['cache'].update(hits=sum(r['cache'] == 'hit' for r in results),
+                                misses=sum(r['cache'] == 'miss' for r in results),
+                                evictions=sum(r['evicted'] for r in results))
+    print_summary(summary)
+    return summary
+
+
+def print_summary(summary: dict) -> None:
+    """
+    Print the throughput summary of a batch run.
+
+    Args:
+        summary (dict): The summary returned by run_batch.
+
+    Returns:
+        None
+    """
+    wall = summary['wall_seconds']
+    print("Batch summary:")
+    print(f"  files: {summary['files']} ({summary['videos']} videos, {summary['images']} images), "
+          f"{summary['failed']} failed")
+    print(f"  workers: {summary['workers']} x {summary['opencv_threads']} OpenCV threads")
+    print(f"  wall time: {wall:.2f}s, summed worker time: {summary['worker_seconds']:.2f}s")
+    if wall > 0:
+        print(f"  throughput: {summary['succeeded'] / wall:.2f} files/s, {summary['frames'] / wall:.2f} frames/s")
+    if summary['skipped_frames']:
+        print(f"  unchanged frames skipped: {summary['skipped_frames']} of {summary['frames']} "
+              f"({summary['skipped_frames'] / max(1, summary['frames']):.0%})")
+    if 'tiling' in summary:
+        tiling = summary['tiling']
+        rss = tiling['peak_rss_bytes']
+        print(f"  tiled images: {tiling['images']} ({tiling['tiles']} tiles), peak traced memory "
+              f"{tiling['traced_peak_bytes'] / 2 ** 20:.1f} MiB, peak worker memory "
+              f"{'n/a' if rss is None else f'{rss / 2 ** 20:.1f} MiB'}")
+    if 'cache' in summary:
+        cache = summary['cache']
+        lookups = cache['hits'] + cache['misses']
+        hit_rate = cache['hits'] / lookups if lookups else 0.0
+        print(f"  detection cache: {cache['hits']} hits, {cache['misses']} misses ({hit_rate:.0%} hit rate), "
+              f"{cache['evictions']} evicted, {cache['entries']} entries using {cache['bytes'] / 2 ** 20:.1f} of "
+              f"{cache['max_bytes'] / 2 ** 20:.0f} MiB")
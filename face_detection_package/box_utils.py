@@ -0,0 +1,176 @@
+"""
+Module: box_utils.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides helper functions for working with x, y, w, h face boxes such as computing their overlap,
+    expanding them into search windows and merging duplicate detections.
+
+Functions:
+- iou(box_a, box_b) -> float: Intersection over union of two boxes.
+- iou_matrix(boxes_a, boxes_b) -> np.ndarray: Pairwise intersection over union of two sets of boxes.
+- containment_matrix(boxes_a, boxes_b) -> np.ndarray: Pairwise fraction of each box covered by another box.
+- expand_box(box, padding, width, height) -> tuple: Pad a box on every side and clip it to the frame.
+- non_max_suppression(boxes, scores, iou_threshold) -> np.ndarray: Remove boxes overlapping a better box.
+- overlap_matrix(boxes) -> np.ndarray: Pairwise test of which boxes overlap.
+- group_overlapping(boxes, overlaps) -> list: Split boxes into groups of boxes connected by overlaps.
+"""
+
+import numpy as np
+
+
+def iou(box_a, box_b) -> float:
+    """
+    Compute the intersection over union of two boxes.
+
+    Args:
+        box_a: The x, y, w, h of the first box.
+        box_b: The x, y, w, h of the second box.
+
+    Returns:
+        float: The intersection over union (0 when the boxes do not overlap).
+    """
+    return float(iou_matrix(np.asarray([box_a]), np.asarray([box_b]))[0, 0])
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Compute the pairwise intersection over union of two sets of boxes.
+
+    Args:
+        boxes_a (np.ndarray): An (N, 4) array of x, y, w, h boxes.
+        boxes_b (np.ndarray): An (M, 4) array of x, y, w, h boxes.
+
+    Returns:
+        np.ndarray: An (N, M) array of intersection over union values.
+    """
+    a = np.asarray(boxes_a, dtype=float).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=float).reshape(-1, 4)
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+    inter_w = np.clip(np.minimum(ax2[:, None], bx2[None, :]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    inter_h = np.clip(np.minimum(ay2[:, None], by2[None, :]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = inter_w * inter_h
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def containment_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Compute the fraction of the area of every box in one set covered by every box of another set.
+
+    Args:
+        boxes_a (np.ndarray): An (N, 4) array of x, y, w, h boxes.
+        boxes_b (np.ndarray): An (M, 4) array of x, y, w, h boxes.
+
+    Returns:
+        np.ndarray: An (N, M) array of the fraction of each box of boxes_a inside each box of boxes_b.
+    """
+    a = np.asarray(boxes_a, dtype=float).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=float).reshape(-1, 4)
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+    inter_w = np.clip(np.minimum(ax2[:, None], bx2[None, :]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    inter_h = np.clip(np.minimum(ay2[:, None], by2[None, :]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = inter_w * inter_h
+    area = np.broadcast_to((a[:, 2] * a[:, 3])[:, None], inter.shape)
+    return np.divide(inter, area, out=np.zeros_like(inter), where=area > 0)
+
+
+def expand_box(box, padding: float, width: int, height: int) -> tuple:
+    """
+    Pad a box on every side by a fraction of its larger side and clip it to the frame.
+
+    Args:
+        box: The x, y, w, h of the box.
+        padding (float): The padding as a fraction of the larger side of the box.
+        width (int): The frame width.
+        height (int): The frame height.
+
+    Returns:
+        tuple: The x1, y1, x2, y2 corners of the padded box.
+    """
+    x, y, w, h = box
+    pad = int(round(padding * max(w, h)))
+    return max(0, x - pad), max(0, y - pad), min(width, x + w + pad), min(height, y + h + pad)
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray = None, iou_threshold: float = 0.3) -> np.ndarray:
+    """
+    Keep the best of every group of overlapping boxes.
+
+    Args:
+        boxes (np.ndarray): An (N, 4) array of x, y, w, h boxes.
+        scores (np.ndarray): The score of every box (larger boxes are preferred when not given).
+        iou_threshold (float): Boxes overlapping a kept box by more than this are removed.
+
+    Returns:
+        np.ndarray: The indices of the kept boxes, best first.
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=int)
+    if scores is None:
+        scores = boxes[:, 2] * boxes[:, 3]
+    order = np.argsort(-np.asarray(scores, dtype=float), kind='stable')
+    overlaps = iou_matrix(boxes, boxes)
+    keep = []
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    for i in order:
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= overlaps[i] > iou_threshold
+    return np.array(keep, dtype=int)
+
+
+def overlap_matrix(boxes: np.ndarray) -> np.ndarray:
+    """
+    Test which boxes overlap, for every pair of boxes at once. Boxes sharing only an edge do not overlap, and every
+    box with a positive width and height overlaps itself.
+
+    Args:
+        boxes (np.ndarray): An (N, 4) array of x, y, w, h boxes.
+
+    Returns:
+        np.ndarray: An (N, N) boolean array, True where two boxes overlap.
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    # x and y are tested together: the boxes overlap when their ranges overlap on both axes.
+    start, end = boxes[:, :2], boxes[:, :2] + boxes[:, 2:]
+    overlapping = (start[:, None] < end[None, :]) & (start[None, :] < end[:, None])
+    return overlapping[..., 0] & overlapping[..., 1]
+
+
+def group_overlapping(boxes: np.ndarray, overlaps: np.ndarray = None) -> list:
+    """
+    Split boxes into groups whose boxes are connected by overlaps, so that every group covers a region of the frame
+    no other group touches.
+
+    Args:
+        boxes (np.ndarray): An (N, 4) array of x, y, w, h boxes.
+        overlaps (np.ndarray): The overlap_matrix of the boxes when it was already computed.
+
+    Returns:
+        list: An array of box indices for every group.
+    """
+    if overlaps is None:
+        overlaps = overlap_matrix(boxes)
+    # The walk over the overlaps runs on plain lists: frames hold few faces, so numpy calls per box would cost more.
+    neighbours = [np.flatnonzero(row).tolist() for row in overlaps]
+    grouped = [False] * len(neighbours)
+    groups = []
+    for start in range(len(neighbours)):
+        if grouped[start]:
+            continue
+        grouped[start] = True
+        members, pending = [start], [start]
+        while pending:
+            for j in neighbours[pending.pop()]:
+                if not grouped[j]:
+                    grouped[j] = True
+                    members.append(j)
+                    pending.append(j)
+        groups.append(np.array(sorted(members), dtype=int))
+    return groups
@@ -0,0 +1,249 @@
+"""
+Module: detection_cache.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides an on-disk cache of detection results so that re-processing a file with different effect
+    settings (box, blur style, output format) skips detection and only renders. Entries are keyed by a hash of the
+    file's content together with the detector's fingerprint: its class and every parameter that changes what it
+    finds (Haar scaleFactor/minNeighbors, mesh confidences, detection resolution, tracking interval, ...). Moving or
+    renaming a file keeps its entry, while editing it or changing a detector parameter gives a new key.
+
+    Each entry holds the boxes and scores of every frame in the NPZ sidecar format. The cache is limited to a total
+    size; when an entry would exceed it the least recently used entries (by file modification time, which is bumped on
+    every hit) are removed. Entries are written atomically so several processes can share a cache directory.
+
+Classes:
+- DetectionCache: Stores and looks up the detections of media files.
+
+Functions:
+- file_digest(path) -> str: Hash the content of a file.
+- detector_fingerprint(face_detector) -> dict: Get the class and detection parameters of a detector.
+
+Constants:
+- CACHE_VERSION: Version of the entry layout and key; bump to invalidate existing caches.
+- DEFAULT_MAX_BYTES: Default size limit of a cache.
+- HASH_CHUNK_SIZE: Number of bytes read at a time while hashing files.
+"""
+
+import hashlib
+import json
+import os
+
+from face_detection_package.sidecar import SidecarWriter, read_sidecar
+
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Digests of files already hashed by this process, keyed by (path, size, modification time).
+_digests = {}
+
+
+def file_digest(path: str) -> str:
+    """
+    Hash the content of a file. Digests are remembered for as long as the file's size and modification time do not
+    change, so a file is only read once per process.
+
+    Args:
+        path (str): The file to hash.
+
+    Returns:
+        str: The hex SHA-256 digest of the file's content.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _digests:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        _digests[memo_key] = digest.hexdigest()
+    return _digests[memo_key]
+
+
+def detector_fingerprint(face_detector) -> dict:
+    """
+    Get the class and detection parameters of a detector. Detectors list the attributes that change their results in
+    a CACHE_PARAMETERS class attribute; wrappers (such as the tracking detector) include the fingerprint of the
+    detector they wrap.
+
+    Args:
+        face_detector: The detector.
+
+    Returns:
+        dict: The JSON serializable fingerprint.
+    """
+    fingerprint = {'class': type(face_detector).__name__}
+    for name in getattr(face_detector, 'CACHE_PARAMETERS', ()):
+        value = getattr(face_detector, name, None)
+        fingerprint[name] = list(value) if isinstance(value, tuple) else value
+    wrapped = getattr(face_detector, 'face_detector', None)
+    if wrapped is not None:
+        fingerprint['wraps'] = detector_fingerprint(wrapped)
+    return fingerprint
+
+
+class DetectionCache:
+    """
+    Stores the per-frame detections of media files on disk with a size limit and least recently used eviction.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the DetectionCache instance.
+
+        Args:
+            directory (str): The directory entries are stored in (created if missing).
+            max_bytes (int): The maximum total size of the entries.
+
+        Returns:
+            None
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key_for(self, path: str, face_detector) -> str:
+        """
+        Get the cache key of a file processed by a detector.
+
+        Args:
+            path (str): The media file.
+            face_detector: The detector the file is processed with.
+
+        Returns:
+            str: The hex key.
+        """
+        key = {'version': CACHE_VERSION, 'content': file_digest(path), 'detector': detector_fingerprint(face_detector)}
+        return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key: str):
+        """
+        Look up the detections stored under a key and mark the entry as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            list: The Detections of every frame, or None on a miss.
+        """
+        path = self._entry_path(key)
+        try:
+            _, frames = read_sidecar(path)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            # A truncated or foreign file is treated as a miss and overwritten by the next put.
+            print(f"Ignoring unreadable cache entry {path}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [detections for _, _, detections in frames]
+
+    def put(self, key: str, frames: list, source: str = None) -> None:
+        """
+        Store the detections of every frame of a file, then evict entries until the cache fits its size limit.
+
+        Args:
+            key (str): The cache key.
+            frames (list): The Detections of every frame.
+            source (str): The path of the media file (kept as metadata).
+
+        Returns:
+            None
+        """
+        path = self._entry_path(key)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with SidecarWriter(temp_path, 'npz', source=source) as entry:
+                for index, detections in enumerate(frames):
+                    entry.write(index, 0.0, detections)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error writing cache entry {path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.evict(keep=path)
+
+    def entries(self) -> list:
+        """
+        Get the stored entries from least to most recently used.
+
+        Returns:
+            list: (path, size in bytes, last use time) tuples.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npz'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Removed by another process sharing the directory.
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self, keep: str = None) -> int:
+        """
+        Remove the least recently used entries until the cache fits its size limit.
+
+        Args:
+            keep (str): An entry path that is never removed (the one just written).
+
+        Returns:
+            int: The number of entries removed.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> dict:
+        """
+        Get the hit/miss counters of this instance and the current size of the cache.
+
+        Returns:
+            dict: The hits, misses, hit rate, evictions, entry count and total bytes.
+        """
+        entries = self.entries()
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions, 'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries), 'max_bytes': self.max_bytes}
+
+    def report(self) -> str:
+        """
+        Get a one-line hit/miss report of the cache.
+
+        Returns:
+            str: The report.
+        """
+        stats = self.stats()
+        return (f"detection cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate), {stats['evictions']} evicted, {stats['entries']} entries using "
+                f"{stats['bytes'] / 2 ** 20:.1f} of {stats['max_bytes'] / 2 ** 20:.0f} MiB")
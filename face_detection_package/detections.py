@@ -0,0 +1,89 @@
+"""
+Module: detections.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides the Detections record returned by every face detector. It holds the boxes found in a frame
+    as a compact integer array along with optional scores and landmarks, so results can be reused, cached, tracked or
+    sent elsewhere independently of how (or whether) they are drawn onto the frame.
+
+Classes:
+- Detections: Compact record of the faces found in a single frame.
+
+Constants:
+- DETECTION_DTYPE: NumPy structured dtype of a single detection (used for storage and export).
+"""
+
+import numpy as np
+
+DETECTION_DTYPE = np.dtype([('x', np.int32), ('y', np.int32), ('w', np.int32), ('h', np.int32),
+                            ('score', np.float32)])
+
+
+class Detections:
+    """
+    Compact record of the faces found in a single frame.
+
+    Attributes:
+        boxes (np.ndarray): An (N, 4) int32 array of x, y, w, h boxes in frame coordinates.
+        scores (np.ndarray): An (N,) float32 array of detection scores, or None if the detector has none.
+        landmarks (np.ndarray): An (N, K, 2) float32 array of landmark pixel coordinates, or None.
+    """
+    __slots__ = ('boxes', 'scores', 'landmarks')
+
+    def __init__(self, boxes=None, scores=None, landmarks=None):
+        self.boxes = np.empty((0, 4), dtype=np.int32) if boxes is None else \
+            np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        self.scores = None if scores is None else np.asarray(scores, dtype=np.float32).reshape(-1)
+        self.landmarks = None if landmarks is None else np.asarray(landmarks, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def __iter__(self):
+        return iter(self.boxes)
+
+    def __repr__(self) -> str:
+        return f"Detections({len(self)} faces)"
+
+    def select(self, indices) -> 'Detections':
+        """
+        Get the detections at the given indices.
+
+        Args:
+            indices: Indices or a boolean mask of the detections to keep.
+
+        Returns:
+            Detections: A new record holding only the selected detections.
+        """
+        return Detections(self.boxes[indices],
+                          None if self.scores is None else self.scores[indices],
+                          None if self.landmarks is None else self.landmarks[indices])
+
+    def to_structured(self) -> np.ndarray:
+        """
+        Get the boxes and scores as a NumPy structured array (scores are NaN when the detector has none).
+
+        Returns:
+            np.ndarray: An (N,) array of DETECTION_DTYPE.
+        """
+        records = np.empty(len(self), dtype=DETECTION_DTYPE)
+        records['x'], records['y'], records['w'], records['h'] = self.boxes.T
+        records['score'] = np.nan if self.scores is None else self.scores
+        return records
+
+    @classmethod
+    def from_structured(cls, records: np.ndarray) -> 'Detections':
+        """
+        Build a record from a NumPy structured array of DETECTION_DTYPE.
+
+        Args:
+            records (np.ndarray): The structured detections.
+
+        Returns:
+            Detections: The detections (without scores if all of them are NaN).
+        """
+        boxes = np.stack([records['x'], records['y'], records['w'], records['h']], axis=1) if len(records) else None
+        scores = records['score'] if len(records) and not np.isnan(records['score']).all() else None
+        return cls(boxes, scores)
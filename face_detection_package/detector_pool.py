@@ -0,0 +1,262 @@
+"""
+Module: detector_pool.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides a DetectorPool class that hands out warm detector instances to threads. CascadeClassifier
+    and MediaPipe FaceMesh objects must not be used by two threads at once, and FaceMesh needs different instances for
+    still images and video (staticMode), so instances are keyed by backend, static mode and constructor options. A
+    thread acquires an instance for exclusive use and releases it when done, after which it is kept warm for the next
+    caller with the same key. The number of instances is capped and instances left idle for too long are evicted.
+
+Classes:
+- DetectorPool: Thread-safe pool of detector instances keyed by backend, static mode and options.
+
+Functions:
+- make_key(backend, static_mode, options) -> tuple: Build the pool key of a detector configuration.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from face_detection_package.detector_registry import create_detector
+
+
+def make_key(backend: str, static_mode: bool, options: dict) -> tuple:
+    """
+    Build the pool key of a detector configuration.
+
+    Args:
+        backend (str): The name of the detector backend.
+        static_mode (bool): True for still images, False for videos and realtime feeds.
+        options (dict): The detector constructor options.
+
+    Returns:
+        tuple: A hashable key identifying the configuration.
+    """
+    return backend, bool(static_mode), tuple(sorted((k, repr(v)) for k, v in options.items()))
+
+
+class DetectorPool:
+    """
+    Thread-safe pool of warm detector instances keyed by backend, static mode and options.
+    """
+
+    def __init__(self, settings, max_instances: int = 8, idle_timeout: float = 300.0):
+        """
+        Initialize the DetectorPool instance.
+
+        Args:
+            settings: Settings object passed to every detector built by the pool.
+            max_instances (int): The maximum number of instances (idle and in use) alive at once.
+            idle_timeout (float): Instances idle for longer than this many seconds are evicted.
+
+        Returns:
+            None
+        """
+        self.settings = settings
+        self.max_instances = max(1, max_instances)
+        self.idle_timeout = idle_timeout
+        self._condition = threading.Condition()
+        self._idle = {}  # key -> list of (detector, released_at), most recently released last
+        self._in_use = {}  # id(detector) -> key
+        self._warming = set()  # keys being built by warm()
+        self._reserved = 0  # instances being built by acquire()
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def _total(self) -> int:
+        return len(self._in_use) + sum(len(items) for items in self._idle.values()) + self._reserved
+
+    def _evict_expired(self, now: float) -> None:
+        for key in list(self._idle):
+            kept = [(d, t) for d, t in self._idle[key] if now - t <= self.idle_timeout]
+            self.evicted += len(self._idle[key]) - len(kept)
+            if kept:
+                self._idle[key] = kept
+            else:
+                del self._idle[key]
+
+    def _evict_oldest_idle(self) -> bool:
+        oldest_key, oldest_time = None, None
+        for key, items in self._idle.items():
+            if items and (oldest_time is None or items[0][1] < oldest_time):
+                oldest_key, oldest_time = key, items[0][1]
+        if oldest_key is None:
+            return False
+        self._idle[oldest_key].pop(0)
+        if not self._idle[oldest_key]:
+            del self._idle[oldest_key]
+        self.evicted += 1
+        return True
+
+    def _build(self, backend: str, static_mode: bool, options: dict):
+        try:
+            return create_detector(backend, self.settings, static_mode=static_mode, **options)
+        except Exception:
+            with self._condition:
+                self._reserved -= 1
+                self._condition.notify_all()
+            raise
+
+    def acquire(self, backend: str, static_mode: bool = False, timeout: float = None, **options):
+        """
+        Get a detector for exclusive use by the calling thread, reusing an idle instance with the same key when there
+        is one. When the pool is full the oldest idle instance of another key is evicted, or the call waits for an
+        instance to be released.
+
+        Args:
+            backend (str): The name of the detector backend.
+            static_mode (bool): True for still images, False for videos and realtime feeds.
+            timeout (float): The maximum number of seconds to wait for room in the pool (None waits forever).
+            **options: The detector constructor options.
+
+        Raises:
+            TimeoutError: If no instance became available within the timeout.
+
+        Returns:
+            The detector. It must be given back with release().
+        """
+        key = make_key(backend, static_mode, options)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                self._evict_expired(time.monotonic())
+                if self._idle.get(key):
+                    detector, _ = self._idle[key].pop()
+                    if not self._idle[key]:
+                        del self._idle[key]
+                    self._in_use[id(detector)] = key
+                    self.reused += 1
+                    return detector
+                # A detector for this key is being warmed up; waiting for it is cheaper than building another.
+                if key not in self._warming and (self._total() < self.max_instances or self._evict_oldest_idle()):
+                    self._reserved += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No {backend} detector became available within {timeout} seconds.")
+                self._condition.wait(remaining)
+
+        detector = self._build(backend, static_mode, options)
+        with self._condition:
+            self._reserved -= 1
+            self._in_use[id(detector)] = key
+            self.created += 1
+        return detector
+
+    def release(self, detector) -> None:
+        """
+        Give a detector back to the pool so it can be reused.
+
+        Args:
+            detector: A detector returned by acquire().
+
+        Returns:
+            None
+        """
+        if hasattr(detector, 'reset'):
+            detector.reset()
+        with self._condition:
+            key = self._in_use.pop(id(detector), None)
+            if key is None:
+                return
+            self._idle.setdefault(key, []).append((detector, time.monotonic()))
+            self._condition.notify_all()
+
+    @contextmanager
+    def detector(self, backend: str, static_mode: bool = False, timeout: float = None, **options):
+        """
+        Context manager that acquires a detector and releases it on exit.
+
+        Args:
+            backend (str): The name of the detector backend.
+            static_mode (bool): True for still images, False for videos and realtime feeds.
+            timeout (float): The maximum number of seconds to wait for room in the pool.
+            **options: The detector constructor options.
+
+        Yields:
+            The detector.
+        """
+        detector = self.acquire(backend, static_mode, timeout, **options)
+        try:
+            yield detector
+        finally:
+            self.release(detector)
+
+    def warm(self, backend: str, static_mode: bool = False, warm_frame=None, **options) -> None:
+        """
+        Build a detector (if none is idle for the key) and leave it idle in the pool, optionally running it once on
+        a frame so first-call setup is done. Callers acquiring the same key meanwhile wait for it.
+
+        Args:
+            backend (str): The name of the detector backend.
+            static_mode (bool): True for still images, False for videos and realtime feeds.
+            warm_frame (np.ndarray): A frame to run the detector on once.
+            **options: The detector constructor options.
+
+        Returns:
+            None
+        """
+        key = make_key(backend, static_mode, options)
+        with self._condition:
+            if self._idle.get(key) or key in self._warming:
+                return
+            if self._total() >= self.max_instances and not self._evict_oldest_idle():
+                return
+            self._warming.add(key)
+            self._reserved += 1
+        detector = None
+        try:
+            detector = create_detector(backend, self.settings, static_mode=static_mode, **options)
+            if warm_frame is not None:
+                detector.detect_faces(warm_frame)
+            if hasattr(detector, 'reset'):
+                detector.reset()
+        except Exception:
+            detector = None
+            raise
+        finally:
+            with self._condition:
+                self._reserved -= 1
+                if detector is not None:
+                    self.created += 1
+                    self._idle.setdefault(key, []).append((detector, time.monotonic()))
+                self._warming.discard(key)
+                self._condition.notify_all()
+
+    def evict_idle(self, max_idle: float = None) -> int:
+        """
+        Evict idle instances.
+
+        Args:
+            max_idle (float): Evict instances idle for longer than this many seconds (None evicts all idle ones).
+
+        Returns:
+            int: The number of instances evicted.
+        """
+        with self._condition:
+            before = self.evicted
+            if max_idle is None:
+                self.evicted += sum(len(items) for items in self._idle.values())
+                self._idle.clear()
+            else:
+                timeout, self.idle_timeout = self.idle_timeout, max_idle
+                self._evict_expired(time.monotonic())
+                self.idle_timeout = timeout
+            self._condition.notify_all()
+            return self.evicted - before
+
+    def stats(self) -> dict:
+        """
+        Get the pool statistics.
+
+        Returns:
+            dict: The number of idle and in-use instances and of instances created, reused and evicted.
+        """
+        with self._condition:
+            return {'idle': sum(len(items) for items in self._idle.values()), 'in_use': len(self._in_use),
+                    'created': self.created, 'reused': self.reused, 'evicted': self.evicted}
@@ -0,0 +1,90 @@
+"""
+Module: detector_profiles.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module reads and writes detector profiles: named detector configurations (a backend and its constructor
+    options such as scaleFactor, minNeighbors, minSize, detection_width or the mesh confidences) along with the
+    latency, recall and precision they were measured at. The autotuner writes the profiles that are Pareto-optimal
+    for speed and recall to a profiles file and marks one of them as the default; each deployment keeps its own
+    profiles file, and the DetectorSettings frame and the command line load the chosen profile from it. This module
+    only depends on the standard library so the settings frame can load profiles without importing OpenCV.
+
+Functions:
+- load_profiles(path) -> dict: Load a profiles file.
+- save_profiles(path, profiles, default, metadata) -> None: Write a profiles file.
+- get_profile(path, name) -> tuple: Get the backend and detector options of a profile.
+
+Constants:
+- PROFILES_FILE: Default name of the profiles file, looked up in the working directory.
+"""
+
+import json
+import os
+
+PROFILES_FILE = 'detector_profiles.json'
+
+
+def load_profiles(path: str = PROFILES_FILE) -> dict:
+    """
+    Load a profiles file.
+
+    Args:
+        path (str): The profiles file.
+
+    Returns:
+        dict: The document with the 'profiles' mapping (name -> backend, options and measurements) and the name of
+              the 'default' profile; empty profiles when the file does not exist.
+    """
+    if not os.path.exists(path):
+        return {'default': None, 'profiles': {}}
+    with open(path) as f:
+        document = json.load(f)
+    document.setdefault('default', None)
+    document.setdefault('profiles', {})
+    return document
+
+
+def save_profiles(path: str, profiles: dict, default: str = None, metadata: dict = None) -> None:
+    """
+    Write a profiles file.
+
+    Args:
+        path (str): The profiles file.
+        profiles (dict): The profiles keyed by name, each with a 'backend' and 'options' (and any measurements).
+        default (str): The name of the profile deployments use unless another one is chosen.
+        metadata (dict): Extra information about how the profiles were made (sample set, machine, ...).
+
+    Returns:
+        None
+    """
+    document = dict(metadata or {})
+    document.update(default=default, profiles=profiles)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+
+
+def get_profile(path: str = PROFILES_FILE, name: str = None) -> tuple:
+    """
+    Get the backend and detector options of a profile.
+
+    Args:
+        path (str): The profiles file.
+        name (str): The name of the profile (defaults to the file's default profile).
+
+    Raises:
+        ValueError: If the profile does not exist.
+
+    Returns:
+        tuple: The backend name and the detector options (JSON lists such as minSize are turned back into tuples).
+    """
+    document = load_profiles(path)
+    name = name or document['default']
+    if name not in document['profiles']:
+        available = ', '.join(document['profiles']) or 'none'
+        raise ValueError(f"Unknown detector profile '{name}' in {path}. Available profiles: {available}")
+    profile = document['profiles'][name]
+    options = {key: tuple(value) if isinstance(value, list) else value
+               for key, value in profile.get('options', {}).items()}
+    return profile['backend'], options
@@ -0,0 +1,152 @@
+"""
+Module: detector_registry.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides the registry of face detector backends. Backends register under a short name with a loader
+    that imports their module only when the backend is first built, so selecting the Haar cascade never pays for
+    importing MediaPipe (and TensorFlow Lite). Both the DetectorSettings frame and the headless entry points select
+    and build detectors through this registry.
+
+Functions:
+- register_backend(name, loader, display_name) -> None: Register a detector backend.
+- available_backends() -> list: Get the names of the registered backends.
+- display_name(name) -> str: Get the name of a backend as shown in the GUI.
+- backend_from_display_name(display) -> str: Get the backend name for a GUI display name.
+- load_backend(name) -> type: Import and return the detector class of a backend.
+- create_detector(name, settings, static_mode, **options) -> object: Build a detector of a backend.
+
+Constants:
+- DEFAULT_BACKEND: Name of the backend used when none is selected.
+"""
+
+import inspect
+
+DEFAULT_BACKEND = 'haar'
+
+# name -> (loader, display name); the loader imports and returns the detector class.
+_BACKENDS = {}
+# name -> detector class, filled in the first time a backend is loaded.
+_LOADED = {}
+
+
+def register_backend(name: str, loader, display_name: str) -> None:
+    """
+    Register a detector backend.
+
+    Args:
+        name (str): The short name the backend is selected by.
+        loader: A callable that imports and returns the detector class. It is only called when the backend is built.
+        display_name (str): The name of the backend as shown in the GUI.
+
+    Returns:
+        None
+    """
+    _BACKENDS[name] = (loader, display_name)
+    _LOADED.pop(name, None)
+
+
+def available_backends() -> list:
+    """
+    Get the names of the registered backends in registration order.
+
+    Returns:
+        list: The backend names.
+    """
+    return list(_BACKENDS)
+
+
+def display_name(name: str) -> str:
+    """
+    Get the name of a backend as shown in the GUI.
+
+    Args:
+        name (str): The backend name.
+
+    Returns:
+        str: The display name.
+    """
+    return _BACKENDS[name][1]
+
+
+def backend_from_display_name(display: str) -> str:
+    """
+    Get the backend name for a GUI display name.
+
+    Args:
+        display (str): The display name.
+
+    Raises:
+        ValueError: If no backend has the display name.
+
+    Returns:
+        str: The backend name.
+    """
+    for name, (_, backend_display) in _BACKENDS.items():
+        if backend_display == display:
+            return name
+    raise ValueError(f"Unknown detector backend '{display}'.")
+
+
+def load_backend(name: str) -> type:
+    """
+    Import and return the detector class of a backend.
+
+    Args:
+        name (str): The backend name.
+
+    Raises:
+        ValueError: If the backend is not registered.
+
+    Returns:
+        type: The detector class.
+    """
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown detector backend '{name}'. Available backends: {', '.join(_BACKENDS)}")
+    if name not in _LOADED:
+        _LOADED[name] = _BACKENDS[name][0]()
+    return _LOADED[name]
+
+
+def create_detector(name: str, settings, static_mode: bool = False, **options):
+    """
+    Build a detector of a backend. Options the backend's constructor does not accept are ignored, so the same
+    options can be passed whichever backend is selected.
+
+    Args:
+        name (str): The backend name.
+        settings: Settings object providing the draw_box and draw_blur flags.
+        static_mode (bool): True for still images, False for videos and realtime feeds (used by backends with a
+                            staticMode parameter).
+        **options: Keyword arguments for the detector's constructor (e.g. detection_width).
+
+    Returns:
+        The detector.
+    """
+    detector_class = load_backend(name)
+    parameters = inspect.signature(detector_class.__init__).parameters
+    kwargs = {key: value for key, value in options.items() if key in parameters}
+    if 'staticMode' in parameters:
+        kwargs['staticMode'] = static_mode
+    return detector_class(settings, **kwargs)
+
+
+def _load_haar() -> type:
+    from face_detection_package.frontal_face_detector import FrontalFaceDetector
+    return FrontalFaceDetector
+
+
+def _load_mesh() -> type:
+    from face_detection_package.mesh_face_detector import FaceMeshDetector
+    return FaceMeshDetector
+
+
+def _load_hybrid() -> type:
+    from face_detection_package.hybrid_face_detector import HybridFaceDetector
+    return HybridFaceDetector
+
+
+register_backend('haar', _load_haar, 'Basic Frontal Face Detector')
+register_backend('mesh', _load_mesh, 'Advanced Mesh Face Detector')
+register_backend('hybrid', _load_hybrid, 'Hybrid Frontal + Mesh Face Detector')
@@ -26,6 +26,10 @@ class DirectoryManager:
         self.recordings_dir = os.path.join(self.root_dir, 'recorded_detections')
         self.videos_dir = os.path.join(self.root_dir, 'video_detections')
         self.images_dir = os.path.join(self.root_dir, 'image_detections')
+        # Metrics files are only written (and the directory created) when metrics export is enabled.
+        self.metrics_dir = os.path.join(self.root_dir, 'metrics')
+        # The detection cache is created on first use.
+        self.cache_dir = os.path.join(self.root_dir, 'detection_cache')
         self.directories = []  # initialize to an empty list
         self.initialize_version()
 
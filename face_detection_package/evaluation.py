@@ -0,0 +1,338 @@
+"""
+Module: evaluation.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module measures detectors against labelled images so that the cost of a faster detector configuration in
+    missed faces is known before it is adopted (every missed face is a face left unredacted). It loads annotation
+    files, matches detected boxes to the annotated faces and runs detector configurations over the annotated images,
+    reporting their precision, recall, intersection over union distribution and throughput side by side. A detection
+    matches an annotated face when their intersection over union reaches the threshold; every face and every
+    detection is matched at most once, best overlaps first. Configurations can be gated on a minimum recall.
+
+    Annotation files are JSON documents listing the images (paths relative to the annotation file) and the x, y, w, h
+    boxes of every face in them:
+
+        {"images": [{"file": "street_01.jpg", "boxes": [[412, 120, 64, 64], [530, 98, 58, 58]]}, ...]}
+
+    or CSV files with a file, x, y, w, h header and one row per face (an image without faces has a row with only its
+    file):
+
+        file,x,y,w,h
+        street_01.jpg,412,120,64,64
+        street_01.jpg,530,98,58,58
+        empty_room.jpg,,,,
+
+    write_draft_annotations writes the detections of a detector in the JSON format; the boxes are a starting point
+    for labelling by hand and are not ground truth until they have been checked and corrected.
+
+Functions:
+- load_annotations(path) -> list: Load the image paths and face boxes of an annotation file.
+- load_samples(path) -> list: Load the images and face boxes of an annotation file.
+- match_boxes(truth, detected, iou_threshold) -> tuple: Match detected boxes to annotated faces.
+- iou_distribution(ious, iou_threshold) -> dict: Summarize the intersection over union of the matches.
+- evaluate_detector(detector, samples, repeat, iou_threshold) -> dict: Measure a detector against annotated samples.
+- evaluate_configurations(annotations_path, configurations, repeat, iou_threshold, min_recall, output_path) -> list:
+  Evaluate detector configurations side by side.
+- write_report(path, results) -> None: Write evaluation results to a JSON or CSV file.
+- write_draft_annotations(image_paths, detector, output_path) -> int: Write a detector's boxes as draft annotations.
+
+Constants:
+- IOU_THRESHOLD: Default intersection over union a detection needs to match an annotated face.
+- IOU_BIN_EDGES: Upper edges of the bins of the intersection over union histogram.
+- CSV_COLUMNS: Columns of CSV annotation files.
+"""
+
+import csv
+import json
+import os
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from face_detection_package.box_utils import iou_matrix
+from face_detection_package.detector_registry import create_detector
+from face_detection_package.headless_settings import HeadlessSettings
+
+IOU_THRESHOLD = 0.5
+IOU_BIN_EDGES = (0.6, 0.7, 0.8, 0.9, 1.0)
+CSV_COLUMNS = ('file', 'x', 'y', 'w', 'h')
+
+
+def _read_csv_annotations(path: str) -> list:
+    images = {}
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{path} is missing the annotation columns {', '.join(missing)}.")
+        for row in reader:
+            boxes = images.setdefault(row['file'], [])
+            if row['x'].strip():
+                boxes.append([int(float(row[column])) for column in CSV_COLUMNS[1:]])
+    return [{'file': file, 'boxes': boxes} for file, boxes in images.items()]
+
+
+def load_annotations(path: str) -> list:
+    """
+    Load the image paths and face boxes of an annotation file.
+
+    Args:
+        path (str): The JSON or CSV (.csv extension) annotation file.
+
+    Raises:
+        ValueError: If the file does not list any images or a CSV file lacks an annotation column.
+
+    Returns:
+        list: An (image path, (N, 4) int array of boxes) tuple for every image.
+    """
+    if os.path.splitext(path)[1].lower() == '.csv':
+        images = _read_csv_annotations(path)
+    else:
+        with open(path) as f:
+            document = json.load(f)
+        if document.get('draft'):
+            print(f"Warning: {path} holds draft annotations that have not been checked by hand.")
+        images = document.get('images', [])
+    base_dir = os.path.dirname(os.path.abspath(path))
+    samples = [(os.path.normpath(os.path.join(base_dir, image['file'])),
+                np.asarray(image.get('boxes', []), dtype=int).reshape(-1, 4)) for image in images]
+    if not samples:
+        raise ValueError(f"No annotated images found in {path}.")
+    return samples
+
+
+def load_samples(path: str) -> list:
+    """
+    Load the images and face boxes of an annotation file.
+
+    Args:
+        path (str): The JSON or CSV annotation file.
+
+    Raises:
+        ValueError: If the file does not list any images or an annotated image cannot be read.
+
+    Returns:
+        list: An (image path, image, (N, 4) int array of boxes) tuple for every image.
+    """
+    samples = []
+    for image_path, boxes in load_annotations(path):
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError(f"Unable to read annotated image {image_path}.")
+        samples.append((image_path, image, boxes))
+    return samples
+
+
+def match_boxes(truth: np.ndarray, detected: np.ndarray, iou_threshold: float = IOU_THRESHOLD) -> tuple:
+    """
+    Match detected boxes to annotated faces, best overlaps first.
+
+    Args:
+        truth (np.ndarray): An (N, 4) array of annotated x, y, w, h boxes.
+        detected (np.ndarray): An (M, 4) array of detected x, y, w, h boxes.
+        iou_threshold (float): The intersection over union a detection needs to match a face.
+
+    Returns:
+        tuple: The number of true positives, false positives and false negatives, and the intersection over union of
+               every match.
+    """
+    truth = np.asarray(truth).reshape(-1, 4)
+    detected = np.asarray(detected).reshape(-1, 4)
+    overlaps = iou_matrix(truth, detected)
+    matched_ious = []
+    if overlaps.size:
+        pairs = np.argwhere(overlaps >= iou_threshold)
+        pairs = pairs[np.argsort(-overlaps[pairs[:, 0], pairs[:, 1]], kind='stable')]
+        used_truth, used_detected = set(), set()
+        for t, d in pairs:
+            if t in used_truth or d in used_detected:
+                continue
+            used_truth.add(t)
+            used_detected.add(d)
+            matched_ious.append(float(overlaps[t, d]))
+    tp = len(matched_ious)
+    return tp, len(detected) - tp, len(truth) - tp, matched_ious
+
+
+def iou_distribution(ious: list, iou_threshold: float = IOU_THRESHOLD) -> dict:
+    """
+    Summarize the intersection over union of the matched detections.
+
+    Args:
+        ious (list): The intersection over union of every match.
+        iou_threshold (float): The threshold the matches were made at (the lower edge of the histogram).
+
+    Returns:
+        dict: The mean, median, 10th percentile and minimum, and a histogram counting the matches per bin (keyed by
+              the bin's range, e.g. '0.50-0.60'). The statistics are None when nothing matched.
+    """
+    edges = [iou_threshold] + [edge for edge in IOU_BIN_EDGES if edge > iou_threshold]
+    counts = np.histogram(ious, bins=edges)[0] if ious else np.zeros(len(edges) - 1, dtype=int)
+    histogram = {f"{low:.2f}-{high:.2f}": int(count) for low, high, count in zip(edges, edges[1:], counts)}
+    if not ious:
+        return {'mean': None, 'median': None, 'p10': None, 'min': None, 'histogram': histogram}
+    return {'mean': float(np.mean(ious)), 'median': float(np.median(ious)), 'p10': float(np.percentile(ious, 10)),
+            'min': float(np.min(ious)), 'histogram': histogram}
+
+
+def evaluate_detector(detector, samples: list, repeat: int = 1, iou_threshold: float = IOU_THRESHOLD) -> dict:
+    """
+    Measure a detector against annotated samples. Every image is detected repeat times and the median time is used.
+
+    Args:
+        detector: The detector (any object with a detect_faces method returning Detections).
+        samples (list): An (image path, image, (N, 4) array of annotated boxes) tuple for every sample image.
+        repeat (int): The timed runs per image.
+        iou_threshold (float): The intersection over union a detection needs to match an annotated face.
+
+    Returns:
+        dict: The image and face counts, match counts, recall, precision, intersection over union distribution, mean
+              latency per image in milliseconds, images per second and the images with missed faces.
+    """
+    detector.detect_faces(samples[0][1])  # warm up
+    latencies, ious, missed_images = [], [], []
+    tp = fp = fn = 0
+    for image_path, image, truth in samples:
+        times = []
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            detections = detector.detect_faces(image)
+            times.append(time.perf_counter() - start)
+        latencies.append(statistics.median(times))
+        matched, false_positives, missed, matched_ious = match_boxes(truth, detections.boxes, iou_threshold)
+        tp, fp, fn = tp + matched, fp + false_positives, fn + missed
+        ious += matched_ious
+        if missed:
+            missed_images.append({'file': image_path, 'missed': missed, 'faces': len(truth)})
+    return {'images': len(samples), 'faces': tp + fn, 'true_positives': tp, 'false_positives': fp,
+            'false_negatives': fn, 'recall': tp / (tp + fn) if tp + fn else 1.0,
+            'precision': tp / (tp + fp) if tp + fp else 1.0, 'iou': iou_distribution(ious, iou_threshold),
+            'latency_ms': statistics.fmean(latencies) * 1000, 'images_per_second': len(latencies) / sum(latencies),
+            'missed_images': missed_images}
+
+
+def _format(value, spec: str) -> str:
+    return 'n/a'.rjust(int(spec.split('.')[0])) if value is None else format(value, spec)
+
+
+def evaluate_configurations(annotations_path: str, configurations: dict, repeat: int = 1,
+                            iou_threshold: float = IOU_THRESHOLD, min_recall: float = None,
+                            output_path: str = None) -> list:
+    """
+    Evaluate detector configurations over an annotated sample set and print their results side by side.
+
+    Args:
+        annotations_path (str): The JSON or CSV annotation file of the sample set.
+        configurations (dict): The (backend, detector options) of every configuration, keyed by name.
+        repeat (int): The timed runs per image.
+        iou_threshold (float): The intersection over union a detection needs to match an annotated face.
+        min_recall (float): If set, configurations below this recall fail the evaluation.
+        output_path (str): If set, the results are also written to this JSON or CSV (.csv extension) file.
+
+    Raises:
+        ValueError: If the annotations cannot be loaded.
+
+    Returns:
+        list: The results of evaluate_detector for every configuration, with its name, backend, options and whether it
+              passed the recall gate (None when there is no gate). Configurations that could not be built or run have
+              an 'error' instead.
+    """
+    samples = load_samples(annotations_path)
+    print(f"Evaluating {len(configurations)} configurations on {len(samples)} images with "
+          f"{sum(len(boxes) for _, _, boxes in samples)} annotated faces (IoU >= {iou_threshold})")
+    results = []
+    for name, (backend, options) in configurations.items():
+        result = {'name': name, 'backend': backend, 'options': options}
+        try:
+            detector = create_detector(backend, HeadlessSettings(), static_mode=True, **options)
+            result.update(evaluate_detector(detector, samples, repeat, iou_threshold))
+            result['passed'] = None if min_recall is None else result['recall'] >= min_recall
+        except Exception as e:
+            print(f"Error evaluating {name}: {e}")
+            result.update(error=str(e), passed=None if min_recall is None else False)
+        results.append(result)
+
+    width = max(len('Configuration'), *(len(name) for name in configurations))
+    print(f"{'Configuration':<{width}}  Recall  Precision  IoU mean  IoU p10   Images/s  ms/image"
+          f"{'  Gate' if min_recall is not None else ''}")
+    for result in results:
+        gate = '' if result['passed'] is None else ('  PASS' if result['passed'] else '  FAIL')
+        if 'error' in result:
+            print(f"{result['name']:<{width}}  error: {result['error']}{gate}")
+            continue
+        print(f"{result['name']:<{width}}  {result['recall']:6.3f}  {result['precision']:9.3f}  "
+              f"{_format(result['iou']['mean'], '8.3f')}  {_format(result['iou']['p10'], '7.3f')}  "
+              f"{result['images_per_second']:9.2f}  {result['latency_ms']:8.2f}{gate}")
+        for missed in result['missed_images']:
+            print(f"{'':<{width}}  missed {missed['missed']} of {missed['faces']} faces in {missed['file']}")
+    if min_recall is not None:
+        failed = [result['name'] for result in results if not result['passed']]
+        print(f"Recall gate {min_recall}: " + (f"failed by {', '.join(failed)}" if failed else 'passed by all'))
+    if output_path:
+        write_report(output_path, results)
+        print(f"Results written to {output_path}")
+    return results
+
+
+def write_report(path: str, results: list) -> None:
+    """
+    Write evaluation results to a JSON file, or to a CSV file (.csv extension) with one row per configuration.
+
+    Args:
+        path (str): The report file.
+        results (list): The results of evaluate_configurations.
+
+    Returns:
+        None
+    """
+    if os.path.splitext(path)[1].lower() != '.csv':
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+        return
+    columns = ('name', 'backend', 'options', 'images', 'faces', 'true_positives', 'false_positives',
+               'false_negatives', 'recall', 'precision', 'iou_mean', 'iou_median', 'iou_p10', 'iou_min',
+               'images_per_second', 'latency_ms', 'passed', 'error')
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for result in results:
+            row = dict(result, options=json.dumps(result['options'], default=str))
+            row.update((f"iou_{key}", value) for key, value in result.get('iou', {}).items() if key != 'histogram')
+            writer.writerow(row)
+
+
+def write_draft_annotations(image_paths: list, detector, output_path: str) -> int:
+    """
+    Write the boxes a detector finds in images as a draft JSON annotation file. The drafts only save typing: every
+    box must be checked, missed faces added and false detections removed by hand before the file is used as ground
+    truth, or the evaluation measures the detector against itself.
+
+    Args:
+        image_paths (list): The images to annotate.
+        detector: The detector proposing the boxes.
+        output_path (str): The annotation file to write (image paths are stored relative to it).
+
+    Returns:
+        int: The number of boxes written.
+    """
+    base_dir = os.path.dirname(os.path.abspath(output_path))
+    images, total = [], 0
+    for image_path in image_paths:
+        image = cv2.imread(image_path)
+        if image is None:
+            print(f"Error: Unable to read image {image_path}.")
+            continue
+        boxes = detector.detect_faces(image).boxes.astype(int).tolist()
+        total += len(boxes)
+        images.append({'file': os.path.relpath(os.path.abspath(image_path), base_dir).replace(os.sep, '/'),
+                       'boxes': boxes})
+    # One image per line keeps the file easy to correct by hand.
+    with open(output_path, 'w') as f:
+        f.write('{"draft": true, "images": [\n')
+        f.write(',\n'.join(f"  {json.dumps(image)}" for image in images))
+        f.write('\n]}\n')
+    return total
@@ -0,0 +1,126 @@
+"""
+Module: frame_buffers.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides a FramePool class that lets capture loops decode frames into reused arrays instead of
+    allocating a new frame for every read. At 4K every frame is 24 MiB, so allocating and freeing one per frame keeps
+    the allocator busy and the resident memory of the process churning.
+
+    Frames are handed on to detection, rendering, display and writer threads and may be held by any of them (a
+    writer's queue, the display queue, the last frame kept to repeat in a recording), so the pool never decides on its
+    own that a frame is done. A buffer is only reused once nothing but the pool refers to it: every queue entry, local
+    variable or view into a frame keeps it out of reuse, and no stage has to give frames back. The pool holds at most
+    max_buffers arrays, which in steady state is the number of frames in flight at once.
+
+Classes:
+- FramePool: Reads frames from a capture into reused buffers.
+
+Functions:
+- reuse_buffer(buffer, shape, dtype) -> np.ndarray: Get a buffer of a shape, reusing the given one when it matches.
+
+Constants:
+- MAX_BUFFERS: Default number of buffers a pool keeps.
+
+Note:
+- Whether a buffer is still in use is read from its reference count (sys.getrefcount), which is exact in CPython.
+"""
+
+import sys
+
+import numpy as np
+
+MAX_BUFFERS = 32
+
+# References to a free buffer: the pool's list and the argument of sys.getrefcount.
+_FREE_REFERENCES = 2
+
+
+class FramePool:
+    """
+    Reads frames from a capture into buffers that are reused once nothing else refers to them. A pool must only be
+    read from by one thread (the capture thread); the frames it returns can be used on any thread.
+    """
+
+    def __init__(self, max_buffers: int = MAX_BUFFERS):
+        """
+        Initialize the FramePool instance.
+
+        Args:
+            max_buffers (int): The most buffers the pool keeps (0 reads every frame into a new array).
+
+        Returns:
+            None
+        """
+        self.max_buffers = max_buffers
+        self._buffers = []
+        self.reused = 0
+        self.allocated = 0
+
+    @property
+    def counters(self) -> dict:
+        return {'frames_reused': self.reused, 'frames_allocated': self.allocated}
+
+    def _free_buffer(self):
+        buffers = self._buffers
+        for i in range(len(buffers)):
+            if sys.getrefcount(buffers[i]) == _FREE_REFERENCES:
+                return i
+        return None
+
+    def read(self, cap) -> tuple:
+        """
+        Read the next frame of a capture, into a free buffer when there is one.
+
+        Args:
+            cap (cv2.VideoCapture): The capture to read from.
+
+        Returns:
+            tuple: The success flag and the frame, like cv2.VideoCapture.read(). The frame stays valid for as long as
+                   it is referenced.
+        """
+        index = self._free_buffer()
+        if index is None:
+            ret, frame = cap.read()
+            if ret:
+                self.allocated += 1
+                if len(self._buffers) < self.max_buffers:
+                    self._buffers.append(frame)
+            return ret, frame
+        ret, frame = cap.read(self._buffers[index])
+        if not ret:
+            return ret, frame
+        if frame is self._buffers[index]:
+            self.reused += 1
+        else:
+            # The capture changed resolution; the buffer of the old size is replaced by the new frame.
+            self.allocated += 1
+            self._buffers[index] = frame
+        return ret, frame
+
+    def clear(self) -> None:
+        """
+        Drop the buffers of the pool (frames still in use stay valid).
+
+        Returns:
+            None
+        """
+        self._buffers = []
+
+
+def reuse_buffer(buffer: np.ndarray, shape: tuple, dtype=np.uint8) -> np.ndarray:
+    """
+    Get a buffer of a shape and type, reusing the given one when it already matches.
+
+    Args:
+        buffer (np.ndarray): The buffer used before, or None.
+        shape (tuple): The shape needed.
+        dtype: The element type needed.
+
+    Returns:
+        np.ndarray: The given buffer, or a new uninitialized one when it did not match.
+    """
+    if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+        return np.empty(shape, dtype=dtype)
+    return buffer
@@ -0,0 +1,155 @@
+"""
+Module: frame_skipping.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides a FrameSkippingDetector class that wraps a face detector so that frames which have not
+    meaningfully changed reuse the detections of the last detected frame. Fixed cameras produce long runs of nearly
+    identical frames; telling them apart only takes a tiny grayscale thumbnail of each frame. The thumbnail is compared
+    to the thumbnail of the last frame that was detected (not the previous frame, so slow drift still adds up to a
+    change) cell by cell, and the frame counts as changed when the mean absolute difference of any cell reaches the
+    threshold. Comparing cells rather than the whole thumbnail keeps a face entering one corner of a quiet scene from
+    being averaged away.
+
+Classes:
+- FrameSkippingDetector: Reuses the previous detections for frames that have not changed.
+
+Functions:
+- skip_unchanged_frames(face_detector, threshold, max_skip) -> object: Wrap a detector when the threshold is above 0.
+
+Constants:
+- THUMBNAIL_WIDTH: Width of the grayscale thumbnails frames are compared at.
+- GRID_COLUMNS: Number of cell columns the difference is measured over (rows follow the aspect ratio).
+- DEFAULT_THRESHOLD: Default mean absolute difference (0-255) a cell must reach for the frame to count as changed.
+- DEFAULT_MAX_SKIP: Default number of consecutive frames after which the detector runs even on an unchanged scene.
+"""
+
+import cv2
+import numpy as np
+
+THUMBNAIL_WIDTH = 64
+GRID_COLUMNS = 8
+DEFAULT_THRESHOLD = 4.0
+DEFAULT_MAX_SKIP = 150
+
+
+class FrameSkippingDetector:
+    """
+    Runs a face detector only on frames that differ from the last detected frame and reuses its detections otherwise.
+    """
+    # Attributes that change the detections (part of the detection cache key, along with the wrapped detector).
+    CACHE_PARAMETERS = ('threshold', 'max_skip')
+
+    def __init__(self, face_detector, threshold: float = DEFAULT_THRESHOLD, max_skip: int = DEFAULT_MAX_SKIP):
+        """
+        Initialize the FrameSkippingDetector instance.
+
+        Args:
+            face_detector: The detector whose detect_faces method runs on changed frames.
+            threshold (float): The mean absolute difference (0-255) a grid cell must reach for the frame to count as
+                               changed.
+            max_skip (int): The detector runs after this many consecutive skipped frames even if nothing changed
+                            (0 for no limit).
+
+        Returns:
+            None
+        """
+        self.face_detector = face_detector
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.version_name = f"{face_detector.version_name} (skipping unchanged frames)"
+        self.frames = 0
+        self.skipped_frames = 0
+        self.reset()
+
+    @property
+    def settings(self):
+        return self.face_detector.settings
+
+    @property
+    def counters(self) -> dict:
+        return {'skipped_frames': self.skipped_frames}
+
+    def reset(self, start_index: int = None) -> None:
+        """
+        Forget the last detected frame so that the next frame runs the detector, and reset the wrapped detector.
+
+        Args:
+            start_index (int): The index of the next frame, passed on to the wrapped detector.
+
+        Returns:
+            None
+        """
+        self.reference = None
+        self.detections = None
+        self.skipped = False
+        self.consecutive_skips = 0
+        if hasattr(self.face_detector, 'reset'):
+            if start_index is None:
+                self.face_detector.reset()
+            else:
+                self.face_detector.reset(start_index)
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        size = (THUMBNAIL_WIDTH, max(1, round(height * THUMBNAIL_WIDTH / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def change(self, thumbnail: np.ndarray) -> float:
+        """
+        Measure how much a frame differs from the last detected frame.
+
+        Args:
+            thumbnail (np.ndarray): The grayscale thumbnail of the frame.
+
+        Returns:
+            float: The largest mean absolute difference of a grid cell (inf when there is no reference yet).
+        """
+        if self.reference is None or self.reference.shape != thumbnail.shape:
+            return float('inf')
+        difference = cv2.absdiff(thumbnail, self.reference)
+        rows = max(1, round(GRID_COLUMNS * thumbnail.shape[0] / thumbnail.shape[1]))
+        cells = cv2.resize(difference.astype(np.float32), (GRID_COLUMNS, rows), interpolation=cv2.INTER_AREA)
+        return float(cells.max())
+
+    def detect_faces(self, frame: np.ndarray):
+        """
+        Detect faces in a frame, or reuse the previous detections when the frame has not changed.
+
+        Args:
+            frame (np.ndarray): The input frame (BGR format). It is not modified.
+
+        Returns:
+            Detections: The detected (or reused) face boxes.
+        """
+        thumbnail = self._thumbnail(frame)
+        self.frames += 1
+        self.skipped = (self.detections is not None and self.change(thumbnail) < self.threshold
+                        and (not self.max_skip or self.consecutive_skips < self.max_skip))
+        if self.skipped:
+            self.skipped_frames += 1
+            self.consecutive_skips += 1
+            return self.detections
+        self.detections = self.face_detector.detect_faces(frame)
+        self.reference = thumbnail
+        self.consecutive_skips = 0
+        return self.detections
+
+
+def skip_unchanged_frames(face_detector, threshold: float = DEFAULT_THRESHOLD, max_skip: int = DEFAULT_MAX_SKIP):
+    """
+    Wrap a detector in a FrameSkippingDetector when unchanged frames should be skipped.
+
+    Args:
+        face_detector: The detector to wrap.
+        threshold (float): The change threshold (0 or None disables skipping).
+        max_skip (int): The maximum number of consecutive skipped frames (0 for no limit).
+
+    Returns:
+        The FrameSkippingDetector, or the detector itself when the threshold is 0 or None.
+    """
+    if threshold and threshold > 0:
+        return FrameSkippingDetector(face_detector, threshold, max_skip)
+    return face_detector
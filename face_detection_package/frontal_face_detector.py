@@ -6,6 +6,11 @@ Date: 12/19/23
 Description:
     This module provides a FrontalFaceDetector class that handles face detection using the OpenCV library.
 
+    With motion gating enabled, a background subtractor (MOG2 or KNN) runs on a small copy of every frame, and between
+    full-frame scans the cascade only searches the foreground regions (cleaned up with morphology, padded and merged
+    into rectangles) plus small windows around previous faces that are no longer moving. When the foreground covers
+    most of the frame (camera motion, lighting changes, a new scene) the whole frame is scanned instead.
+
 Classes:
 - FrontalFaceDetector: Handles face detection using a pre-trained cascade classifier.
 
@@ -16,20 +21,50 @@ Constants:
 - BOX_THICKNESS: Thickness of the bounding box.
 - TEXT_THICKNESS: Thickness of the text overlay.
 - SCALE: Scaling factor for text and box dimensions.
+- ROI_MIN_SIZE_RATIO, ROI_MAX_SIZE_RATIO: Face size range searched around a previous face, relative to its size.
+- CACHE_PARAMETERS: Attributes that change the detections (part of the detection cache key).
+- MOTION_SUBTRACTORS: Names of the background subtractors available for motion gating.
+- MOTION_WIDTH: Width of the frame copy the background subtractor runs on.
+- MOTION_MIN_AREA: Minimum area (at MOTION_WIDTH) of a foreground blob that is searched.
+- MOTION_PADDING: Padding added around foreground regions as a fraction of their larger side.
+- MOTION_MAX_COVERAGE: Foreground fraction above which the whole frame is scanned.
+- MOTION_MIN_WINDOW: Smallest region side the cascade can find a face in.
 
 Methods:
-- __init__(self, draw_box, draw_blur): Initializes the FrontalFaceDetector.
-- detect_faces(self, frame: np.ndarray) -> None: Detects faces in a given frame.
-- draw_rectangle(self, frame, dims): Draws rectangles around detected faces.
+- __init__(self, settings, detection_width, detection_scale, minSize, maxSize, roi_search, full_scan_interval,
+  roi_padding, motion_gating): Initializes the FrontalFaceDetector.
+- detection_scale_for(self, width: int) -> float: Gets the scale detection runs at for a frame width.
+- reset(self, start_index: int) -> None: Forgets previous faces so the next frame gets a full-frame scan.
+- release_buffers(self) -> None: Drops the reused grayscale buffers.
+- detect_faces(self, frame: np.ndarray) -> Detections: Detects faces in a given frame.
 
 Attributes:
 - face_cascade: Cascade classifier for face detection.
 - version_name: Version name of the detector.
-- draw_box: Flag indicating whether to draw bounding boxes.
-- draw_blur: Flag indicating whether to blur detected faces.
+- detection_width: Width frames are downscaled to before detection (None for full resolution).
+- detection_scale: Factor frames are downscaled by before detection when no detection_width is set.
+- scaleFactor: Scale step between the image pyramid levels searched by detectMultiScale.
+- minNeighbors: Number of overlapping candidates detectMultiScale needs to keep a face.
+- minSize: Minimum face size (at full resolution) passed to detectMultiScale.
+- maxSize: Maximum face size (at full resolution) passed to detectMultiScale.
+- roi_search: Flag indicating whether to search only around previous faces between full-frame scans.
+- full_scan_interval: Number of frames between full-frame scans when roi_search is enabled.
+- roi_padding: Padding of the search window around a previous face as a fraction of its size.
+- motion_gating: Name of the background subtractor gating detection to moving regions (None when disabled).
+- full_scans, roi_scans, motion_scans: Number of full-frame, region of interest and motion gated scans made.
+- counters: The scan counters along with the frames where nothing moved and the pixels searched on gated frames.
+- keeps_stream_state: Whether detections depend on previous frames, so the instance must not be shared by streams.
+- settings: Settings object providing the draw_box and draw_blur flags used when the detections are rendered.
+
+Note:
+- The grayscale frame and its downscaled copies are converted into buffers kept between calls, so frames of the same
+  size do not allocate new images.
+- Detections are drawn onto frames with face_detection_package.rendering.render_detections.
 """
 import cv2
 import numpy as np
+from face_detection_package.box_utils import expand_box, group_overlapping, non_max_suppression
+from face_detection_package.detections import Detections
 
 class FrontalFaceDetector:
     """
@@ -41,11 +76,45 @@ class FrontalFaceDetector:
     BOX_THICKNESS = 2
     TEXT_THICKNESS = 1
     SCALE = 1
+    # Scale range searched around a previous face, relative to its size.
+    ROI_MIN_SIZE_RATIO = 0.7
+    ROI_MAX_SIZE_RATIO = 1.5
+    CACHE_PARAMETERS = ('scaleFactor', 'minNeighbors', 'detection_width', 'detection_scale', 'minSize', 'maxSize',
+                        'roi_search', 'full_scan_interval', 'roi_padding', 'motion_gating')
+    MOTION_SUBTRACTORS = ('mog2', 'knn')
+    MOTION_WIDTH = 320
+    MOTION_MIN_AREA = 16
+    MOTION_PADDING = 0.25
+    MOTION_MAX_COVERAGE = 0.5
+    MOTION_MIN_WINDOW = 24
 
-    def __init__(self, settings):
-
+    def __init__(self, settings, detection_width: int = None, detection_scale: float = None, minSize: tuple = None,
+                 maxSize: tuple = None, roi_search: bool = False, full_scan_interval: int = 10,
+                 roi_padding: float = 0.5, motion_gating: str = None, scaleFactor: float = 1.2,
+                 minNeighbors: int = 5):
         """
         Initialize the FrontalFaceDetector with a pre-trained cascade classifier for face detection.
+
+        Args:
+            settings: Settings object providing the draw_box and draw_blur flags used when rendering detections.
+            detection_width (int): If set, frames wider than this are downscaled to this width before detection.
+            detection_scale (float): If set (and below 1), frames are downscaled by this factor before detection.
+                                     Ignored when detection_width is set.
+            minSize (tuple): Minimum (width, height) of a face at full resolution.
+            maxSize (tuple): Maximum (width, height) of a face at full resolution.
+            roi_search (bool): If True, frames between full-frame scans are only searched around previous faces.
+            full_scan_interval (int): With roi_search, the whole frame is scanned on every this many frames.
+            roi_padding (float): With roi_search, the search window around a previous face is padded on every side
+                                 by this fraction of the face size.
+            motion_gating (str): If set ('mog2' or 'knn'), frames between full-frame scans are only searched where
+                                 this background subtractor finds motion and around previous faces.
+            scaleFactor (float): How much the search window grows between scales (smaller is slower but finds more
+                                 face sizes).
+            minNeighbors (int): How many overlapping candidate windows a face needs to be kept (higher drops more
+                                false positives and more faint faces).
+
+        Raises:
+            ValueError: If the motion gating subtractor is unknown.
         """
         # This works for the executable in the fdsw basic folder that access the xml through the package.
         cascade_path = 'face_detection_package/data-files/haarcascade_frontalface_default.xml'
@@ -58,48 +127,294 @@ class FrontalFaceDetector:
 
         self.version_name = "Basic: Frontal Face Detector"
         self.settings = settings
+        # Changing scaleFactor value to 1.2 as to speed up detection time for post-processing video files (was 1.05 causing this issue).
+        # Detector profiles written by the autotuner can set both per deployment.
+        self.scaleFactor = scaleFactor
+        self.minNeighbors = minNeighbors
+        self.detection_width = detection_width
+        self.detection_scale = detection_scale
+        self.minSize = minSize
+        self.maxSize = maxSize
+        self.roi_search = roi_search
+        self.full_scan_interval = max(1, full_scan_interval)
+        self.roi_padding = roi_padding
+        self.motion_gating = motion_gating
+        self.motion_subtractor = self._create_subtractor(motion_gating)
+        self._motion_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        self.release_buffers()
+        self.full_scans = 0
+        self.roi_scans = 0
+        self.motion_scans = 0
+        self.motion_idle_frames = 0
+        self.motion_searched_pixels = 0
+        self.motion_frame_pixels = 0
+        self.reset()
+
+    @property
+    def keeps_stream_state(self) -> bool:
+        # Region of interest search and the background model both carry information from frame to frame.
+        return self.roi_search or self.motion_subtractor is not None
+
+    @property
+    def counters(self) -> dict:
+        counters = {'full_scans': self.full_scans, 'roi_scans': self.roi_scans}
+        if self.motion_subtractor is not None:
+            counters.update(motion_scans=self.motion_scans, motion_idle_frames=self.motion_idle_frames,
+                            motion_searched_pixels=self.motion_searched_pixels,
+                            motion_frame_pixels=self.motion_frame_pixels)
+        return counters
 
-    def detect_faces(self, frame: np.ndarray) -> None:
+    def _create_subtractor(self, motion_gating: str):
+        if not motion_gating:
+            return None
+        if motion_gating == 'mog2':
+            return cv2.createBackgroundSubtractorMOG2(detectShadows=True)
+        if motion_gating == 'knn':
+            return cv2.createBackgroundSubtractorKNN(detectShadows=True)
+        raise ValueError(f"Unknown motion gating '{motion_gating}'. Available: {', '.join(self.MOTION_SUBTRACTORS)}")
+
+    def detection_scale_for(self, width: int) -> float:
         """
-        Detect faces in a given frame using the pre-trained cascade classifier.
+        Get the scale detection runs at for a frame of the given width.
 
         Args:
-            frame (np.ndarray): The input frame in which faces will be detected.
+            width (int): The width of the full resolution frame.
+
+        Returns:
+            float: The downscale factor (1.0 when detecting at full resolution).
+        """
+        if self.detection_width and width > self.detection_width:
+            return self.detection_width / width
+        if self.detection_scale and 0 < self.detection_scale < 1:
+            return self.detection_scale
+        return 1.0
+
+    def reset(self, start_index: int = 0) -> None:
+        """
+        Forget the faces found on previous frames so that the next frame gets a full-frame scan.
+
+        Args:
+            start_index (int): The index of the next frame that will be passed in.
 
         Returns:
             None
         """
-        try:
-            # Convert the frame to grayscale
-            frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self.previous_faces = None
+        self.frame_index = start_index
 
-            # Changing scaleFactor value to 1.2 as to speed up detection time for post-processing video files (was 1.05 causing this issue).
-            faces = self.face_cascade.detectMultiScale(image=frame_gray, scaleFactor=1.2, minNeighbors=5)
+    def release_buffers(self) -> None:
+        """
+        Drop the buffers the grayscale frames are converted into (e.g. when an idle detector should not keep the
+        memory of a large stream). They are allocated again by the next detection.
 
-            # For the x, y coordinates and width, height detected
-            for (x, y, w, h) in faces:
-                dims = [x, y, w, h]
-                self.draw_rectangle(frame, dims)
-
-        except Exception as e:
-            print(f"Error in detect faces: {e}")
-
-    def draw_rectangle(self, frame: np.ndarray, dims: list):
-        try:
-            x, y, w, h = dims
-            # if self.draw_blur is True:
-            if self.settings.draw_blur:
-                # Instead of drawing a rectangle we will first calculate the end coordinates using its boxes start coordinates
-                x2 = x + w
-                y2 = y + h
-                # Then we create a blured image for this area of the original frame
-                blur_img = cv2.blur(frame[y:y2, x:x2], (50, 50))
-                # And lastly we set detected area of the frame equal to the blurred image that we got from the area
-                frame[y:y2, x:x2] = blur_img
-            # if self.draw_box is True:
-            if self.settings.draw_box:
-                # Draw a rectangle around the face using these values
-                cv2.rectangle(frame, (x, y), (x + w, y + h), self.BOX_COLOR, self.BOX_THICKNESS)
-        except Exception as e:
-            print(f"Error in draw rectangle: {e}")
+        Returns:
+            None
+        """
+        self._gray = None
+        self._small_gray = None
+        self._motion_gray = None
+
+    def detect_faces(self, frame: np.ndarray) -> Detections:
+        """
+        Detect faces in a given frame. When a detection resolution is configured the grayscale frame is downscaled
+        once, the cascade runs on the small image and the boxes are mapped back to full resolution. When region of
+        interest search is enabled, frames between full-frame scans are only searched around the previous faces. When
+        motion gating is enabled, they are only searched in moving regions and around previous faces.
+
+        Args:
+            frame (np.ndarray): The input frame (BGR format) in which faces will be detected. It is not modified.
+
+        Returns:
+            Detections: The face boxes in full resolution coordinates (the cascade provides no scores).
+        """
+        # Convert the frame to grayscale
+        # Converted into the buffers of the previous frame; OpenCV only allocates new ones when the size changes.
+        frame_gray = self._gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        frame_h, frame_w = frame_gray.shape
+        scale = self.detection_scale_for(frame_w)
+
+        if scale < 1.0:
+            small_size = (max(1, round(frame_w * scale)), max(1, round(frame_h * scale)))
+            frame_gray = self._small_gray = cv2.resize(frame_gray, small_size, dst=self._small_gray,
+                                                       interpolation=cv2.INTER_AREA)
+        # Face size limits are given at full resolution so they shrink with the image.
+        min_size = tuple(max(1, round(v * scale)) for v in self.minSize) if self.minSize else None
+        max_size = tuple(max(1, round(v * scale)) for v in self.maxSize) if self.maxSize else None
 
+        # The background model learns from every frame, including the ones that get a full scan.
+        motion_regions = self._motion_regions(frame_gray) if self.motion_subtractor is not None else None
+        full_scan_due = self.previous_faces is None or self.frame_index % self.full_scan_interval == 0
+
+        if motion_regions is not None and not full_scan_due:
+            previous_faces = np.round(self.previous_faces * scale).astype(int).reshape(-1, 4)
+            faces = self._search_motion(frame_gray, motion_regions, previous_faces, min_size, max_size)
+            self.motion_scans += 1
+        elif (self.roi_search and self.previous_faces is not None and len(self.previous_faces)
+                and self.frame_index % self.full_scan_interval != 0):
+            faces = self._search_regions(frame_gray, np.round(self.previous_faces * scale).astype(int),
+                                         min_size, max_size)
+            self.roi_scans += 1
+        else:
+            faces = self._detect(frame_gray, min_size, max_size)
+            self.full_scans += 1
+
+        if len(faces) == 0:
+            faces = np.empty((0, 4), dtype=int)
+        faces = np.asarray(faces)
+        if scale < 1.0 and len(faces):
+            faces = np.round(faces / scale).astype(int)
+            # Rounding can push a box just past the frame edge.
+            faces[:, 2] = np.minimum(faces[:, 2], frame_w - faces[:, 0])
+            faces[:, 3] = np.minimum(faces[:, 3], frame_h - faces[:, 1])
+
+        if self.roi_search or self.motion_subtractor is not None:
+            self.previous_faces = faces
+            self.frame_index += 1
+        return Detections(faces)
+
+    def _detect(self, frame_gray: np.ndarray, min_size: tuple = None, max_size: tuple = None) -> np.ndarray:
+        detect_kwargs = {}
+        if min_size:
+            detect_kwargs['minSize'] = min_size
+        if max_size:
+            detect_kwargs['maxSize'] = max_size
+        return self.face_cascade.detectMultiScale(image=frame_gray, scaleFactor=self.scaleFactor,
+                                                  minNeighbors=self.minNeighbors, **detect_kwargs)
+
+    def _motion_regions(self, frame_gray: np.ndarray):
+        """
+        Update the background model with a frame and get the regions that contain motion.
+
+        Args:
+            frame_gray (np.ndarray): The (possibly downscaled) grayscale frame.
+
+        Returns:
+            np.ndarray: The x, y, w, h of the merged moving regions in the coordinates of frame_gray, or None when the
+                        foreground covers too much of the frame to be worth gating.
+        """
+        height, width = frame_gray.shape
+        motion_scale = min(1.0, self.MOTION_WIDTH / width)
+        if motion_scale < 1.0:
+            motion_size = (self.MOTION_WIDTH, max(1, round(height * motion_scale)))
+            small = self._motion_gray = cv2.resize(frame_gray, motion_size, dst=self._motion_gray,
+                                                   interpolation=cv2.INTER_AREA)
+        else:
+            small = frame_gray
+        mask = self.motion_subtractor.apply(small)
+        # Both subtractors mark shadows as 127; only keep confident foreground.
+        _, mask = cv2.threshold(mask, 200, 255, cv2.THRESH_BINARY)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._motion_kernel)
+        mask = cv2.dilate(mask, self._motion_kernel, iterations=2)
+        if cv2.countNonZero(mask) > self.MOTION_MAX_COVERAGE * mask.size:
+            return None
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        rects = [cv2.boundingRect(contour) for contour in contours
+                 if cv2.contourArea(contour) >= self.MOTION_MIN_AREA]
+        if not rects:
+            return np.empty((0, 4), dtype=int)
+        rects = np.round(np.array(rects) / motion_scale).astype(int)
+        regions = []
+        for rect in rects:
+            x1, y1, x2, y2 = expand_box(rect, self.MOTION_PADDING, width, height)
+            regions.append([x1, y1, x2 - x1, y2 - y1])
+        regions = np.array(regions, dtype=int)
+        # Replace every group of overlapping regions by its bounding rectangle until none overlap.
+        while True:
+            groups = group_overlapping(regions)
+            if len(groups) == len(regions):
+                return regions
+            merged = []
+            for group in groups:
+                x1, y1 = regions[group, :2].min(axis=0)
+                x2, y2 = (regions[group, :2] + regions[group, 2:]).max(axis=0)
+                merged.append([x1, y1, x2 - x1, y2 - y1])
+            regions = np.array(merged, dtype=int)
+
+    def _search_motion(self, frame_gray: np.ndarray, regions: np.ndarray, previous_faces: np.ndarray,
+                       min_size: tuple, max_size: tuple) -> np.ndarray:
+        """
+        Search the moving regions of a frame, and windows around previous faces outside of them (faces that stopped
+        moving fade into the background model but are still there).
+
+        Args:
+            frame_gray (np.ndarray): The (possibly downscaled) grayscale frame.
+            regions (np.ndarray): The moving regions in the coordinates of frame_gray.
+            previous_faces (np.ndarray): The previous faces in the coordinates of frame_gray.
+            min_size (tuple): The configured minimum face size in the coordinates of frame_gray.
+            max_size (tuple): The configured maximum face size in the coordinates of frame_gray.
+
+        Returns:
+            np.ndarray: The faces found, in the coordinates of frame_gray.
+        """
+        found = []
+        searched = 0
+        for x, y, w, h in regions:
+            if w < self.MOTION_MIN_WINDOW or h < self.MOTION_MIN_WINDOW:
+                continue
+            for (fx, fy, fw, fh) in self._detect(frame_gray[y:y + h, x:x + w], min_size, max_size):
+                found.append([fx + x, fy + y, fw, fh])
+            searched += w * h
+
+        if len(previous_faces):
+            centers = previous_faces[:, :2] + previous_faces[:, 2:] // 2
+            if len(regions):
+                inside = ((centers[:, None, 0] >= regions[None, :, 0]) &
+                          (centers[:, None, 0] < regions[None, :, 0] + regions[None, :, 2]) &
+                          (centers[:, None, 1] >= regions[None, :, 1]) &
+                          (centers[:, None, 1] < regions[None, :, 1] + regions[None, :, 3])).any(axis=1)
+            else:
+                inside = np.zeros(len(previous_faces), dtype=bool)
+            static_faces = previous_faces[~inside]
+            if len(static_faces):
+                found.extend(self._search_regions(frame_gray, static_faces, min_size, max_size).tolist())
+                height, width = frame_gray.shape
+                for box in static_faces:
+                    x1, y1, x2, y2 = expand_box(box, self.roi_padding, width, height)
+                    searched += (x2 - x1) * (y2 - y1)
+
+        self.motion_searched_pixels += searched
+        self.motion_frame_pixels += frame_gray.size
+        if not searched:
+            self.motion_idle_frames += 1
+        if not found:
+            return np.empty((0, 4), dtype=int)
+        found = np.array(found, dtype=int)
+        # Regions around static faces can overlap moving regions, so the same face can be found more than once.
+        return found[non_max_suppression(found)]
+
+    def _search_regions(self, frame_gray: np.ndarray, previous_faces: np.ndarray, min_size: tuple,
+                        max_size: tuple) -> np.ndarray:
+        """
+        Search padded windows around the previous faces with a scale range narrowed to the size of each face.
+
+        Args:
+            frame_gray (np.ndarray): The (possibly downscaled) grayscale frame.
+            previous_faces (np.ndarray): The previous faces in the coordinates of frame_gray.
+            min_size (tuple): The configured minimum face size in the coordinates of frame_gray.
+            max_size (tuple): The configured maximum face size in the coordinates of frame_gray.
+
+        Returns:
+            np.ndarray: The faces found in the windows, in the coordinates of frame_gray.
+        """
+        height, width = frame_gray.shape
+        found = []
+        for box in previous_faces:
+            x1, y1, x2, y2 = expand_box(box, self.roi_padding, width, height)
+            side_min, side_max = min(box[2], box[3]), max(box[2], box[3])
+            window_min = max(1, int(side_min * self.ROI_MIN_SIZE_RATIO))
+            window_max = min(x2 - x1, y2 - y1, int(side_max * self.ROI_MAX_SIZE_RATIO))
+            if min_size:
+                window_min = max(window_min, min(min_size))
+            if max_size:
+                window_max = min(window_max, max(max_size))
+            if window_max < window_min:
+                continue
+            faces = self._detect(frame_gray[y1:y2, x1:x2], (window_min, window_min), (window_max, window_max))
+            for (x, y, w, h) in faces:
+                found.append([x + x1, y + y1, w, h])
+        if not found:
+            return np.empty((0, 4), dtype=int)
+        found = np.array(found, dtype=int)
+        # Windows of nearby faces overlap, so the same face can be found more than once.
+        return found[non_max_suppression(found)]
@@ -51,7 +51,7 @@ class App(ctk.CTk):
         self.directory_manager = DirectoryManager(self.version)
         self.directory_manager.create_directories()
 
-        size = (600, 370)
+        size = (600, 650)
         self.title('FACE DETECTION SOFTWARE')
         self.geometry(f'{size[0]}x{size[1]}')
         self.minsize(size[0], size[1])
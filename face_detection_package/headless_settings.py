@@ -0,0 +1,45 @@
+"""
+Module: headless_settings.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides a HeadlessSettings class that stands in for the DetectorSettings GUI frame when detections
+    are made without a window (batch runs, worker processes, benchmarks). Detectors only read plain attributes from
+    their settings object, so this class carries the same attributes without any tkinter dependency and can be
+    pickled to worker processes.
+
+Classes:
+- HeadlessSettings: Plain settings container mirroring the attributes of DetectorSettings.
+
+Attributes:
+- draw_box (bool): Indicates whether to display detection bounding boxes.
+- draw_blur (bool): Indicates whether to apply blurring effects to detections.
+- redaction_mode (str): The redaction mode applied to detections when draw_blur is set.
+"""
+
+
+class HeadlessSettings:
+    """
+    Settings container used in place of the DetectorSettings frame when no GUI is running.
+    """
+
+    def __init__(self, draw_box: bool = True, draw_blur: bool = False, redaction_mode: str = 'blur'):
+        """
+        Initialize the HeadlessSettings instance.
+
+        Args:
+            draw_box (bool): Whether to draw bounding boxes around detections.
+            draw_blur (bool): Whether to blur detections.
+            redaction_mode (str): The redaction mode ('blur', 'fast_blur', 'pixelate' or 'fill').
+
+        Returns:
+            None
+        """
+        self.draw_box = draw_box
+        self.draw_blur = draw_blur
+        self.redaction_mode = redaction_mode
+
+    def __repr__(self) -> str:
+        return (f"HeadlessSettings(draw_box={self.draw_box}, draw_blur={self.draw_blur}, "
+                f"redaction_mode={self.redaction_mode!r})")
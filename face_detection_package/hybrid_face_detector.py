@@ -0,0 +1,181 @@
+"""
+Module: hybrid_face_detector.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides a HybridFaceDetector class that combines the speed of the Haar cascade with the precise boxes
+    and landmarks of the MediaPipe face mesh. The cascade runs on a downscaled grayscale frame and proposes face
+    regions; the face mesh then only runs on padded crops of those regions (downscaled to at most CROP_SIZE), and the
+    landmarks are mapped back to frame coordinates. Converting and processing a few small crops costs far less than
+    running the mesh over a whole large frame, so on large frames the hybrid detector runs at close to the cost of the
+    cascade while its boxes come from the mesh.
+
+    The mesh also verifies the proposals: a proposal whose crop holds no face mesh (a cascade false positive) is
+    dropped. Faces the cascade misses are not found, so the proposals are made with fewer neighbors than the plain
+    cascade uses to favour recall.
+
+Classes:
+- HybridFaceDetector: Detects faces with Haar cascade proposals refined by the face mesh.
+
+Constants:
+- PROPOSAL_WIDTH: Width frames are downscaled to for the cascade when no detection resolution is given.
+- PROPOSAL_MIN_NEIGHBORS: The cascade's default minNeighbors for proposals.
+- CROP_PADDING: Default padding of a proposal crop as a fraction of the proposal's larger side.
+- CROP_SIZE: Default largest side crops are downscaled to before the mesh runs on them.
+- DUPLICATE_IOU: Overlap above which two meshes are counted as the same face.
+
+Note:
+- The mesh model runs in static image mode: crops move and change size from frame to frame, so there is no
+  continuous image for the mesh to track faces in. All crops of all frames go through the same FaceMesh instance
+  (one call per crop; the MediaPipe solution API processes a single image per call).
+"""
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from face_detection_package.box_utils import expand_box, non_max_suppression
+from face_detection_package.detections import Detections
+from face_detection_package.frontal_face_detector import FrontalFaceDetector
+
+PROPOSAL_WIDTH = 480
+PROPOSAL_MIN_NEIGHBORS = 3
+CROP_PADDING = 0.5
+CROP_SIZE = 256
+DUPLICATE_IOU = 0.5
+
+
+class HybridFaceDetector:
+    """
+    Detects faces with Haar cascade proposals that the MediaPipe face mesh refines on cropped regions.
+    """
+    # Attributes that change the detections (part of the detection cache key, along with the proposal detector).
+    CACHE_PARAMETERS = ('crop_padding', 'crop_size', 'refine_landmarks', 'minDetectionCon')
+
+    def __init__(self, settings, detection_width: int = None, detection_scale: float = None, roi_search: bool = False,
+                 full_scan_interval: int = 10, roi_padding: float = 0.5, motion_gating: str = None,
+                 crop_padding: float = CROP_PADDING, crop_size: int = CROP_SIZE, refine_landmarks: bool = False,
+                 minDetectionCon: float = 0.5, scaleFactor: float = 1.2, minNeighbors: int = PROPOSAL_MIN_NEIGHBORS,
+                 minSize: tuple = None):
+        """
+        Initialize the HybridFaceDetector instance.
+
+        Args:
+            settings: Settings object providing the draw_box and draw_blur flags used when rendering detections.
+            detection_width (int): Frames wider than this are downscaled to this width for the cascade (defaults to
+                                   PROPOSAL_WIDTH when neither a width nor a scale is given).
+            detection_scale (float): Downscale factor for the cascade when no width is given.
+            roi_search (bool): If True, the cascade only searches around previous faces between full-frame scans.
+            full_scan_interval (int): With roi_search or motion_gating, the cascade scans the full frame every this
+                                      many frames.
+            roi_padding (float): With roi_search, the padding of the search windows as a fraction of the face size.
+            motion_gating (str): If set ('mog2' or 'knn'), the cascade only searches moving regions between full-frame
+                                 scans.
+            crop_padding (float): Padding of every proposal crop as a fraction of the proposal's larger side.
+            crop_size (int): Crops larger than this are downscaled so that their larger side is this many pixels.
+            refine_landmarks (bool): If True, the mesh refines the landmarks around the eyes and lips.
+            minDetectionCon (float): Minimum confidence of the mesh's face detection for a proposal to be kept.
+            scaleFactor (float): The cascade's scale step for proposals.
+            minNeighbors (int): The cascade's minNeighbors for proposals.
+            minSize (tuple): Minimum (width, height) of a proposed face at full resolution.
+
+        Returns:
+            None
+        """
+        if detection_width is None and detection_scale is None:
+            detection_width = PROPOSAL_WIDTH
+        # The proposal detector is exposed as face_detector so that its counters and cache parameters are included.
+        self.face_detector = FrontalFaceDetector(settings, detection_width=detection_width,
+                                                 detection_scale=detection_scale, roi_search=roi_search,
+                                                 full_scan_interval=full_scan_interval, roi_padding=roi_padding,
+                                                 motion_gating=motion_gating, scaleFactor=scaleFactor,
+                                                 minNeighbors=minNeighbors, minSize=minSize)
+        self.crop_padding = crop_padding
+        self.crop_size = crop_size
+        self.refine_landmarks = refine_landmarks
+        self.minDetectionCon = minDetectionCon
+        # A crop is expected to hold the proposed face; neighbours reaching into the padding have their own crop.
+        self.faceMesh = mp.solutions.face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1,
+                                                        refine_landmarks=refine_landmarks,
+                                                        min_detection_confidence=minDetectionCon)
+        self.settings = settings
+        self.version_name = 'Hybrid: Frontal Face Proposals + Mesh'
+        self.proposals = 0
+        self.confirmed_faces = 0
+
+    @property
+    def keeps_stream_state(self) -> bool:
+        return self.face_detector.keeps_stream_state
+
+    @property
+    def counters(self) -> dict:
+        return {'proposals': self.proposals, 'confirmed_faces': self.confirmed_faces}
+
+    def reset(self, start_index: int = 0) -> None:
+        """
+        Reset the proposal detector so that the next frame gets a full-frame scan.
+
+        Args:
+            start_index (int): The index of the next frame that will be passed in.
+
+        Returns:
+            None
+        """
+        self.face_detector.reset(start_index)
+
+    def _mesh_landmarks(self, frame: np.ndarray, region: tuple):
+        """
+        Run the face mesh on a region of the frame.
+
+        Args:
+            frame (np.ndarray): The full frame (BGR format).
+            region (tuple): The x1, y1, x2, y2 corners of the crop.
+
+        Returns:
+            np.ndarray: The (K, 2) landmark pixel coordinates in frame space, or None if the crop holds no face.
+        """
+        x1, y1, x2, y2 = region
+        crop = frame[y1:y2, x1:x2]
+        crop_w, crop_h = x2 - x1, y2 - y1
+        if max(crop_w, crop_h) > self.crop_size:
+            scale = self.crop_size / max(crop_w, crop_h)
+            crop = cv2.resize(crop, (max(1, round(crop_w * scale)), max(1, round(crop_h * scale))),
+                              interpolation=cv2.INTER_AREA)
+        results = self.faceMesh.process(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+        if not results.multi_face_landmarks:
+            return None
+        # Landmarks are normalized to the crop, so the crop's full resolution size maps them back.
+        points = np.array([(lm.x, lm.y) for lm in results.multi_face_landmarks[0].landmark], dtype=np.float32)
+        return points * (crop_w, crop_h) + (x1, y1)
+
+    def detect_faces(self, frame: np.ndarray) -> Detections:
+        """
+        Detect faces in a frame: the cascade proposes regions and the face mesh runs on a padded crop of each.
+
+        Args:
+            frame (np.ndarray): The input frame (BGR format). It is not modified.
+
+        Returns:
+            Detections: The bounding boxes of the face meshes along with their landmark pixel coordinates.
+        """
+        proposals = self.face_detector.detect_faces(frame).boxes
+        self.proposals += len(proposals)
+        frame_h, frame_w = frame.shape[:2]
+        boxes, landmarks = [], []
+        for proposal in proposals:
+            region = expand_box(proposal, self.crop_padding, frame_w, frame_h)
+            if region[2] <= region[0] or region[3] <= region[1]:
+                continue
+            points = self._mesh_landmarks(frame, region)
+            if points is None:
+                continue
+            x_min, y_min = np.maximum(np.floor(points.min(axis=0)).astype(int), 0)
+            x_max, y_max = np.minimum(np.ceil(points.max(axis=0)).astype(int), (frame_w, frame_h))
+            boxes.append([x_min, y_min, max(0, x_max - x_min), max(0, y_max - y_min)])
+            landmarks.append(points)
+        if not boxes:
+            return Detections()
+        # Overlapping proposals can find the same face twice.
+        keep = non_max_suppression(np.array(boxes), iou_threshold=DUPLICATE_IOU)
+        self.confirmed_faces += len(keep)
+        return Detections(np.array(boxes)[keep], landmarks=np.array(landmarks)[keep])
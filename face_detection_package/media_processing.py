@@ -0,0 +1,284 @@
+"""
+Module: media_processing.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides the GUI-independent functions that run a face detector over a video or image file and save
+    the output. Both the post-processing frame and the headless batch runner call these functions so that a file
+    processed from either entry point comes out the same way. Detections are rendered with the effects selected in
+    the detector's settings, or, in detect-only mode, saved to a sidecar file without drawing or re-encoding anything.
+    When a DetectionCache is given, the detections of a file processed before with the same detector parameters are
+    loaded from it and only rendering runs. Video frames are decoded into a FramePool, so once the writer has encoded
+    a frame its array is reused for a later one instead of a new frame being allocated for every read.
+
+Functions:
+- make_output_path(directory, src_path, timestamp, extension, name) -> str: Build the output path for a processed file.
+- reset_detector(face_detector) -> None: Clear the per-stream state of a detector before a new stream.
+- detect_over_video_file(face_detector, video_path, video_path_out, metrics, show_fps, writer, writer_options,
+  cache) -> int: Detect faces in every frame of a video.
+- detect_over_image_file(face_detector, img_path, img_path_out, cache) -> None: Detect faces in an image.
+- detect_video_to_sidecar(face_detector, video_path, sidecar_path, sidecar_format, metrics) -> int: Save the faces of
+  every frame of a video to a sidecar file.
+- detect_image_to_sidecar(face_detector, img_path, sidecar_path, sidecar_format) -> int: Save the faces of an image
+  to a sidecar file.
+
+Constants:
+- VIDEO_EXTENSIONS: File extensions accepted as videos.
+- IMAGE_EXTENSIONS: File extensions accepted as images.
+"""
+
+import os
+import time
+import cv2
+from face_detection_package.frame_buffers import FramePool
+from face_detection_package.metrics import RunMetrics, draw_fps_overlay
+from face_detection_package.output_writers import DEFAULT_WRITER, create_writer
+from face_detection_package.rendering import render_detections
+from face_detection_package.sidecar import DEFAULT_SIDECAR_FORMAT, SidecarWriter
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov')
+IMAGE_EXTENSIONS = ('.png', '.jpg')
+
+
+def make_output_path(directory: str, src_path: str, timestamp: str, extension: str, name: str = None) -> str:
+    """
+    Build the output path for a processed file using the naming convention of the detections directories.
+
+    Args:
+        directory (str): The directory the output is saved to.
+        src_path (str): The path of the file being processed.
+        timestamp (str): The timestamp of the run.
+        extension (str): The output file extension (e.g. '.mp4').
+        name (str): The name the output is built from (defaults to the file name of src_path).
+
+    Returns:
+        str: The output path.
+    """
+    return os.path.join(directory, f'{name or os.path.basename(src_path)}_{timestamp}_detections{extension}')
+
+
+def reset_detector(face_detector) -> None:
+    """
+    Clear the state a detector keeps between frames (tracked or previous faces) before a new stream starts.
+
+    Args:
+        face_detector: The detector to reset. Detectors without per-stream state are left untouched.
+
+    Returns:
+        None
+    """
+    if hasattr(face_detector, 'reset'):
+        face_detector.reset()
+
+
+def detect_over_video_file(face_detector, video_path: str, video_path_out: str, metrics=None,
+                           show_fps: bool = False, writer: str = DEFAULT_WRITER, writer_options: dict = None,
+                           cache=None) -> int:
+    """
+    Process a video file, detect faces in each frame, and save the output.
+
+    Args:
+        face_detector: The detector whose detect_faces method is called on every frame.
+        video_path (str): The path of the video to process.
+        video_path_out (str): The path the processed video is saved to.
+        metrics (RunMetrics): If given, the capture, detect, render and write stages are recorded in it and it is
+                              periodically exported while the video is processed.
+        show_fps (bool): Whether to draw the processing frame rate onto the frames.
+        writer (str): The output writer backend ('video', 'ffmpeg' or 'jpeg'). Encoding runs on the writer's own
+                      thread so it overlaps with detection.
+        writer_options (dict): Keyword arguments for the writer (e.g. fourcc).
+        cache (DetectionCache): If given, the detections are loaded from it when the video was processed before with
+                                the same detector parameters, and stored in it otherwise.
+
+    Raises:
+        ValueError: If the video cannot be opened or contains no frames.
+
+    Returns:
+        int: The number of frames processed.
+    """
+    cap = cv2.VideoCapture(video_path)
+    frames = FramePool()
+    ret, frame = frames.read(cap)
+    if not ret:
+        cap.release()
+        raise ValueError(f"Unable to read frames from {video_path}.")
+
+    out = create_writer(writer, video_path_out, cap.get(cv2.CAP_PROP_FPS), **(writer_options or {}))
+
+    reset_detector(face_detector)
+    report = metrics is not None
+    metrics = metrics if report else RunMetrics('video')
+    metrics.watch_detector(face_detector)
+    cache_key = cached = recorded = None
+    if cache is not None:
+        cache_key = cache.key_for(video_path, face_detector)
+        cached = cache.get(cache_key)
+        metrics.increment('cache_misses' if cached is None else 'cache_hits')
+        recorded = [] if cached is None else None
+    frame_count = 0
+    try:
+        while ret:
+            start = time.perf_counter()
+            if cached is not None and frame_count < len(cached):
+                detections = cached[frame_count]
+            else:
+                detections = face_detector.detect_faces(frame)
+                if recorded is not None:
+                    recorded.append(detections)
+            detected = time.perf_counter()
+            render_detections(frame, detections, face_detector.settings)
+            rendered = time.perf_counter()
+            metrics.record_frame(len(detections))
+            if show_fps:
+                draw_fps_overlay(frame, metrics.recent_fps())
+            out.write(frame)
+            written = time.perf_counter()
+            ret, frame = frames.read(cap)
+            metrics.observe('detect', detected - start)
+            metrics.observe('render', rendered - detected)
+            metrics.observe('write', written - rendered)
+            if ret:
+                metrics.observe('capture', time.perf_counter() - written)
+            metrics.maybe_export()
+            frame_count += 1
+        if recorded is not None:
+            cache.put(cache_key, recorded, video_path)
+    finally:
+        cap.release()
+        out.release()
+        metrics.increment('frame_allocations', frames.allocated)
+        if report:
+            print(metrics.summary())
+            try:
+                metrics.export()
+            except OSError as e:
+                print(f"Error exporting metrics: {e}")
+    return frame_count
+
+
+def detect_over_image_file(face_detector, img_path: str, img_path_out: str, cache=None) -> None:
+    """
+    Process an image file, detect faces, and save the output.
+
+    Args:
+        face_detector: The detector whose detect_faces method is called on the image.
+        img_path (str): The path of the image to process.
+        img_path_out (str): The path the processed image is saved to.
+        cache (DetectionCache): If given, the detections are loaded from it when the image was processed before with
+                                the same detector parameters, and stored in it otherwise.
+
+    Raises:
+        ValueError: If the image cannot be read.
+
+    Returns:
+        None
+    """
+    img = cv2.imread(img_path)
+    if img is None:
+        raise ValueError(f"Unable to read image {img_path}.")
+    reset_detector(face_detector)
+    cached = None
+    if cache is not None:
+        cache_key = cache.key_for(img_path, face_detector)
+        cached = cache.get(cache_key)
+    if cached:
+        detections = cached[0]
+    else:
+        detections = face_detector.detect_faces(img)
+        if cache is not None:
+            cache.put(cache_key, [detections], img_path)
+    render_detections(img, detections, face_detector.settings)
+    cv2.imwrite(img_path_out, img)
+
+
+def detect_video_to_sidecar(face_detector, video_path: str, sidecar_path: str,
+                            sidecar_format: str = DEFAULT_SIDECAR_FORMAT, metrics=None) -> int:
+    """
+    Process a video file and save the faces found in each frame to a sidecar file. Nothing is drawn and no video is
+    written.
+
+    Args:
+        face_detector: The detector whose detect_faces method is called on every frame.
+        video_path (str): The path of the video to process.
+        sidecar_path (str): The path the sidecar is saved to.
+        sidecar_format (str): The sidecar format ('jsonl' or 'npz').
+        metrics (RunMetrics): If given, the capture and detect stages are recorded in it and it is periodically
+                              exported while the video is processed.
+
+    Raises:
+        ValueError: If the video cannot be opened or contains no frames.
+
+    Returns:
+        int: The number of frames processed.
+    """
+    cap = cv2.VideoCapture(video_path)
+    frames = FramePool()
+    ret, frame = frames.read(cap)
+    if not ret:
+        cap.release()
+        raise ValueError(f"Unable to read frames from {video_path}.")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+
+    reset_detector(face_detector)
+    report = metrics is not None
+    metrics = metrics if report else RunMetrics('video')
+    metrics.watch_detector(face_detector)
+    frame_count = 0
+    try:
+        with SidecarWriter(sidecar_path, sidecar_format, source=video_path, fps=fps or None,
+                           frame_size=(frame.shape[1], frame.shape[0])) as sidecar:
+            while ret:
+                start = time.perf_counter()
+                detections = face_detector.detect_faces(frame)
+                detected = time.perf_counter()
+                metrics.record_frame(len(detections))
+                sidecar.write(frame_count, frame_count / fps if fps > 0 else cap.get(cv2.CAP_PROP_POS_MSEC) / 1000,
+                              detections)
+                written = time.perf_counter()
+                ret, frame = frames.read(cap)
+                metrics.observe('detect', detected - start)
+                metrics.observe('write', written - detected)
+                if ret:
+                    metrics.observe('capture', time.perf_counter() - written)
+                metrics.maybe_export()
+                frame_count += 1
+    finally:
+        cap.release()
+        metrics.increment('frame_allocations', frames.allocated)
+        if report:
+            print(metrics.summary())
+            try:
+                metrics.export()
+            except OSError as e:
+                print(f"Error exporting metrics: {e}")
+    return frame_count
+
+
+def detect_image_to_sidecar(face_detector, img_path: str, sidecar_path: str,
+                            sidecar_format: str = DEFAULT_SIDECAR_FORMAT) -> int:
+    """
+    Process an image file and save the faces found to a sidecar file (a single frame at time 0). The image is not
+    drawn on or written.
+
+    Args:
+        face_detector: The detector whose detect_faces method is called on the image.
+        img_path (str): The path of the image to process.
+        sidecar_path (str): The path the sidecar is saved to.
+        sidecar_format (str): The sidecar format ('jsonl' or 'npz').
+
+    Raises:
+        ValueError: If the image cannot be read.
+
+    Returns:
+        int: The number of faces found.
+    """
+    img = cv2.imread(img_path)
+    if img is None:
+        raise ValueError(f"Unable to read image {img_path}.")
+    reset_detector(face_detector)
+    detections = face_detector.detect_faces(img)
+    with SidecarWriter(sidecar_path, sidecar_format, source=img_path,
+                       frame_size=(img.shape[1], img.shape[0])) as sidecar:
+        sidecar.write(0, 0.0, detections)
+    return len(detections)
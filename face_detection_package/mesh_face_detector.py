@@ -17,17 +17,18 @@ Constants:
 - BOX_THICKNESS: Thickness of the bounding box.
 - TEXT_THICKNESS: Thickness of the text overlay.
 - SCALE: Scaling factor for text and box dimensions.
+- CACHE_PARAMETERS: Attributes that change the detections (part of the detection cache key).
 
 Methods:
 - __init__(self, draw_box, draw_blur, staticMode, maxFaces=10, refine_landmarks=False,
           minDetectionCon=0.2, minTrackCon=0.2): Initializes the FaceMeshDetector object.
-- detect_faces(self, frame: np.ndarray) -> None: Detects facial landmarks in an image.
-- draw_rectangle(self, frame: np.ndarray, faceLms: mp.solutions.face_mesh.NamedTuple) -> None:
-  Draws a bounding box around the detected face mesh.
+- detect_faces(self, frame: np.ndarray) -> Detections: Detects facial landmarks in an image.
+- release_buffers(self) -> None: Drops the reused RGB buffer.
+- landmarks_to_box(faceLms, iw, ih) -> list: Gets the bounding box of a face mesh.
 
 Attributes:
 - results: Store the results of face detection and landmarks.
-- imgRGB: Store the RGB version of the input image.
+- imgRGB: Buffer the RGB version of the input image is converted into (reused while the frame size stays the same).
 - staticMode: Flag for static mode.
 - maxFaces: Maximum number of faces to detect.
 - refine_landmarks: Flag for refining landmarks.
@@ -40,11 +41,16 @@ Attributes:
 - draw_box: Flag indicating whether to draw bounding boxes.
 - draw_blur: Flag indicating whether to blur detected faces.
 - version_name: Version name of the detector.
+- keeps_stream_state: Whether detections depend on previous frames (FaceMesh tracks faces in video mode).
+
+Note:
+- Detections are drawn onto frames with face_detection_package.rendering.render_detections.
 """
 
 import cv2
 import mediapipe as mp
 import numpy as np
+from face_detection_package.detections import Detections
 
 
 class FaceMeshDetector:
@@ -59,6 +65,7 @@ class FaceMeshDetector:
     # SCALE = 0.5
     TEXT_THICKNESS = 1
     SCALE = 1
+    CACHE_PARAMETERS = ('staticMode', 'maxFaces', 'refine_landmarks', 'minDetectionCon', 'minTrackCon')
 
     # def __init__(self, draw_box, draw_blur, staticMode, maxFaces=10, refine_landmarks=False, minDetectionCon=0.2,
     def __init__(self, settings, staticMode, maxFaces=10, refine_landmarks=False, minDetectionCon=0.2,
@@ -98,57 +105,68 @@ class FaceMeshDetector:
         # self.draw_blur = draw_blur
         self.version_name = 'Advanced: Mesh Face Detector'
 
-    def detect_faces(self, frame: np.ndarray) -> None:
+    @property
+    def keeps_stream_state(self) -> bool:
+        return not self.staticMode
+
+    def detect_faces(self, frame: np.ndarray) -> Detections:
         """
         Detects facial landmarks in an image.
 
         Args:
-            frame (numpy.ndarray): Input image (BGR format).
+            frame (numpy.ndarray): Input image (BGR format). It is not modified.
 
         Returns:
-            None
+            Detections: The bounding boxes of the face meshes along with their landmark pixel coordinates.
         """
-        try:
-            self.imgRGB = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)  # Convert BGR image to RGB
-            self.results = self.faceMesh.process(self.imgRGB)  # Process the image with the face mesh model
+        # Convert BGR image to RGB into the buffer of the previous frame (only reallocated when the size changes)
+        self.imgRGB = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.imgRGB)
+        self.results = self.faceMesh.process(self.imgRGB)  # Process the image with the face mesh model
+
+        if not self.results.multi_face_landmarks:
+            return Detections()
+        ih, iw = frame.shape[:2]
+        boxes, landmarks = [], []
+        for faceLms in self.results.multi_face_landmarks:
+            boxes.append(self.landmarks_to_box(faceLms, iw, ih))
+            landmarks.append([(lm.x * iw, lm.y * ih) for lm in faceLms.landmark])
+        return Detections(boxes, landmarks=landmarks)
+
+    def release_buffers(self) -> None:
+        """
+        Drop the RGB buffer (e.g. when an idle detector should not keep the memory of a large stream). It is allocated
+        again by the next detection.
 
-            if self.results.multi_face_landmarks:
-                for faceLms in self.results.multi_face_landmarks:
-                    self.draw_rectangle(frame, faceLms)
-        except Exception as e:
-            print(f"Error in detect faces: {e}")
+        Returns:
+            None
+        """
+        self.imgRGB = None
 
-    def draw_rectangle(self, frame: np.ndarray, faceLms: mp.solutions.face_mesh.NamedTuple) -> None:
+    @staticmethod
+    def landmarks_to_box(faceLms: mp.solutions.face_mesh.NamedTuple, iw: int, ih: int) -> list:
         """
-        Draws a bounding box around the detected face mesh.
+        Gets the bounding box of a face mesh, clipped to the image.
 
         Args:
-            frame (numpy.ndarray): Input image (BGR format).
             faceLms (typing.NamedTuple): Detected face landmarks.
+            iw (int): The image width.
+            ih (int): The image height.
 
         Returns:
-            None
+            list: The x, y, w, h of the box.
         """
-        try:
-            # Get bounding box coordinates
-            ih, iw, ic = frame.shape
-            x_min, x_max, y_min, y_max = iw, 0, ih, 0
-
-            for id, lm in enumerate(faceLms.landmark):
-                x, y = int(lm.x * iw), int(lm.y * ih)
-                if x < x_min:
-                    x_min = x
-                if x > x_max:
-                    x_max = x
-                if y < y_min:
-                    y_min = y
-                if y > y_max:
-                    y_max = y
-            if self.settings.draw_blur:
-                blur_img = cv2.blur(frame[y_min:y_max, x_min:x_max], (50, 50))
-                frame[y_min:y_max, x_min:x_max] = blur_img
-            if self.settings.draw_box:
-                cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), self.BOX_COLOR, self.BOX_THICKNESS)
-        except Exception as e:
-            print(f"Error in draw rectangle: {e}")
-
+        x_min, x_max, y_min, y_max = iw, 0, ih, 0
+
+        for id, lm in enumerate(faceLms.landmark):
+            x, y = int(lm.x * iw), int(lm.y * ih)
+            if x < x_min:
+                x_min = x
+            if x > x_max:
+                x_max = x
+            if y < y_min:
+                y_min = y
+            if y > y_max:
+                y_max = y
+        x_min, y_min = max(0, x_min), max(0, y_min)
+        x_max, y_max = min(iw, x_max), min(ih, y_max)
+        return [x_min, y_min, max(0, x_max - x_min), max(0, y_max - y_min)]
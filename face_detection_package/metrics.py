@@ -0,0 +1,455 @@
+"""
+Module: metrics.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides the instrumentation used by the realtime and video processing loops. A RunMetrics object
+    records latency histograms for the capture, detect, render, write and display stages, the number of faces per
+    frame, dropped frames and the effective frame rate. It can periodically rewrite a JSON file or a Prometheus text
+    file (for the node exporter's textfile collector) so a live run can be watched from outside the application, and
+    an FPS overlay can be drawn onto frames.
+
+Classes:
+- Histogram: Fixed-bucket histogram of observed values.
+- RunMetrics: Thread-safe metrics of a single processing run with periodic export.
+
+Functions:
+- detector_counters(face_detector) -> collections.Counter: Collect the event counters of a detector and its wrapped
+  detectors.
+- create_run_metrics(name, export_format, directory) -> RunMetrics: Build the metrics of a run exporting to a directory.
+- draw_fps_overlay(frame, fps) -> None: Draw the frame rate onto a frame.
+
+Constants:
+- STAGES: Names of the timed processing stages.
+- LATENCY_BUCKETS_MS: Upper bounds in milliseconds of the stage latency histogram buckets.
+- FACE_BUCKETS: Upper bounds of the faces per frame histogram buckets.
+- EXPORT_FORMATS: Names of the supported export formats.
+- EXPORT_INTERVAL: Default number of seconds between exports.
+- METRIC_PREFIX: Prefix of the exported Prometheus metric names.
+"""
+
+import bisect
+import collections
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+STAGES = ('capture', 'detect', 'render', 'write', 'display')
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+FACE_BUCKETS = (0, 1, 2, 3, 5, 10, 20)
+EXPORT_FORMATS = ('json', 'prometheus')
+EXPORT_INTERVAL = 5.0
+METRIC_PREFIX = 'face_detection'
+
+# Number of recent frames the current (overlay) frame rate is measured over.
+_RECENT_FRAMES = 30
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of observed values (not thread-safe on its own; RunMetrics guards it).
+    """
+
+    def __init__(self, buckets: tuple):
+        """
+        Initialize the Histogram instance.
+
+        Args:
+            buckets (tuple): The increasing upper bounds of the buckets; larger values go to an overflow bucket.
+
+        Returns:
+            None
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Record a value.
+
+        Args:
+            value (float): The observed value.
+
+        Returns:
+            None
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in.
+
+        Args:
+            q (float): The quantile between 0 and 1.
+
+        Returns:
+            float: The estimate (the largest observed value for the overflow bucket, 0 when empty).
+        """
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return float(min(bound, self.max))
+        return float(self.max)
+
+    def cumulative_counts(self) -> list:
+        """
+        Get the cumulative count of every bucket, ending with the overflow bucket (the total count).
+
+        Returns:
+            list: The cumulative counts.
+        """
+        return [int(v) for v in np.cumsum(self.counts)]
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.cumulative_counts())),
+        }
+
+
+class RunMetrics:
+    """
+    Thread-safe metrics of a single processing run (a webcam feed or a video file) with periodic export.
+    """
+
+    def __init__(self, name: str, export_path: str = None, export_format: str = None,
+                 export_interval: float = EXPORT_INTERVAL):
+        """
+        Initialize the RunMetrics instance.
+
+        Args:
+            name (str): The name of the run, exported as the 'run' label.
+            export_path (str): The file the metrics are periodically rewritten to (None disables exporting).
+            export_format (str): 'json' or 'prometheus' (by default '.prom' files are Prometheus, others JSON).
+            export_interval (float): The minimum number of seconds between periodic exports.
+
+        Raises:
+            ValueError: If the export format is unknown.
+
+        Returns:
+            None
+        """
+        if export_format is None:
+            export_format = 'prometheus' if export_path and export_path.endswith('.prom') else 'json'
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown metrics format '{export_format}'. "
+                             f"Available formats: {', '.join(EXPORT_FORMATS)}")
+        self.name = name
+        self.export_path = export_path
+        self.export_format = export_format
+        self.export_interval = export_interval
+        self.latencies = {stage: Histogram(LATENCY_BUCKETS_MS) for stage in STAGES}
+        self.faces = Histogram(FACE_BUCKETS)
+        self.frames = 0
+        self.dropped = collections.Counter()
+        self.counters = collections.Counter()
+        self._detector = None
+        self._detector_baseline = collections.Counter()
+        self.start_time = time.perf_counter()
+        self._recent = collections.deque(maxlen=_RECENT_FRAMES)
+        self._last_export = self.start_time
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """
+        Record the time one frame spent in a stage.
+
+        Args:
+            stage (str): The name of the stage.
+            seconds (float): The time spent on the frame.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if stage not in self.latencies:
+                self.latencies[stage] = Histogram(LATENCY_BUCKETS_MS)
+            self.latencies[stage].observe(seconds * 1000)
+
+    @contextmanager
+    def time(self, stage: str):
+        """
+        Context manager recording the time spent inside it as one frame of a stage.
+
+        Args:
+            stage (str): The name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def record_frame(self, faces: int) -> None:
+        """
+        Record a processed frame and the number of faces found in it.
+
+        Args:
+            faces (int): The number of faces.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.frames += 1
+            self.faces.observe(faces)
+            self._recent.append(time.perf_counter())
+
+    def record_drop(self, reason: str, count: int = 1) -> None:
+        """
+        Record frames that were dropped instead of processed or shown.
+
+        Args:
+            reason (str): Where the frames were dropped (e.g. 'display'), exported as the 'reason' label.
+            count (int): The number of frames.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.dropped[reason] += count
+
+    def increment(self, counter: str, count: int = 1) -> None:
+        """
+        Increment a named event counter (e.g. cache hits).
+
+        Args:
+            counter (str): The name of the counter.
+            count (int): The amount to add.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.counters[counter] += count
+
+    def watch_detector(self, face_detector) -> None:
+        """
+        Include the event counters of a detector (and the detectors it wraps) in the counters of this run, counting
+        from now on.
+
+        Args:
+            face_detector: The detector of the run.
+
+        Returns:
+            None
+        """
+        self._detector = face_detector
+        self._detector_baseline = detector_counters(face_detector)
+
+    def _all_counters(self) -> dict:
+        counters = collections.Counter(self.counters)
+        if self._detector is not None:
+            current = detector_counters(self._detector)
+            counters.update({event: count - self._detector_baseline[event] for event, count in current.items()})
+        return dict(+counters)
+
+    def fps(self) -> float:
+        """
+        Get the effective frame rate since the run started.
+
+        Returns:
+            float: Processed frames per second.
+        """
+        elapsed = time.perf_counter() - self.start_time
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def recent_fps(self) -> float:
+        """
+        Get the frame rate over the most recent frames.
+
+        Returns:
+            float: Processed frames per second.
+        """
+        with self._lock:
+            if len(self._recent) < 2:
+                return 0.0
+            return (len(self._recent) - 1) / max(self._recent[-1] - self._recent[0], 1e-9)
+
+    def snapshot(self) -> dict:
+        """
+        Get all metrics.
+
+        Returns:
+            dict: The run name, elapsed time, frames, fps, dropped frames, counters and the latency (milliseconds) and
+                  faces per frame histograms.
+        """
+        fps, recent_fps = self.fps(), self.recent_fps()
+        counters = self._all_counters()
+        with self._lock:
+            return {
+                'run': self.name,
+                'elapsed_seconds': time.perf_counter() - self.start_time,
+                'frames': self.frames,
+                'fps': fps,
+                'recent_fps': recent_fps,
+                'dropped': dict(self.dropped),
+                'counters': counters,
+                'latency_ms': {stage: h.as_dict() for stage, h in self.latencies.items() if h.count},
+                'faces_per_frame': self.faces.as_dict(),
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Format the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics text.
+        """
+        run = f'run="{self.name}"'
+        lines = [f'# HELP {METRIC_PREFIX}_stage_latency_seconds Time a frame spends in a processing stage.',
+                 f'# TYPE {METRIC_PREFIX}_stage_latency_seconds histogram']
+        fps = self.fps()
+        counters = self._all_counters()
+        with self._lock:
+            for stage, h in self.latencies.items():
+                if not h.count:
+                    continue
+                labels = f'{run},stage="{stage}"'
+                for bound, count in zip(list(h.buckets) + ['+Inf'], h.cumulative_counts()):
+                    le = bound if bound == '+Inf' else f'{bound / 1000:g}'
+                    lines.append(f'{METRIC_PREFIX}_stage_latency_seconds_bucket{{{labels},le="{le}"}} {count}')
+                lines.append(f'{METRIC_PREFIX}_stage_latency_seconds_sum{{{labels}}} {h.sum / 1000:.6f}')
+                lines.append(f'{METRIC_PREFIX}_stage_latency_seconds_count{{{labels}}} {h.count}')
+            lines += [f'# HELP {METRIC_PREFIX}_faces_per_frame Number of faces found in a frame.',
+                      f'# TYPE {METRIC_PREFIX}_faces_per_frame histogram']
+            for bound, count in zip(list(self.faces.buckets) + ['+Inf'], self.faces.cumulative_counts()):
+                lines.append(f'{METRIC_PREFIX}_faces_per_frame_bucket{{{run},le="{bound}"}} {count}')
+            lines.append(f'{METRIC_PREFIX}_faces_per_frame_sum{{{run}}} {self.faces.sum:g}')
+            lines.append(f'{METRIC_PREFIX}_faces_per_frame_count{{{run}}} {self.faces.count}')
+            lines += [f'# HELP {METRIC_PREFIX}_frames_total Frames processed.',
+                      f'# TYPE {METRIC_PREFIX}_frames_total counter',
+                      f'{METRIC_PREFIX}_frames_total{{{run}}} {self.frames}',
+                      f'# HELP {METRIC_PREFIX}_dropped_frames_total Frames dropped instead of processed or shown.',
+                      f'# TYPE {METRIC_PREFIX}_dropped_frames_total counter']
+            lines += [f'{METRIC_PREFIX}_dropped_frames_total{{{run},reason="{reason}"}} {count}'
+                      for reason, count in self.dropped.items()]
+            lines += [f'# HELP {METRIC_PREFIX}_events_total Counted processing events.',
+                      f'# TYPE {METRIC_PREFIX}_events_total counter']
+            lines += [f'{METRIC_PREFIX}_events_total{{{run},event="{event}"}} {count}'
+                      for event, count in counters.items()]
+        lines += [f'# HELP {METRIC_PREFIX}_fps Effective processed frames per second.',
+                  f'# TYPE {METRIC_PREFIX}_fps gauge',
+                  f'{METRIC_PREFIX}_fps{{{run}}} {fps:.3f}']
+        return '\n'.join(lines) + '\n'
+
+    def export(self) -> None:
+        """
+        Rewrite the export file with the current metrics. The file is replaced atomically so a scraper never reads a
+        partially written file.
+
+        Returns:
+            None
+        """
+        if not self.export_path:
+            return
+        text = self.to_prometheus() if self.export_format == 'prometheus' else json.dumps(self.snapshot(), indent=2)
+        directory = os.path.dirname(os.path.abspath(self.export_path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f'{self.export_path}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(text)
+        os.replace(temp_path, self.export_path)
+        self._last_export = time.perf_counter()
+
+    def maybe_export(self) -> None:
+        """
+        Export the metrics if the export interval has passed since the last export.
+
+        Returns:
+            None
+        """
+        if self.export_path and time.perf_counter() - self._last_export >= self.export_interval:
+            try:
+                self.export()
+            except OSError as e:
+                print(f"Error exporting metrics: {e}")
+
+    def summary(self) -> str:
+        """
+        Get a one-line summary of the run.
+
+        Returns:
+            str: The frame rate, dropped frames, mean and p90 latency of every stage and the event counters.
+        """
+        snapshot = self.snapshot()
+        stages = ', '.join(f"{stage} {h['mean']:.1f}/{h['p90']:.0f}ms" for stage, h in snapshot['latency_ms'].items())
+        dropped = sum(snapshot['dropped'].values())
+        counters = ''.join(f", {event} {count}" for event, count in sorted(snapshot['counters'].items()))
+        return (f"{self.name}: {snapshot['frames']} frames, {snapshot['fps']:.1f} fps | {stages} (mean/p90) | "
+                f"dropped {dropped}{counters}")
+
+
+def detector_counters(face_detector) -> collections.Counter:
+    """
+    Collect the event counters of a detector and of every detector it wraps. Detectors expose their cumulative
+    counts (e.g. skipped frames or motion gated scans) as a 'counters' dict.
+
+    Args:
+        face_detector: The outermost detector.
+
+    Returns:
+        collections.Counter: The summed counters.
+    """
+    counters = collections.Counter()
+    while face_detector is not None:
+        counters.update(getattr(face_detector, 'counters', None) or {})
+        face_detector = getattr(face_detector, 'face_detector', None)
+    return counters
+
+
+def create_run_metrics(name: str, export_format: str, directory: str) -> RunMetrics:
+    """
+    Build the metrics of a run exporting to '<directory>/<name>_metrics.json' or '<directory>/<name>.prom'.
+
+    Args:
+        name (str): The name of the run.
+        export_format (str): 'json', 'prometheus' or None to disable exporting.
+        directory (str): The directory the metrics file is written to.
+
+    Returns:
+        RunMetrics: The metrics.
+    """
+    if not export_format:
+        return RunMetrics(name)
+    filename = f'{name}.prom' if export_format == 'prometheus' else f'{name}_metrics.json'
+    return RunMetrics(name, os.path.join(directory, filename), export_format)
+
+
+def draw_fps_overlay(frame: np.ndarray, fps: float) -> None:
+    """
+    Draw the frame rate in the top left corner of a frame.
+
+    Args:
+        frame (np.ndarray): The frame (BGR format) to draw on in place.
+        fps (float): The frame rate.
+
+    Returns:
+        None
+    """
+    text = f'{fps:.1f} FPS'
+    (w, h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+    cv2.rectangle(frame, (5, 5), (15 + w, 15 + h + baseline), (0, 0, 0), cv2.FILLED)
+    cv2.putText(frame, text, (10, 10 + h), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
@@ -0,0 +1,466 @@
+"""
+Module: multi_source.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides a MultiSourceProcessor class that monitors many capture sources at once: camera device
+    indices, video files and stream URLs (e.g. rtsp:// or http:// endpoints). Every source is read by its own capture
+    thread, while detection and rendering for all of them run on one shared pool of worker threads. Workers serve the
+    sources with a pending frame round-robin, and a source never has more than one frame in flight, so a busy source
+    cannot starve the others and every recording stays in order. Live sources only keep their newest frame waiting
+    (stale frames are dropped and the recording repeats the last processed frame in their place, as in the realtime
+    pipeline); file sources wait for the workers so no frame is skipped. Capture threads decode into a FramePool of
+    their own, so frames are reused once the workers and the recording are done with them.
+
+    Detectors come from a DetectorPool. Detectors whose results do not depend on previous frames are shared: a
+    worker acquires one for each frame, so a handful of instances serve every source. Detectors that keep stream state
+    (region of interest search, motion gating, FaceMesh in video mode) and the tracking and frame skipping wrappers
+    are kept per source. Each source writes its own recording and records its own RunMetrics, so the frame rate of
+    every source is reported separately.
+
+Classes:
+- SourceState: The capture, recording, metrics and scheduling state of one source.
+- MultiSourceProcessor: Processes several sources concurrently over a shared worker pool.
+
+Functions:
+- parse_source(source) -> object: Convert a device index given as text to an int.
+- source_label(source) -> str: Get a short name of a source usable in file names.
+
+Constants:
+- STATS_INTERVAL: Number of seconds between printed per-source statistics (and metrics exports).
+- ACQUIRE_TIMEOUT: Number of seconds to wait for the pool to provide the detector of a source.
+"""
+
+import os
+import re
+import threading
+import time
+
+import cv2
+
+from face_detection_package.frame_buffers import FramePool
+from face_detection_package.frame_skipping import skip_unchanged_frames
+from face_detection_package.metrics import RunMetrics, create_run_metrics, draw_fps_overlay
+from face_detection_package.output_writers import DEFAULT_FOURCC, DEFAULT_WRITER, create_writer, output_extension
+from face_detection_package.rendering import render_detections
+from face_detection_package.tracking import wrap_detector
+
+STATS_INTERVAL = 5.0
+ACQUIRE_TIMEOUT = 30.0
+
+
+def parse_source(source):
+    """
+    Convert a device index given as text (e.g. '0') to an int; files and URLs are returned unchanged.
+
+    Args:
+        source: A device index, file path or stream URL.
+
+    Returns:
+        The source as accepted by cv2.VideoCapture.
+    """
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source)
+    return source
+
+
+def source_label(source) -> str:
+    """
+    Get a short name of a source usable in file and metric names.
+
+    Args:
+        source: A device index, file path or stream URL.
+
+    Returns:
+        str: 'camera<N>' for device indices, otherwise the file or URL name with unsafe characters replaced.
+    """
+    if isinstance(source, int):
+        return f'camera{source}'
+    name = os.path.basename(str(source).rstrip('/')) or str(source)
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name)[:40]
+
+
+class SourceState:
+    """
+    The capture, recording, metrics and scheduling state of one source.
+    """
+
+    def __init__(self, index: int, source, cap: cv2.VideoCapture, out, metrics: RunMetrics):
+        """
+        Initialize the SourceState instance.
+
+        Args:
+            index (int): The position of the source in the processor.
+            source: The device index, file path or stream URL.
+            cap (cv2.VideoCapture): The opened capture.
+            out: The writer the processed frames are recorded to (an OutputWriter or cv2.VideoWriter).
+            metrics (RunMetrics): The metrics of the source.
+
+        Returns:
+            None
+        """
+        self.index = index
+        self.source = source
+        self.name = source_label(source)
+        self.cap = cap
+        self.out = out
+        self.metrics = metrics
+        # Files are read as fast as they are processed; devices and streams keep producing frames regardless.
+        self.live = not (isinstance(source, str) and os.path.isfile(source))
+        self.pending = None
+        self.in_flight = False
+        self.ended = False
+        self.captured = 0
+        self.last_index = -1
+        self.last_frame = None
+        self.latest_frame = None
+        self.face_detector = None
+        self.pooled_detector = None
+
+
+class MultiSourceProcessor:
+    """
+    Processes several capture sources concurrently, scheduling their frames fairly over a shared pool of workers.
+    """
+
+    def __init__(self, sources: list, detector_pool, backend: str, detector_options: dict = None,
+                 workers: int = None, detect_interval: int = 1, skip_threshold: float = 0.0,
+                 output_dir: str = None, writer: str = DEFAULT_WRITER, fourcc: str = DEFAULT_FOURCC,
+                 metrics_format: str = None, metrics_dir: str = None, show_fps: bool = False):
+        """
+        Initialize the MultiSourceProcessor instance.
+
+        Args:
+            sources (list): Device indices, file paths or stream URLs.
+            detector_pool (DetectorPool): The pool detectors are acquired from.
+            backend (str): The name of the detector backend.
+            detector_options (dict): The detector constructor options.
+            workers (int): The number of worker threads (defaults to the number of cores, at most one per source).
+            detect_interval (int): Number of frames between full detections (faces are tracked in between).
+            skip_threshold (float): Change below which frames reuse the previous detections (0 to disable).
+            output_dir (str): The directory recordings are written to (None disables recording).
+            writer (str): The output writer backend of the recordings.
+            fourcc (str): The codec of the 'video' writer backend.
+            metrics_format (str): Format the metrics of every source are exported in ('json' or 'prometheus').
+            metrics_dir (str): The directory metrics are exported to.
+            show_fps (bool): Whether to draw the frame rate of each source onto its frames.
+
+        Returns:
+            None
+        """
+        self.sources = [parse_source(source) for source in sources]
+        self.detector_pool = detector_pool
+        self.backend = backend
+        self.detector_options = detector_options or {}
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(self.sources) or 1))
+        self.detect_interval = detect_interval
+        self.skip_threshold = skip_threshold
+        self.output_dir = output_dir
+        self.writer = writer
+        self.fourcc = fourcc
+        self.metrics_format = metrics_format
+        self.metrics_dir = metrics_dir
+        self.show_fps = show_fps
+
+        self.states = []
+        self.shared_detectors = False
+        self.stop_event = threading.Event()
+        self._condition = threading.Condition()
+        self._next = 0
+        self._threads = []
+
+    def _open_sources(self) -> None:
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        for index, source in enumerate(self.sources):
+            cap = cv2.VideoCapture(source)
+            if not cap.isOpened():
+                print(f"Error opening source {source}, skipping it.")
+                continue
+            name = source_label(source)
+            out = None
+            if self.output_dir:
+                path = os.path.join(self.output_dir, f'{timestamp}_{index}_{name}_recording'
+                                                     f'{output_extension(self.writer, self.fourcc)}')
+                out = create_writer(self.writer, path, cap.get(cv2.CAP_PROP_FPS), fourcc=self.fourcc)
+            metrics = create_run_metrics(f'source_{index}_{name}', self.metrics_format if self.metrics_dir else None,
+                                         self.metrics_dir)
+            self.states.append(SourceState(index, source, cap, out, metrics))
+
+    def _prepare_detectors(self) -> None:
+        """
+        Decide whether the base detector can be shared between sources and give every source its stream wrappers.
+
+        Raises:
+            ValueError: If the pool cannot hold a detector for every source that needs its own.
+        """
+        probe = self.detector_pool.acquire(self.backend, False, ACQUIRE_TIMEOUT, **self.detector_options)
+        # Detectors that do not say otherwise are assumed to carry state from frame to frame.
+        self.shared_detectors = not getattr(probe, 'keeps_stream_state', True)
+        if self.shared_detectors:
+            self.detector_pool.release(probe)
+        for number, state in enumerate(self.states):
+            if not self.shared_detectors:
+                try:
+                    state.pooled_detector = probe if number == 0 else \
+                        self.detector_pool.acquire(self.backend, False, ACQUIRE_TIMEOUT, **self.detector_options)
+                except TimeoutError:
+                    self._release_detectors()
+                    raise ValueError(f"The detector pool cannot hold a {self.backend} detector for each of the "
+                                     f"{len(self.states)} sources.")
+                base = state.pooled_detector
+            else:
+                base = _SharedDetector(self)
+            state.face_detector = skip_unchanged_frames(wrap_detector(base, self.detect_interval),
+                                                        self.skip_threshold)
+            if hasattr(state.face_detector, 'reset'):
+                state.face_detector.reset()
+            state.metrics.watch_detector(state.face_detector)
+
+    def _release_detectors(self) -> None:
+        for state in self.states:
+            if state.pooled_detector is not None:
+                self.detector_pool.release(state.pooled_detector)
+                state.pooled_detector = None
+
+    def _close_sources(self) -> None:
+        for state in self.states:
+            state.cap.release()
+            if state.out is not None:
+                # Keep the recording as long as what was captured.
+                if state.last_frame is not None:
+                    for _ in range(state.captured - state.last_index - 1):
+                        state.out.write(state.last_frame)
+                state.out.release()
+
+    def _capture_loop(self, state: SourceState) -> None:
+        frame_pool = FramePool()
+        try:
+            while not self.stop_event.is_set():
+                ret, frame = frame_pool.read(state.cap)
+                if not ret:
+                    print(f"Source {state.name} stopped returning frames.")
+                    break
+                item = (state.captured, time.perf_counter(), frame)
+                state.captured += 1
+                with self._condition:
+                    if not state.live:
+                        # Files wait for their previous frame to be picked up so none are skipped.
+                        while state.pending is not None and not self.stop_event.is_set():
+                            self._condition.wait(0.1)
+                    elif state.pending is not None:
+                        state.metrics.record_drop('stale')
+                    state.pending = item
+                    self._condition.notify_all()
+        except Exception as e:
+            print(f"Error capturing from {state.name}: {e}")
+        finally:
+            state.metrics.increment('frame_allocations', frame_pool.allocated)
+            with self._condition:
+                state.ended = True
+                self._condition.notify_all()
+
+    def _next_job(self):
+        """
+        Wait for a source with a pending frame that no other worker is processing, taking sources round-robin.
+
+        Returns:
+            tuple: The source state and its frame item, or None when every source is done.
+        """
+        with self._condition:
+            while True:
+                count = len(self.states)
+                for offset in range(count):
+                    state = self.states[(self._next + offset) % count]
+                    if state.pending is not None and not state.in_flight:
+                        item, state.pending = state.pending, None
+                        state.in_flight = True
+                        self._next = (self.states.index(state) + 1) % count
+                        self._condition.notify_all()
+                        return state, item
+                if all(state.ended and state.pending is None for state in self.states):
+                    return None
+                self._condition.wait(0.1)
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            state, (index, captured, frame) = job
+            try:
+                start = time.perf_counter()
+                detections = state.face_detector.detect_faces(frame)
+                detected = time.perf_counter()
+                render_detections(frame, detections, state.face_detector.settings)
+                rendered = time.perf_counter()
+                state.metrics.observe('detect', detected - start)
+                state.metrics.observe('render', rendered - detected)
+                state.metrics.record_frame(len(detections))
+                if self.show_fps:
+                    draw_fps_overlay(frame, state.metrics.recent_fps())
+                if state.out is not None:
+                    # Fill the slots of dropped frames so the recording keeps the source's timeline.
+                    repeat = state.last_frame if state.last_frame is not None else frame
+                    for _ in range(index - state.last_index - 1):
+                        state.out.write(repeat)
+                    state.out.write(frame)
+                    state.metrics.observe('write', time.perf_counter() - rendered)
+                state.last_index, state.last_frame = index, frame
+                state.latest_frame = frame
+                state.metrics.observe('end_to_end', time.perf_counter() - captured)
+            except Exception as e:
+                print(f"Error processing a frame of {state.name}: {e}")
+            finally:
+                with self._condition:
+                    state.in_flight = False
+                    self._condition.notify_all()
+
+    def start(self) -> None:
+        """
+        Open the sources and start the capture threads and the worker pool.
+
+        Raises:
+            ValueError: If none of the sources could be opened.
+
+        Returns:
+            None
+        """
+        self._open_sources()
+        if not self.states:
+            raise ValueError("None of the sources could be opened.")
+        try:
+            self._prepare_detectors()
+        except Exception:
+            self._close_sources()
+            raise
+        print(f"Processing {len(self.states)} sources on {self.workers} workers "
+              f"({'shared' if self.shared_detectors else 'per-source'} {self.backend} detectors)")
+        self._threads = [threading.Thread(target=self._capture_loop, args=(state,), name=f'capture-{state.name}',
+                                          daemon=True) for state in self.states]
+        self._threads += [threading.Thread(target=self._worker_loop, name=f'detect-{number}', daemon=True)
+                          for number in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def is_running(self) -> bool:
+        """
+        Check whether any source is still being processed.
+
+        Returns:
+            bool: True while a capture or worker thread is alive.
+        """
+        return any(thread.is_alive() for thread in self._threads)
+
+    def stop(self) -> None:
+        """
+        Stop capturing, let the workers finish the frames already taken, then close every capture, recording and
+        detector.
+
+        Returns:
+            None
+        """
+        self.stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._close_sources()
+        self._release_detectors()
+        for state in self.states:
+            try:
+                state.metrics.export()
+            except OSError as e:
+                print(f"Error exporting metrics: {e}")
+
+    def stats(self) -> list:
+        """
+        Get the statistics of every source.
+
+        Returns:
+            list: A dict per source with its name, captured and processed frames, frame rates and dropped frames.
+        """
+        stats = []
+        for state in self.states:
+            snapshot = state.metrics.snapshot()
+            stats.append({'source': state.source, 'name': state.name, 'captured': state.captured,
+                          'frames': snapshot['frames'], 'fps': snapshot['fps'], 'recent_fps': snapshot['recent_fps'],
+                          'dropped': sum(snapshot['dropped'].values()), 'ended': state.ended})
+        return stats
+
+    def print_stats(self) -> None:
+        """
+        Print the frame rate of every source and export their metrics when due.
+
+        Returns:
+            None
+        """
+        for state, stats in zip(self.states, self.stats()):
+            print(f"  {stats['name']}: {stats['frames']}/{stats['captured']} frames, {stats['recent_fps']:.1f} fps "
+                  f"(average {stats['fps']:.1f}), dropped {stats['dropped']}")
+            state.metrics.maybe_export()
+
+    def latest_frames(self) -> dict:
+        """
+        Get the most recently processed frame of every source (for display).
+
+        Returns:
+            dict: The frames keyed by source name (sources without a processed frame yet are left out).
+        """
+        return {state.name: state.latest_frame for state in self.states if state.latest_frame is not None}
+
+    def run(self, duration: float = None, display: bool = False) -> list:
+        """
+        Process the sources until they end, the duration passes, 'q' is pressed in a display window or the process
+        is interrupted, printing per-source statistics along the way.
+
+        Args:
+            duration (float): The maximum number of seconds to run (None runs until the sources end).
+            display (bool): Whether to show the processed frames of every source in its own window.
+
+        Returns:
+            list: The final statistics of every source.
+        """
+        self.start()
+        started = last_stats = time.perf_counter()
+        try:
+            while self.is_running():
+                if display:
+                    for name, frame in self.latest_frames().items():
+                        cv2.imshow(name, frame)
+                    if cv2.waitKey(30) & 0xFF == ord('q'):
+                        break
+                else:
+                    time.sleep(0.1)
+                now = time.perf_counter()
+                if duration is not None and now - started >= duration:
+                    break
+                if now - last_stats >= STATS_INTERVAL:
+                    self.print_stats()
+                    last_stats = now
+        except KeyboardInterrupt:
+            print("Stopping...")
+        finally:
+            self.stop()
+            if display:
+                cv2.destroyAllWindows()
+        print("Multi-source summary:")
+        self.print_stats()
+        return self.stats()
+
+
+class _SharedDetector:
+    """
+    Stand-in for a stateless detector that acquires an instance from the processor's pool for every frame, so the
+    instances are shared by all sources.
+    """
+
+    def __init__(self, processor: MultiSourceProcessor):
+        self.processor = processor
+        self.settings = processor.detector_pool.settings
+        self.version_name = f"{processor.backend} (shared)"
+
+    def detect_faces(self, frame):
+        processor = self.processor
+        with processor.detector_pool.detector(processor.backend, False, **processor.detector_options) as detector:
+            return detector.detect_faces(frame)
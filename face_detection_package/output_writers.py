@@ -0,0 +1,349 @@
+"""
+Module: output_writers.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides the writers processed frames are saved with. Every writer encodes on its own background
+    thread fed by a bounded queue, so encoding overlaps with detection instead of running on the detection thread,
+    and opens its output with the size of the first frame it receives rather than a fixed size. Writers share the
+    write()/release() interface of cv2.VideoWriter so they can be used wherever a VideoWriter was. Three backends are
+    available: cv2.VideoWriter with a selectable fourcc, a raw-frame pipe to a local ffmpeg binary and a sequence of
+    JPEG images.
+
+Classes:
+- OutputWriter: Base class running the encoding of a writer on a background thread.
+- VideoFileWriter: Writes frames to a video file with cv2.VideoWriter.
+- FFmpegPipeWriter: Pipes raw frames to a local ffmpeg binary.
+- ImageSequenceWriter: Writes every frame as a numbered JPEG image.
+
+Functions:
+- ffmpeg_available() -> bool: Check whether an ffmpeg binary is on the PATH.
+- output_extension(backend, fourcc) -> str: Get the extension of the output of a writer backend.
+- create_writer(backend, path, fps, **options) -> OutputWriter: Build a writer of a backend.
+
+Constants:
+- WRITER_BACKENDS: Names of the writer backends mapped to their classes.
+- DEFAULT_WRITER: Name of the writer backend used when none is selected.
+- DEFAULT_FOURCC: Codec of the video file writer when none is selected.
+- QUEUE_SIZE: Default number of frames waiting to be encoded before write() blocks.
+- JPEG_QUALITY: Default quality of the image sequence writer.
+- FFMPEG_CODEC: Default ffmpeg video encoder.
+- FFMPEG_PRESET: Default ffmpeg encoder preset.
+"""
+
+import inspect
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+DEFAULT_WRITER = 'video'
+DEFAULT_FOURCC = 'mp4v'
+QUEUE_SIZE = 16
+JPEG_QUALITY = 95
+FFMPEG_CODEC = 'libx264'
+FFMPEG_PRESET = 'veryfast'
+
+# fourcc codes whose videos are stored in an .avi container.
+_AVI_FOURCCS = ('MJPG', 'XVID', 'FFV1', 'DIVX')
+
+# Placed on the queue to tell the encoding thread that no more frames are coming.
+_END = None
+
+
+class OutputWriter(ABC):
+    """
+    Base class of the writers. Frames passed to write() are queued and encoded on a background thread; the output is
+    opened with the size of the first frame and later frames of a different size are resized to it. Subclasses
+    implement _open, _write and _close, which run on the encoding thread.
+    """
+
+    def __init__(self, path: str, fps: float, queue_size: int = QUEUE_SIZE):
+        """
+        Initialize the OutputWriter instance.
+
+        Args:
+            path (str): The output path.
+            fps (float): The frame rate of the output.
+            queue_size (int): The number of frames waiting to be encoded before write() blocks.
+
+        Returns:
+            None
+        """
+        self.path = path
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.frame_size = None
+        self.frames_written = 0
+        self.frames_resized = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._released = False
+        self._thread = threading.Thread(target=self._encode_loop, name=f'writer-{os.path.basename(path)}',
+                                        daemon=True)
+        self._thread.start()
+
+    def isOpened(self) -> bool:
+        """
+        Check whether the writer still accepts frames (mirrors cv2.VideoWriter).
+
+        Returns:
+            bool: False once the writer was released or encoding failed.
+        """
+        return not self._released and self.error is None
+
+    def write(self, frame: np.ndarray) -> None:
+        """
+        Queue a frame to be encoded. Blocks while the queue is full so no frame is lost. The frame must not be
+        modified afterwards.
+
+        Args:
+            frame (np.ndarray): The frame (BGR format).
+
+        Returns:
+            None
+        """
+        if self.isOpened():
+            self._queue.put(frame)
+
+    def release(self) -> None:
+        """
+        Encode the frames still queued and close the output.
+
+        Returns:
+            None
+        """
+        if self._released:
+            return
+        self._released = True
+        self._queue.put(_END)
+        self._thread.join()
+        if self.error is not None:
+            print(f"Error writing {self.path}: {self.error}")
+
+    def _encode_loop(self) -> None:
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is _END:
+                    break
+                if self.frame_size is None:
+                    self.frame_size = (frame.shape[1], frame.shape[0])
+                    self._open(self.frame_size)
+                elif (frame.shape[1], frame.shape[0]) != self.frame_size:
+                    frame = cv2.resize(frame, self.frame_size, interpolation=cv2.INTER_AREA)
+                    self.frames_resized += 1
+                self._write(frame)
+                self.frames_written += 1
+        except Exception as e:
+            self.error = e
+            # Keep draining until release() so a blocked write() call can return.
+            while self._queue.get() is not _END:
+                pass
+        finally:
+            try:
+                if self.frame_size is not None:
+                    self._close()
+            except Exception as e:
+                self.error = self.error or e
+
+    @abstractmethod
+    def _open(self, frame_size: tuple) -> None:
+        """Open the output for frames of the given (width, height)."""
+
+    @abstractmethod
+    def _write(self, frame: np.ndarray) -> None:
+        """Encode one frame of the output's size."""
+
+    @abstractmethod
+    def _close(self) -> None:
+        """Finish and close the output."""
+
+
+class VideoFileWriter(OutputWriter):
+    """
+    Writes frames to a video file with cv2.VideoWriter.
+    """
+
+    def __init__(self, path: str, fps: float, fourcc: str = DEFAULT_FOURCC, queue_size: int = QUEUE_SIZE):
+        """
+        Initialize the VideoFileWriter instance.
+
+        Args:
+            path (str): The output video path.
+            fps (float): The frame rate of the output.
+            fourcc (str): The four character code of the codec (e.g. 'mp4v', 'MJPG', 'avc1').
+            queue_size (int): The number of frames waiting to be encoded before write() blocks.
+
+        Returns:
+            None
+        """
+        self.fourcc = fourcc
+        self._writer = None
+        super().__init__(path, fps, queue_size)
+
+    def _open(self, frame_size: tuple) -> None:
+        self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, frame_size)
+        if not self._writer.isOpened():
+            raise ValueError(f"Unable to open a '{self.fourcc}' video writer for {self.path}.")
+
+    def _write(self, frame: np.ndarray) -> None:
+        self._writer.write(frame)
+
+    def _close(self) -> None:
+        if self._writer is not None:
+            self._writer.release()
+
+
+class FFmpegPipeWriter(OutputWriter):
+    """
+    Pipes raw BGR frames to a local ffmpeg binary, which encodes them (H.264 by default).
+    """
+
+    def __init__(self, path: str, fps: float, codec: str = FFMPEG_CODEC, preset: str = FFMPEG_PRESET,
+                 ffmpeg_path: str = None, queue_size: int = QUEUE_SIZE):
+        """
+        Initialize the FFmpegPipeWriter instance.
+
+        Args:
+            path (str): The output video path.
+            fps (float): The frame rate of the output.
+            codec (str): The ffmpeg video encoder.
+            preset (str): The encoder preset (used by the x264/x265 encoders).
+            ffmpeg_path (str): The ffmpeg binary (found on the PATH by default).
+            queue_size (int): The number of frames waiting to be encoded before write() blocks.
+
+        Raises:
+            FileNotFoundError: If no ffmpeg binary is found.
+
+        Returns:
+            None
+        """
+        self.ffmpeg_path = ffmpeg_path or shutil.which('ffmpeg')
+        if not self.ffmpeg_path:
+            raise FileNotFoundError("No ffmpeg binary found on the PATH.")
+        self.codec = codec
+        self.preset = preset
+        self._process = None
+        super().__init__(path, fps, queue_size)
+
+    def _open(self, frame_size: tuple) -> None:
+        command = [self.ffmpeg_path, '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{frame_size[0]}x{frame_size[1]}',
+                   '-r', f'{self.fps:g}', '-i', '-',
+                   '-c:v', self.codec, '-pix_fmt', 'yuv420p']
+        if self.codec in ('libx264', 'libx265'):
+            command += ['-preset', self.preset]
+        command.append(self.path)
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def _write(self, frame: np.ndarray) -> None:
+        self._process.stdin.write(np.ascontiguousarray(frame).data)
+
+    def _close(self) -> None:
+        if self._process is None:
+            return
+        self._process.stdin.close()
+        if self._process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with status {self._process.returncode}.")
+
+
+class ImageSequenceWriter(OutputWriter):
+    """
+    Writes every frame as a numbered JPEG image (frame_000000.jpg, ...) in a directory.
+    """
+
+    def __init__(self, path: str, fps: float = None, quality: int = JPEG_QUALITY, queue_size: int = QUEUE_SIZE):
+        """
+        Initialize the ImageSequenceWriter instance.
+
+        Args:
+            path (str): The directory the images are written to (created if missing).
+            fps (float): Unused; accepted so every writer is built the same way.
+            quality (int): The JPEG quality (0-100).
+            queue_size (int): The number of frames waiting to be encoded before write() blocks.
+
+        Returns:
+            None
+        """
+        self.quality = quality
+        super().__init__(path, fps, queue_size)
+
+    def _open(self, frame_size: tuple) -> None:
+        os.makedirs(self.path, exist_ok=True)
+
+    def _write(self, frame: np.ndarray) -> None:
+        image_path = os.path.join(self.path, f'frame_{self.frames_written:06d}.jpg')
+        if not cv2.imwrite(image_path, frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality]):
+            raise ValueError(f"Unable to write {image_path}.")
+
+    def _close(self) -> None:
+        pass
+
+
+WRITER_BACKENDS = {
+    'video': VideoFileWriter,
+    'ffmpeg': FFmpegPipeWriter,
+    'jpeg': ImageSequenceWriter,
+}
+
+
+def ffmpeg_available() -> bool:
+    """
+    Check whether an ffmpeg binary is on the PATH.
+
+    Returns:
+        bool: True if the ffmpeg writer can be used.
+    """
+    return shutil.which('ffmpeg') is not None
+
+
+def output_extension(backend: str = DEFAULT_WRITER, fourcc: str = DEFAULT_FOURCC) -> str:
+    """
+    Get the extension of the output of a writer backend.
+
+    Args:
+        backend (str): The name of the writer backend.
+        fourcc (str): The codec of the video file writer.
+
+    Returns:
+        str: '.avi' or '.mp4' for videos, '' for image sequences (which are written to a directory).
+    """
+    if backend == 'jpeg':
+        return ''
+    if backend == 'video' and fourcc.upper() in _AVI_FOURCCS:
+        return '.avi'
+    return '.mp4'
+
+
+def create_writer(backend: str, path: str, fps: float, **options) -> OutputWriter:
+    """
+    Build a writer of a backend. The ffmpeg backend falls back to the video file writer when no ffmpeg binary is
+    found.
+
+    Args:
+        backend (str): The name of the writer backend.
+        path (str): The output path (a directory for image sequences).
+        fps (float): The frame rate of the output.
+        **options: Keyword arguments for the writer (e.g. fourcc, codec, quality, queue_size). Options the writer
+                   does not take are ignored.
+
+    Raises:
+        ValueError: If the backend is unknown.
+
+    Returns:
+        OutputWriter: The writer.
+    """
+    if backend not in WRITER_BACKENDS:
+        raise ValueError(f"Unknown writer '{backend}'. Available writers: {', '.join(WRITER_BACKENDS)}")
+    if backend == 'ffmpeg' and not ffmpeg_available():
+        print("No ffmpeg binary found, writing with cv2.VideoWriter instead.")
+        backend = 'video'
+    writer_class = WRITER_BACKENDS[backend]
+    parameters = inspect.signature(writer_class.__init__).parameters
+    return writer_class(path, fps, **{key: value for key, value in options.items() if key in parameters})
@@ -12,22 +12,25 @@ Classes:
 - PostProcessDetections: A class representing the GUI for processing video and image files and detecting faces.
 
 Dependencies:
-- os: Provides a way to interact with the operating system, such as file path manipulations.
 - face_detection_package.utils: Contains utility functions and constants used in face detection.
+- face_detection_package.media_processing: Contains the functions that detect faces over video and image files.
 - customtkinter as ctk: A customized version of the tkinter library for GUI development.
 - datetime: Offers functionalities for working with dates and times.
 - cv2: OpenCV library for computer vision tasks.
+- face_detection_package.tracking: Contains the wrapper that tracks faces between full detections.
+
+Note:
+- OpenCV and the modules depending on it are imported when processing starts rather than at module level, so they
+  do not delay the window from appearing (the DetectorSettings frame imports them in the background).
 
 Constants:
 - RED: Hexadecimal color code for red used in the GUI.
 - BLUE: Hexadecimal color code for blue used in the GUI.
 """
 
-import os
 from face_detection_package.utils import open_file_explorer
 import customtkinter as ctk
 import datetime
-import cv2
 
 class PostProcessDetections(ctk.CTkFrame):
     def __init__(self, parent):
@@ -65,6 +68,8 @@ class PostProcessDetections(ctk.CTkFrame):
         self.rowconfigure(0, weight=1, uniform='a')
 
         self.face_detector = None
+        self.pooled_detector = None
+        self.detection_cache = None
         print(self.face_detector)
         self.directory_manager = self.parent.directory_manager
 
@@ -81,10 +86,45 @@ class PostProcessDetections(ctk.CTkFrame):
             None
         """
         print(f"in ... before set we have the detector = {self.face_detector} and the staticMode_flag = {staticMode_flag}")
-        # Changed to set the detector directly to the haar_detector
-        self.face_detector = self.parent.settings.haar_detector
+        # Build (or reuse) the detector of the backend selected in the settings frame
+        self.release_detector()
+        self.pooled_detector = self.parent.settings.get_detector(static_mode=bool(staticMode_flag))
+        self.face_detector = self.pooled_detector
+        # Video streams only run the full detector every detect_interval frames and track faces in between, and
+        # reuse the previous detections for frames that have not changed.
+        if not staticMode_flag:
+            from face_detection_package.frame_skipping import skip_unchanged_frames
+            from face_detection_package.tracking import wrap_detector
+            self.face_detector = skip_unchanged_frames(
+                wrap_detector(self.face_detector, self.parent.settings.detect_interval),
+                self.parent.settings.skip_threshold)
         print(f"in create detector, set self.face_detector = {self.face_detector}")
 
+    def release_detector(self) -> None:
+        """
+        Give the detector obtained in create_detector back to the settings frame's detector pool.
+
+        Returns:
+            None
+        """
+        if getattr(self, 'pooled_detector', None) is not None:
+            self.parent.settings.release_detector(self.pooled_detector)
+            self.pooled_detector = None
+
+    def get_detection_cache(self):
+        """
+        Get the detection cache when caching is enabled in the settings frame, opening it the first time.
+
+        Returns:
+            DetectionCache: The cache, or None when caching is disabled.
+        """
+        if not self.parent.settings.use_cache:
+            return None
+        if self.detection_cache is None:
+            from face_detection_package.detection_cache import DetectionCache
+            self.detection_cache = DetectionCache(self.directory_manager.cache_dir)
+        return self.detection_cache
+
     def create_widgets(self) -> None:
         """
         Create widgets for the PostProcessDetections frame.
@@ -123,42 +163,46 @@ class PostProcessDetections(ctk.CTkFrame):
         Returns:
             None
         """
+        import cv2
+        from face_detection_package.media_processing import (VIDEO_EXTENSIONS, make_output_path,
+                                                             detect_over_video_file, detect_video_to_sidecar)
+        from face_detection_package.metrics import create_run_metrics
+        from face_detection_package.output_writers import output_extension
+        from face_detection_package.sidecar import sidecar_extension
         try:
             self.create_detector(staticMode_flag=False)
             current_time = datetime.datetime.now()
             timestamp = current_time.strftime("%Y%m%d_%H%M%S")
             video_path = open_file_explorer()
             if video_path:
-                valid_extensions = ('.mp4', '.mov')
-                if not video_path.lower().endswith(valid_extensions):
+                if not video_path.lower().endswith(VIDEO_EXTENSIONS):
                     raise ValueError("Invalid file type. Please select a .mp4 or .mov file.")
 
-                video_path_out = os.path.join(self.directory_manager.videos_dir,
-                                              f'{os.path.basename(video_path)}_{timestamp}_detections.mp4')
-
-                cap = cv2.VideoCapture(video_path)
-                ret, frame = cap.read()
-                H, W, _ = frame.shape
-                out = cv2.VideoWriter(video_path_out, cv2.VideoWriter_fourcc(*'mp4v'), int(cap.get(cv2.CAP_PROP_FPS)),
-                                      (W, H))
-
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                settings = self.parent.settings
+                if settings.sidecar_format:
+                    extension = sidecar_extension(settings.sidecar_format)
+                else:
+                    extension = output_extension(settings.output_writer, settings.output_fourcc)
+                video_path_out = make_output_path(self.directory_manager.videos_dir, video_path, timestamp, extension)
 
                 # Update status label at the beginning of processing
                 self.status_lbl.configure(text="Processing video...")
                 self.update()
 
-                for frame_count in range(total_frames):
-                    ret, frame = cap.read()
-                    self.face_detector.detect_faces(frame)
-                    out.write(frame)
+                metrics = create_run_metrics('video', settings.metrics_format, self.directory_manager.metrics_dir)
+                if settings.sidecar_format:
+                    # Detect only: save where the faces are without drawing or re-encoding the video.
+                    detect_video_to_sidecar(self.face_detector, video_path, video_path_out, settings.sidecar_format,
+                                            metrics)
+                else:
+                    detect_over_video_file(self.face_detector, video_path, video_path_out, metrics,
+                                           settings.show_fps, settings.output_writer,
+                                           {'fourcc': settings.output_fourcc}, self.get_detection_cache())
+                    if self.detection_cache is not None:
+                        print(self.detection_cache.report())
 
                 self.clear_status_label()
 
-                cap.release()
-                out.release()
-                cv2.destroyAllWindows()
-
                 # Update status label when processing is done
                 self.status_lbl.configure(text="Video detections processed")
                 self.after(5000, self.clear_status_label)
@@ -168,6 +212,8 @@ class PostProcessDetections(ctk.CTkFrame):
             print(f"OpenCV Error in detect_over_video: {cve}")
         except Exception as e:
             print(f"Error in detect_over_video: {e}")
+        finally:
+            self.release_detector()
 
     def detect_over_image(self) -> None:
         """
@@ -180,28 +226,42 @@ class PostProcessDetections(ctk.CTkFrame):
         Returns:
             None
         """
+        from face_detection_package.media_processing import (IMAGE_EXTENSIONS, make_output_path,
+                                                             detect_over_image_file, detect_image_to_sidecar)
+        from face_detection_package.sidecar import sidecar_extension
         try:
             self.create_detector(staticMode_flag=True)
             current_time = datetime.datetime.now()
             timestamp = current_time.strftime("%Y%m%d_%H%M%S")
             img_path = open_file_explorer()
             if img_path:
-                valid_extensions = ('.png', '.jpg')
-                if not img_path.lower().endswith(valid_extensions):
+                if not img_path.lower().endswith(IMAGE_EXTENSIONS):
                     raise ValueError("Invalid file type. Please select a .png or .jpg file.")
 
-                img_path_out = os.path.join(self.directory_manager.images_dir,
-                                            f'{os.path.basename(img_path)}_{timestamp}_detections.jpg')
-
-                img = cv2.imread(img_path)
+                sidecar_format = self.parent.settings.sidecar_format
+                extension = sidecar_extension(sidecar_format) if sidecar_format else '.jpg'
+                img_path_out = make_output_path(self.directory_manager.images_dir, img_path, timestamp, extension)
 
                 # Update status label at the beginning of processing
                 self.status_lbl.configure(text="Processing image...")
                 self.update()
 
-                self.face_detector.detect_faces(img)
-                cv2.imwrite(img_path_out, img)
-                cv2.destroyAllWindows()
+                face_detector = self.face_detector
+                settings = self.parent.settings
+                if settings.tile_images:
+                    # Large images are split into tiles searched on threads with detectors from the settings' pool.
+                    from face_detection_package.tiled_detection import TiledDetector
+                    face_detector = TiledDetector(self.face_detector, settings.detector_pool, settings.backend,
+                                                  settings.detector_options())
+
+                if sidecar_format:
+                    detect_image_to_sidecar(face_detector, img_path, img_path_out, sidecar_format)
+                else:
+                    detect_over_image_file(face_detector, img_path, img_path_out, self.get_detection_cache())
+                    if self.detection_cache is not None:
+                        print(self.detection_cache.report())
+                if settings.tile_images:
+                    print(face_detector.report())
 
                 # Update status label when processing is done
                 self.status_lbl.configure(text="Image detections processed")
@@ -210,3 +270,5 @@ class PostProcessDetections(ctk.CTkFrame):
             print(f"ValueError in detect_over_image: {ve}")
         except Exception as e:
             print(f"Error in detect_over_image: {e}")
+        finally:
+            self.release_detector()
@@ -0,0 +1,297 @@
+"""
+Module: realtime_pipeline.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides a RealtimePipeline class that splits realtime feed processing into capture, detection (with
+    rendering), video writing and display stages connected by bounded queues. Capture, detection and writing each run on
+    their own thread so that decoding and encoding overlap with detection and the frame rate is limited by the slowest
+    stage rather than the sum of all of them. Display runs on the thread that calls run() because OpenCV HighGUI windows
+    must be created and pumped (imshow/waitKey) from a single thread. Stage latencies, faces per frame and dropped
+    frames are recorded in a RunMetrics object, along with the event counters of the detector (skipped frames, motion
+    gated scans, ...), that is periodically exported while the feed runs.
+
+    In latest-frame-wins mode the capture stage keeps draining the camera and only the newest frame waits for the
+    detector; older frames are dropped (and counted) so the display never lags further behind the camera than one
+    detection. The recording keeps the camera's timeline by repeating the last processed frame in place of every
+    dropped frame, so no unprocessed (unblurred) frame is ever written.
+
+    Frames are captured into a FramePool: a frame's array is reused for a later capture once every stage (and the
+    writer's queue) has let go of it, so the loop stops allocating new frames once the pipeline has filled up.
+
+Classes:
+- RealtimePipeline: Runs the capture -> detect -> write/display stages of a realtime feed.
+
+Constants:
+- WINDOW_NAME: Title of the feed display window.
+- STATS_INTERVAL: Number of seconds between printed pipeline statistics (and metrics exports).
+"""
+
+import queue
+import threading
+import time
+
+import cv2
+from face_detection_package.frame_buffers import FramePool
+from face_detection_package.metrics import RunMetrics, draw_fps_overlay
+from face_detection_package.rendering import render_detections
+
+WINDOW_NAME = "Webcam - Press 'q' key to quit."
+STATS_INTERVAL = 5.0
+
+# Placed on a queue to tell the next stage that no more frames are coming.
+_END = None
+
+
+class RealtimePipeline:
+    """
+    Runs a realtime feed through capture, detection, writing and display stages connected by bounded queues.
+    Frames travel between the stages as (capture index, capture time, frame) tuples.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, face_detector, out, queue_size: int = 4,
+                 window_name: str = WINDOW_NAME, metrics: RunMetrics = None, show_fps: bool = False,
+                 latest_frame_only: bool = False):
+        """
+        Initialize the RealtimePipeline instance.
+
+        Args:
+            cap (cv2.VideoCapture): The opened capture to read frames from.
+            face_detector: The detector whose detections are found and rendered on every frame.
+            out: The writer processed frames are recorded to (an OutputWriter or cv2.VideoWriter).
+            queue_size (int): The maximum number of frames waiting between two stages.
+            window_name (str): The title of the display window.
+            metrics (RunMetrics): The metrics the stages are recorded in (a new non-exporting one by default).
+            show_fps (bool): Whether to draw the current frame rate onto the frames.
+            latest_frame_only (bool): If True, only the newest captured frame waits for the detector and stale frames
+                                      are dropped, bounding the display latency to about one detection.
+
+        Returns:
+            None
+        """
+        self.cap = cap
+        self.face_detector = face_detector
+        self.out = out
+        self.window_name = window_name
+        self.latest_frame_only = latest_frame_only
+
+        self.capture_queue = queue.Queue(maxsize=1 if latest_frame_only else queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        self.display_queue = queue.Queue(maxsize=queue_size)
+
+        self.stop_event = threading.Event()
+        self.metrics = metrics if metrics is not None else RunMetrics('webcam')
+        self.show_fps = show_fps
+        self.captured = 0
+        self.frame_pool = FramePool()
+        self.start_time = None
+        self._threads = []
+        self._stage_threads = {}
+
+    def _capture_loop(self) -> None:
+        try:
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                ret, frame = self.frame_pool.read(self.cap)
+                if not ret:
+                    print("Capture stopped returning frames, ending the feed.")
+                    break
+                captured = time.perf_counter()
+                self.metrics.observe('capture', captured - start)
+                item = (self.captured, captured, frame)
+                self.captured += 1
+                if self.latest_frame_only:
+                    # Never wait for the detector: the newest frame replaces one it has not picked up yet.
+                    self._offer(self.capture_queue, item, 'stale')
+                    continue
+                # Wait for room downstream but keep checking whether the pipeline was stopped.
+                while not self.stop_event.is_set():
+                    if self._put(self.capture_queue, item, 'detect', timeout=0.1):
+                        break
+        except Exception as e:
+            print(f"Error in capture stage: {e}")
+        finally:
+            self.metrics.increment('frame_allocations', self.frame_pool.allocated)
+            self.stop_event.set()
+            if self.latest_frame_only:
+                self._offer(self.capture_queue, _END, 'stale')
+            else:
+                self._put(self.capture_queue, _END, 'detect')
+
+    def _detect_loop(self) -> None:
+        try:
+            while True:
+                item = self.capture_queue.get()
+                if item is _END:
+                    break
+                frame = item[2]
+                start = time.perf_counter()
+                detections = self.face_detector.detect_faces(frame)
+                rendered = time.perf_counter()
+                render_detections(frame, detections, self.face_detector.settings)
+                self.metrics.observe('detect', rendered - start)
+                self.metrics.observe('render', time.perf_counter() - rendered)
+                self.metrics.record_frame(len(detections))
+                if self.show_fps:
+                    draw_fps_overlay(frame, self.metrics.recent_fps())
+                self._put(self.write_queue, item, 'write')
+                self._offer(self.display_queue, item, 'display')
+        except Exception as e:
+            print(f"Error in detect stage: {e}")
+            self.stop_event.set()
+        finally:
+            self._put(self.write_queue, _END, 'write')
+            self._offer(self.display_queue, _END, 'display')
+
+    def _put(self, target: queue.Queue, item, consumer: str, timeout: float = None) -> bool:
+        # Wait for room on a queue for as long as the stage reading it is running (up to timeout seconds when given).
+        # A stage that ended early (after an error) no longer drains its queue, so waiting on it would never return.
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            try:
+                target.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                thread = self._stage_threads.get(consumer)
+                if thread is not None and not thread.is_alive():
+                    return False
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return False
+
+    def _offer(self, target: queue.Queue, item, reason: str) -> None:
+        # Put without waiting; when the queue is full the oldest waiting frame is dropped and counted.
+        while True:
+            try:
+                target.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    dropped = target.get_nowait()
+                    if dropped is _END:
+                        # Never lose the end marker; keep it and drop the new frame instead.
+                        target.put_nowait(dropped)
+                        if item is not _END:
+                            self.metrics.record_drop(reason)
+                        return
+                    self.metrics.record_drop(reason)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _write_loop(self) -> None:
+        try:
+            last_index, last_frame = -1, None
+            while True:
+                item = self.write_queue.get()
+                if item is _END:
+                    break
+                index, _, frame = item
+                start = time.perf_counter()
+                # Fill the slots of frames dropped before detection so the recording keeps the camera's timeline.
+                self._write_repeated(last_frame if last_frame is not None else frame, index - last_index - 1)
+                self.out.write(frame)
+                self.metrics.observe('write', time.perf_counter() - start)
+                last_index, last_frame = index, frame
+            if last_frame is not None:
+                self._write_repeated(last_frame, self.captured - last_index - 1)
+        except Exception as e:
+            print(f"Error in write stage: {e}")
+            self.stop_event.set()
+
+    def _write_repeated(self, frame, count: int) -> None:
+        for _ in range(count):
+            self.out.write(frame)
+        if count > 0:
+            self.metrics.increment('repeated_frames', count)
+
+    def stats(self) -> dict:
+        """
+        Get the current statistics of the pipeline.
+
+        Returns:
+            dict: The queue depths along with the metrics snapshot (fps, dropped frames, latency histograms).
+        """
+        stats = self.metrics.snapshot()
+        stats['captured'] = self.captured
+        stats['queue_depths'] = {'capture': self.capture_queue.qsize(), 'write': self.write_queue.qsize(),
+                                 'display': self.display_queue.qsize()}
+        return stats
+
+    def print_stats(self) -> None:
+        """
+        Print the current statistics of the pipeline.
+
+        Returns:
+            None
+        """
+        depths = self.stats()['queue_depths']
+        print(f"pipeline: {self.metrics.summary()} | queues capture={depths['capture']} write={depths['write']} "
+              f"display={depths['display']}")
+
+    def run(self) -> dict:
+        """
+        Start the capture, detect and write threads and display frames until 'q' is pressed or the feed ends.
+
+        Returns:
+            dict: The final statistics of the pipeline.
+        """
+        self.start_time = time.perf_counter()
+        if hasattr(self.face_detector, 'reset'):
+            self.face_detector.reset()
+        self.metrics.watch_detector(self.face_detector)
+        self._stage_threads = {name: threading.Thread(target=target, name=f'pipeline-{name}', daemon=True)
+                               for name, target in (('capture', self._capture_loop), ('detect', self._detect_loop),
+                                                    ('write', self._write_loop))}
+        self._threads = list(self._stage_threads.values())
+        for thread in self._threads:
+            thread.start()
+
+        last_stats = self.start_time
+        try:
+            while True:
+                try:
+                    item = self.display_queue.get(timeout=0.1)
+                except queue.Empty:
+                    item = None
+                    if not any(thread.is_alive() for thread in self._threads[:2]):
+                        break
+                if item is _END:
+                    break
+                if item is not None:
+                    start = time.perf_counter()
+                    cv2.imshow(self.window_name, item[2])
+                    shown = time.perf_counter()
+                    self.metrics.observe('display', shown - start)
+                    # Time from the camera handing over the frame to it being on screen.
+                    self.metrics.observe('end_to_end', shown - item[1])
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                if time.perf_counter() - last_stats >= STATS_INTERVAL:
+                    self.print_stats()
+                    self.metrics.maybe_export()
+                    last_stats = time.perf_counter()
+        finally:
+            self.stop()
+        self.print_stats()
+        try:
+            self.metrics.export()
+        except OSError as e:
+            print(f"Error exporting metrics: {e}")
+        return self.stats()
+
+    def stop(self) -> None:
+        """
+        Stop capturing and wait for the detect and write stages to finish the frames already queued.
+
+        Returns:
+            None
+        """
+        self.stop_event.set()
+        # Keep draining the display queue so the detect stage is never left waiting on it.
+        while any(thread.is_alive() for thread in self._threads):
+            try:
+                self.display_queue.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        for thread in self._threads:
+            thread.join()
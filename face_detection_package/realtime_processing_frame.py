@@ -6,7 +6,8 @@ Date: 12-19-23
 Description:
     This module defines the ProcessRealtimeDetections class, which is responsible for creating a graphical user
     interface (GUI) to process realtime video feeds from internal or external webcams, detect faces, and display the results.
-    It uses face detection algorithms and provides options for internal or external webcams processing.
+    It uses face detection algorithms and provides options for internal or external webcams processing, as well as
+    for processing several cameras, streams or videos at once.
 
 Classes:
 - ProcessRealtimeDetections: A class representing the GUI for processing realtime video feeds from internal or external webcams
@@ -17,12 +18,18 @@ Dependencies:
 - customtkinter as ctk: A customized version of the tkinter library for GUI development.
 - datetime: Offers functionalities for working with dates and times.
 - cv2: OpenCV library for computer vision tasks.
+- face_detection_package.tracking: Contains the wrapper that tracks faces between full detections.
+- face_detection_package.realtime_pipeline: Module containing the RealtimePipeline class that runs the feed stages.
+- face_detection_package.multi_source: Module containing the MultiSourceProcessor class that runs several feeds.
+
+Note:
+- OpenCV and the modules depending on it are imported when a feed is opened rather than at module level, so they
+  do not delay the window from appearing (the DetectorSettings frame imports them in the background).
 """
 
 import os
 import customtkinter as ctk
 import datetime
-import cv2
 
 
 class ProcessRealtimeDetections(ctk.CTkFrame):
@@ -57,6 +64,10 @@ class ProcessRealtimeDetections(ctk.CTkFrame):
                                                  fg_color=self.gui_blue, font=('Roboto', 12),
                                                  text_color='white', command=lambda: self.detect_over_webcam(1))
 
+        self.multiple_feeds_btn = ctk.CTkButton(self.detections_frame, text="Multiple Feeds",
+                                                fg_color=self.gui_blue, font=('Roboto', 12),
+                                                text_color='white', command=self.detect_over_multiple_feeds)
+
         self.status_lbl = ctk.CTkLabel(self.detections_frame, text='', font=('Roboto', 16, 'bold'), text_color='white')
 
         self.bottom_border_lbl = ctk.CTkLabel(self.detections_frame, text='', bg_color=self.gui_red, text_color='white')
@@ -66,6 +77,7 @@ class ProcessRealtimeDetections(ctk.CTkFrame):
         self.rowconfigure(0, weight=1, uniform='a')
 
         self.face_detector = None
+        self.pooled_detector = None
         print(self.face_detector)
         self.directory_manager = self.parent.directory_manager
 
@@ -83,10 +95,31 @@ class ProcessRealtimeDetections(ctk.CTkFrame):
         """
         print(
             f"in ... before set we have the detector = {self.face_detector} and the staticMode_flag = {staticMode_flag}")
-        # Modify the following line to set the detector directly
-        self.face_detector = self.parent.settings.haar_detector
+        # Build (or reuse) the detector of the backend selected in the settings frame
+        self.release_detector()
+        self.pooled_detector = self.parent.settings.get_detector(static_mode=bool(staticMode_flag))
+        self.face_detector = self.pooled_detector
+        # Video streams only run the full detector every detect_interval frames and track faces in between, and
+        # reuse the previous detections for frames that have not changed.
+        if not staticMode_flag:
+            from face_detection_package.frame_skipping import skip_unchanged_frames
+            from face_detection_package.tracking import wrap_detector
+            self.face_detector = skip_unchanged_frames(
+                wrap_detector(self.face_detector, self.parent.settings.detect_interval),
+                self.parent.settings.skip_threshold)
         print(f"in create detector, set self.face_detector = {self.face_detector}")
 
+    def release_detector(self) -> None:
+        """
+        Give the detector obtained in create_detector back to the settings frame's detector pool.
+
+        Returns:
+            None
+        """
+        if getattr(self, 'pooled_detector', None) is not None:
+            self.parent.settings.release_detector(self.pooled_detector)
+            self.pooled_detector = None
+
     def create_widgets(self) -> None:
         """
         Create widgets for the PostProcessDetections frame.
@@ -98,6 +131,7 @@ class ProcessRealtimeDetections(ctk.CTkFrame):
         self.detections_label.pack(fill='both', pady=(0, 10), ipady=15)
         self.internal_webcam_btn.pack(pady=(40, 20))
         self.external_webcam_btn.pack(pady=(20, 20))
+        self.multiple_feeds_btn.pack(pady=(20, 20))
         self.status_lbl.pack()
         self.bottom_border_lbl.pack(fill='both', side='bottom')
 
@@ -128,8 +162,12 @@ class ProcessRealtimeDetections(ctk.CTkFrame):
         Returns:
             None
         """
+        import cv2
+        from face_detection_package.metrics import create_run_metrics
+        from face_detection_package.output_writers import create_writer, output_extension
+        from face_detection_package.realtime_pipeline import RealtimePipeline
         try:
-            self.create_detector(staticMode_flag=True)
+            self.create_detector(staticMode_flag=False)
             print(f"In detect over webcam,\n detector = {self.face_detector}")
             current_time = datetime.datetime.now()
             timestamp = current_time.strftime("%Y%m%d_%H%M%S")
@@ -144,20 +182,20 @@ class ProcessRealtimeDetections(ctk.CTkFrame):
                 raise ValueError(
                     f"Error opening camera channel {channel}. Please check if an external camera is connected.")
 
-            # Create a VideoWriter object
-            out = cv2.VideoWriter(
-                os.path.join(self.directory_manager.recordings_dir, f'{timestamp}_{channel}_webcam_recording.mp4'),
-                cv2.VideoWriter_fourcc(*'mp4v'), int(cap.get(cv2.CAP_PROP_FPS)), (640, 480))
-
-            while True:
-                ret, frame = cap.read()
-                print("in detect webcam, read capture and calling face detector.detect_faces method on frame")
-                self.face_detector.detect_faces(frame)
-                print("method called, writing to file and showing...")
-                out.write(frame)
-                cv2.imshow("Webcam - Press 'q' key to quit.", frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+            # The writer encodes on its own thread and opens the recording with the size of the camera's frames.
+            settings = self.parent.settings
+            extension = output_extension(settings.output_writer, settings.output_fourcc)
+            out = create_writer(settings.output_writer,
+                                os.path.join(self.directory_manager.recordings_dir,
+                                             f'{timestamp}_{channel}_webcam_recording{extension}'),
+                                cap.get(cv2.CAP_PROP_FPS), fourcc=settings.output_fourcc)
+
+            # Capture, detection and writing run on their own threads while frames are displayed here.
+            metrics = create_run_metrics(f'webcam_{channel}', settings.metrics_format,
+                                         self.directory_manager.metrics_dir)
+            pipeline = RealtimePipeline(cap, self.face_detector, out, metrics=metrics, show_fps=settings.show_fps,
+                                        latest_frame_only=settings.low_latency)
+            pipeline.run()
             cap.release()
             out.release()
             cv2.destroyAllWindows()
@@ -165,3 +203,47 @@ class ProcessRealtimeDetections(ctk.CTkFrame):
             print(f"OpenCV Error in detect_over_webcam: {cve}")
         except Exception as e:
             print(f"Error in detect_over_webcam: {e}")
+        finally:
+            self.release_detector()
+
+    def detect_over_multiple_feeds(self) -> None:
+        """
+        Detect faces in several feeds at once. The feeds are entered as a comma separated list of camera channels,
+        stream URLs or video files; each is shown in its own window and recorded separately. Press 'q' in any of the
+        windows to stop.
+
+        Raises:
+            ValueError: If none of the entered feeds could be opened.
+            cv2.error: If an OpenCV-related error occurs during feed processing.
+            Exception: For other generic exceptions.
+
+        Returns:
+            None
+        """
+        import cv2
+        from face_detection_package.multi_source import MultiSourceProcessor
+        try:
+            dialog = ctk.CTkInputDialog(text="Enter camera channels, stream URLs or video files\n separated by commas:",
+                                        title="Multiple Feeds")
+            text = dialog.get_input()
+            sources = [source.strip() for source in (text or '').split(',') if source.strip()]
+            if not sources:
+                return
+            settings = self.parent.settings
+            processor = MultiSourceProcessor(sources, settings.detector_pool, settings.backend,
+                                             settings.detector_options(), detect_interval=settings.detect_interval,
+                                             skip_threshold=settings.skip_threshold,
+                                             output_dir=self.directory_manager.recordings_dir,
+                                             writer=settings.output_writer, fourcc=settings.output_fourcc,
+                                             metrics_format=settings.metrics_format,
+                                             metrics_dir=self.directory_manager.metrics_dir,
+                                             show_fps=settings.show_fps)
+            stats = processor.run(display=True)
+            # Update the status label after processing
+            self.status_lbl.configure(text='\n'.join(f"{source['name']}: {source['fps']:.1f} fps" for source in stats))
+            # Schedule clearing the label after 5 seconds
+            self.after(5000, self.clear_status_label)
+        except cv2.error as cve:
+            print(f"OpenCV Error in detect_over_multiple_feeds: {cve}")
+        except Exception as e:
+            print(f"Error in detect_over_multiple_feeds: {e}")
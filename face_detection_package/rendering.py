@@ -0,0 +1,206 @@
+"""
+Module: rendering.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides the functions that draw detections onto a frame. Detectors only find faces; the selected
+    effects (bounding box and/or redaction) are applied here, so detection results can be rendered any number of times
+    or not at all. Redaction merges the face boxes of a frame into non-overlapping regions and applies the selected
+    mode once per region, so overlapping faces are not redacted twice and the cost does not grow with repeated work.
+    Faces that overlap no other face (the usual case) skip the grouping and are redacted in place: the effect writes
+    its result straight into the face's region of the frame.
+
+Functions:
+- draw_rectangle(frame, dims, settings) -> None: Apply the selected effects to a single face box.
+- redact(frame, boxes, mode) -> None: Redact every face box of a frame in a single pass per region.
+- render_detections(frame, detections, settings) -> None: Apply the selected effects to every detected face.
+
+Constants:
+- BOX_COLOR: Color of the bounding box around detected faces.
+- BOX_THICKNESS: Thickness of the bounding box.
+- BLUR_KERNEL: Kernel size of the 'blur' redaction mode.
+- REDACTION_MODES: Names of the available redaction modes.
+- DEFAULT_REDACTION_MODE: Redaction mode used when none is selected.
+- PIXELATE_BLOCKS: Number of blocks across a face in the 'pixelate' mode.
+- FAST_BLUR_FACE_SIZE: Face size in pixels the 'fast_blur' mode blurs at.
+- FAST_BLUR_RATIO: Blur kernel of the 'fast_blur' mode as a fraction of the face size.
+- FILL_COLOR: Color of the 'fill' mode.
+- MERGE_AREA_RATIO: Overlapping boxes are redacted as one region while it is at most this much larger than the boxes.
+"""
+
+import statistics
+
+import cv2
+import numpy as np
+
+from face_detection_package.box_utils import group_overlapping, overlap_matrix
+
+BOX_COLOR = (0, 0, 255)
+BOX_THICKNESS = 2
+BLUR_KERNEL = (50, 50)
+PIXELATE_BLOCKS = 12
+FAST_BLUR_FACE_SIZE = 16
+FAST_BLUR_RATIO = 0.3
+FILL_COLOR = (0, 0, 0)
+MERGE_AREA_RATIO = 1.5
+
+
+def _box_blur(roi: np.ndarray, face_size: int, dst: np.ndarray = None) -> np.ndarray:
+    # The original effect: a fixed-size box blur at full resolution.
+    return cv2.blur(roi, BLUR_KERNEL, dst=dst)
+
+
+def _pixelate(roi: np.ndarray, face_size: int, dst: np.ndarray = None) -> np.ndarray:
+    h, w = roi.shape[:2]
+    block = max(1, face_size // PIXELATE_BLOCKS)
+    # One sample per block is enough for the block colors, and costs a fraction of averaging every pixel (INTER_AREA).
+    small = cv2.resize(roi, (max(1, -(-w // block)), max(1, -(-h // block))), interpolation=cv2.INTER_LINEAR)
+    return cv2.resize(small, (w, h), dst=dst, interpolation=cv2.INTER_NEAREST)
+
+
+def _fast_blur(roi: np.ndarray, face_size: int, dst: np.ndarray = None) -> np.ndarray:
+    # Blurring a downscaled copy and scaling it back up costs a fraction of a full-resolution blur of the same strength.
+    h, w = roi.shape[:2]
+    factor = max(1, face_size // FAST_BLUR_FACE_SIZE)
+    small = cv2.resize(roi, (max(1, w // factor), max(1, h // factor)), interpolation=cv2.INTER_LINEAR)
+    kernel = max(3, int(round(face_size * FAST_BLUR_RATIO / factor)))
+    small = cv2.blur(small, (kernel, kernel), dst=small)
+    return cv2.resize(small, (w, h), dst=dst, interpolation=cv2.INTER_LINEAR)
+
+
+def _redact_into(effect, source: np.ndarray, roi: np.ndarray, face_size: int) -> None:
+    redacted = effect(source, face_size, roi)
+    # OpenCV writes into the region itself; should it ever have allocated a new result instead, copy it back.
+    if redacted is not roi:
+        roi[...] = redacted
+
+
+# mode name -> function(roi, face_size, dst) returning the redacted roi, written into dst when given ('fill' is drawn
+# directly by redact)
+_REDACTIONS = {
+    'blur': _box_blur,
+    'fast_blur': _fast_blur,
+    'pixelate': _pixelate,
+}
+REDACTION_MODES = tuple(_REDACTIONS) + ('fill',)
+DEFAULT_REDACTION_MODE = 'blur'
+
+
+def draw_rectangle(frame: np.ndarray, dims, settings) -> None:
+    """
+    Apply the selected effects to a single face box.
+
+    Args:
+        frame (np.ndarray): The frame (BGR format) to draw on in place.
+        dims: The x, y, w, h of the face box.
+        settings: Settings object providing the draw_box and draw_blur flags.
+
+    Returns:
+        None
+    """
+    x, y, w, h = (int(v) for v in dims)
+    x2 = x + w
+    y2 = y + h
+    if settings.draw_blur:
+        # Create a blurred image for this area of the original frame and put it back in place
+        frame[y:y2, x:x2] = cv2.blur(frame[y:y2, x:x2], BLUR_KERNEL)
+    if settings.draw_box:
+        cv2.rectangle(frame, (x, y), (x2, y2), BOX_COLOR, BOX_THICKNESS)
+
+
+def redact(frame: np.ndarray, boxes, mode: str = DEFAULT_REDACTION_MODE) -> None:
+    """
+    Redact every face box of a frame. When no boxes overlap every box is redacted in place. Otherwise boxes are
+    merged into groups of overlapping boxes. When the bounding region of a group is not much larger than its boxes the
+    redaction is computed once over the region and the boxes are copied back from it; otherwise every box is redacted
+    from an unmodified copy of its pixels. Either way overlapping faces are never redacted twice over.
+
+    Args:
+        frame (np.ndarray): The frame (BGR format) to redact in place.
+        boxes: An (N, 4) array of x, y, w, h face boxes.
+        mode (str): The redaction mode, one of REDACTION_MODES.
+
+    Raises:
+        ValueError: If the redaction mode is unknown.
+
+    Returns:
+        None
+    """
+    if mode not in REDACTION_MODES:
+        raise ValueError(f"Unknown redaction mode '{mode}'. Available modes: {', '.join(REDACTION_MODES)}")
+    frame_h, frame_w = frame.shape[:2]
+    # Plain Python on a handful of boxes costs far less than the fixed overhead of numpy calls on tiny arrays.
+    rects = np.asarray(boxes, dtype=np.int64).reshape(-1, 4).tolist()
+    if not all(x >= 0 and y >= 0 and w > 0 and h > 0 and x + w <= frame_w and y + h <= frame_h
+               for x, y, w, h in rects):
+        # Only boxes reaching past the frame need clipping.
+        clipped = []
+        for x, y, w, h in rects:
+            x1, y1 = min(max(x, 0), frame_w), min(max(y, 0), frame_h)
+            x2, y2 = min(max(x + w, 0), frame_w), min(max(y + h, 0), frame_h)
+            if x2 > x1 and y2 > y1:
+                clipped.append([x1, y1, x2 - x1, y2 - y1])
+        rects = clipped
+
+    if mode == 'fill':
+        # Filling is idempotent, so overlapping boxes can simply be filled one after the other.
+        for x, y, w, h in rects:
+            cv2.rectangle(frame, (x, y), (x + w - 1, y + h - 1), FILL_COLOR, cv2.FILLED)
+        return
+
+    effect = _REDACTIONS[mode]
+    overlaps = overlap_matrix(rects) if len(rects) > 1 else None
+    # Every box overlaps itself, so no more overlapping pairs than boxes means the boxes are all separate.
+    if overlaps is None or np.count_nonzero(overlaps) == len(rects):
+        # The common case of a few separate faces: every face is its own region, so no grouping is needed.
+        for x, y, w, h in rects:
+            roi = frame[y:y + h, x:x + w]
+            _redact_into(effect, roi, roi, min(w, h))
+        return
+
+    for group in group_overlapping(rects, overlaps):
+        members = [rects[i] for i in group.tolist()]
+        if len(members) == 1:
+            x, y, w, h = members[0]
+            roi = frame[y:y + h, x:x + w]
+            _redact_into(effect, roi, roi, min(w, h))
+            continue
+        face_size = int(statistics.median(min(w, h) for _, _, w, h in members))
+        gx1, gy1 = min(x for x, _, _, _ in members), min(y for _, y, _, _ in members)
+        gx2, gy2 = max(x + w for x, _, w, _ in members), max(y + h for _, y, _, h in members)
+        if (gx2 - gx1) * (gy2 - gy1) > MERGE_AREA_RATIO * sum(w * h for _, _, w, h in members):
+            # A long chain of faces: redacting its whole bounding region would cost more than box by box.
+            crops = [frame[y:y + h, x:x + w].copy() for x, y, w, h in members]
+            for (x, y, w, h), crop in zip(members, crops):
+                _redact_into(effect, crop, frame[y:y + h, x:x + w], face_size)
+            continue
+        roi = frame[gy1:gy2, gx1:gx2]
+        redacted = effect(roi, face_size)
+        # Copying the boxes back one by one writes exactly their union (overlaps receive the same pixels twice).
+        for x, y, w, h in members:
+            x, y = x - gx1, y - gy1
+            roi[y:y + h, x:x + w] = redacted[y:y + h, x:x + w]
+
+
+def render_detections(frame: np.ndarray, detections, settings) -> None:
+    """
+    Apply the selected effects to every detected face. Faces are redacted first (with the settings' redaction_mode,
+    'blur' when it has none) and boxes are drawn afterwards so no box is redacted away by an overlapping face.
+
+    Args:
+        frame (np.ndarray): The frame (BGR format) to draw on in place.
+        detections: The Detections (or an iterable of x, y, w, h boxes) found in the frame.
+        settings: Settings object providing the draw_box and draw_blur flags.
+
+    Returns:
+        None
+    """
+    boxes = np.asarray(getattr(detections, 'boxes', list(detections)), dtype=np.int64).reshape(-1, 4)
+    if len(boxes) == 0:
+        return
+    if settings.draw_blur:
+        redact(frame, boxes, getattr(settings, 'redaction_mode', DEFAULT_REDACTION_MODE))
+    if settings.draw_box:
+        for x, y, w, h in boxes:
+            cv2.rectangle(frame, (int(x), int(y)), (int(x + w), int(y + h)), BOX_COLOR, BOX_THICKNESS)
@@ -0,0 +1,288 @@
+"""
+Module: segment_processing.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides segment-parallel post-processing of a single long video. The video is split into contiguous
+    frame ranges and every range is processed in a separate process with its own capture (positioned with
+    CAP_PROP_POS_FRAMES), detector and writer. Segments are written losslessly and then joined in frame order into a
+    single output encoded the same way as a serial run, so the frames around segment boundaries come out exactly as
+    they would from detect_over_video_file. When faces are tracked between full detections, or only searched for around
+    previous faces, the segment starts are aligned to the detection or full scan interval so that every segment starts
+    on a frame that gets a scheduled full-frame detection. Optionally a serial run is timed as well to report the
+    speedup.
+
+Functions:
+- split_frame_ranges(total_frames, segments, align) -> list: Split a frame count into contiguous (start, end) ranges.
+- open_capture_at(video_path, start) -> cv2.VideoCapture: Open a capture positioned at a given frame.
+- process_video_segments(video_path, video_path_out, workers, ...) -> dict: Process a video in parallel segments.
+- compare_boundary_frames(path_a, path_b, boundaries) -> list: Find boundary frames that differ between two videos.
+
+Constants:
+- SEGMENT_FOURCC: Lossless codec used for the intermediate segment files.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from face_detection_package.detector_registry import DEFAULT_BACKEND, create_detector
+from face_detection_package.frame_buffers import FramePool
+from face_detection_package.headless_settings import HeadlessSettings
+from face_detection_package.media_processing import detect_over_video_file
+from face_detection_package.rendering import render_detections
+from face_detection_package.tracking import wrap_detector
+
+SEGMENT_FOURCC = 'FFV1'
+
+
+def split_frame_ranges(total_frames: int, segments: int, align: int = 1) -> list:
+    """
+    Split a frame count into contiguous, near-equal (start, end) ranges. The last range has an end of None so that it
+    reads to the end of the stream even when the container reports an inaccurate frame count.
+
+    Args:
+        total_frames (int): The number of frames reported for the video.
+        segments (int): The number of ranges to split into.
+        align (int): Every range starts on a multiple of this many frames.
+
+    Returns:
+        list: The (start, end) ranges in frame order, end being exclusive.
+    """
+    align = max(1, align)
+    blocks = -(-total_frames // align)
+    segments = max(1, min(segments, blocks))
+    bounds = [min(total_frames, round(i * blocks / segments) * align) for i in range(segments + 1)]
+    ranges = [(bounds[i], bounds[i + 1]) for i in range(segments)]
+    ranges[-1] = (ranges[-1][0], None)
+    return ranges
+
+
+def open_capture_at(video_path: str, start: int) -> cv2.VideoCapture:
+    """
+    Open a capture positioned at a given frame. CAP_PROP_POS_FRAMES is used to seek; if the backend does not land on
+    the requested frame the capture is reopened and frames are grabbed up to it instead.
+
+    Args:
+        video_path (str): The video to open.
+        start (int): The index of the first frame to read.
+
+    Returns:
+        cv2.VideoCapture: The positioned capture.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != start:
+            print(f"Seek to frame {start} was inexact, grabbing forward instead.")
+            cap.release()
+            cap = cv2.VideoCapture(video_path)
+            for _ in range(start):
+                if not cap.grab():
+                    break
+    return cap
+
+
+def _process_segment(video_path: str, start: int, end, segment_path: str, settings: HeadlessSettings,
+                     opencv_threads: int, detector_options: dict, detect_interval: int, backend: str) -> dict:
+    """
+    Detect faces over one frame range of a video and write it losslessly to a segment file.
+
+    Args:
+        video_path (str): The video to process.
+        start (int): The first frame of the range.
+        end (int): The frame after the last frame of the range, or None to read to the end of the stream.
+        segment_path (str): The path the segment is written to.
+        settings (HeadlessSettings): The effect settings used by the detector.
+        opencv_threads (int): The number of threads OpenCV may use in this process.
+        detector_options (dict): Keyword arguments passed to the detector (e.g. detection_width).
+        detect_interval (int): Number of frames between full detections.
+        backend (str): The name of the detector backend.
+
+    Returns:
+        dict: The segment path, range, frame count and elapsed seconds.
+    """
+    started = time.perf_counter()
+    cv2.setNumThreads(opencv_threads)
+    face_detector = wrap_detector(create_detector(backend, settings, **detector_options), detect_interval,
+                                  start_index=start)
+    cap = open_capture_at(video_path, start)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    out = None
+    frames = 0
+    # cv2.VideoWriter encodes synchronously, so two frame buffers take turns for the whole segment.
+    frame_pool = FramePool()
+    try:
+        while end is None or start + frames < end:
+            ret, frame = frame_pool.read(cap)
+            if not ret:
+                break
+            if out is None:
+                H, W, _ = frame.shape
+                out = cv2.VideoWriter(segment_path, cv2.VideoWriter_fourcc(*SEGMENT_FOURCC), fps, (W, H))
+            render_detections(frame, face_detector.detect_faces(frame), settings)
+            out.write(frame)
+            frames += 1
+    finally:
+        cap.release()
+        if out is not None:
+            out.release()
+    return {'path': segment_path, 'start': start, 'end': end, 'frames': frames,
+            'seconds': time.perf_counter() - started}
+
+
+def _join_segments(segments: list, video_path_out: str, fps: float, size: tuple) -> int:
+    """
+    Join segment files in frame order into a single output encoded like a serial run.
+
+    Args:
+        segments (list): The segment results in frame order.
+        video_path_out (str): The path the joined video is saved to.
+        fps (float): The frame rate of the source video.
+        size (tuple): The (width, height) of the frames.
+
+    Returns:
+        int: The number of frames written.
+    """
+    out = cv2.VideoWriter(video_path_out, cv2.VideoWriter_fourcc(*'mp4v'), int(fps), size)
+    written = 0
+    try:
+        for segment in segments:
+            if not segment['frames']:
+                continue
+            cap = cv2.VideoCapture(segment['path'])
+            frame_pool = FramePool()
+            ret, frame = frame_pool.read(cap)
+            while ret:
+                out.write(frame)
+                written += 1
+                ret, frame = frame_pool.read(cap)
+            cap.release()
+    finally:
+        out.release()
+    return written
+
+
+def compare_boundary_frames(path_a: str, path_b: str, boundaries: list) -> list:
+    """
+    Compare the frames on either side of each segment boundary in two videos.
+
+    Args:
+        path_a (str): The first video.
+        path_b (str): The second video.
+        boundaries (list): The indices of the first frame of every segment after the first.
+
+    Returns:
+        list: The frame indices that differ or are missing from either video.
+    """
+    indices = sorted({i for b in boundaries for i in (b - 1, b) if i >= 0})
+    if not indices:
+        return []
+    wanted = set(indices)
+    frames_a, frames_b = {}, {}
+    for path, frames in ((path_a, frames_a), (path_b, frames_b)):
+        cap = cv2.VideoCapture(path)
+        index = 0
+        ret, frame = cap.read()
+        while ret and index <= indices[-1]:
+            if index in wanted:
+                frames[index] = frame
+            index += 1
+            ret, frame = cap.read()
+        cap.release()
+    return [i for i in indices
+            if i not in frames_a or i not in frames_b or not np.array_equal(frames_a[i], frames_b[i])]
+
+
+def process_video_segments(video_path: str, video_path_out: str, workers: int = None, opencv_threads: int = 1,
+                           draw_box: bool = True, draw_blur: bool = False, compare_serial: bool = False,
+                           detector_options: dict = None, detect_interval: int = 1,
+                           backend: str = DEFAULT_BACKEND, redaction_mode: str = 'blur') -> dict:
+    """
+    Process a video by detecting faces over contiguous frame ranges in parallel processes and joining the results.
+
+    Args:
+        video_path (str): The video to process.
+        video_path_out (str): The path the processed video is saved to.
+        workers (int): The number of segments and worker processes (defaults to the number of cores).
+        opencv_threads (int): The number of OpenCV threads per worker.
+        draw_box (bool): Whether to draw bounding boxes around detections.
+        draw_blur (bool): Whether to blur detections.
+        compare_serial (bool): Whether to also time a serial run, report the speedup and check the boundary frames.
+        detector_options (dict): Keyword arguments passed to each worker's detector (e.g. detection_width). A
+                                 motion_gating option is dropped, as the background model cannot be split.
+        detect_interval (int): Number of frames between full detections (faces are tracked in between).
+        backend (str): The name of the detector backend.
+        redaction_mode (str): The redaction mode applied to detections when draw_blur is set.
+
+    Raises:
+        ValueError: If the video cannot be opened or contains no frames.
+
+    Returns:
+        dict: The frame count, parallel time and (when compare_serial is set) serial time, speedup and mismatches.
+    """
+    workers = workers or os.cpu_count() or 1
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    ret, frame = cap.read()
+    cap.release()
+    if not ret or total_frames <= 0:
+        raise ValueError(f"Unable to read frames from {video_path}.")
+    H, W, _ = frame.shape
+
+    settings = HeadlessSettings(draw_box=draw_box, draw_blur=draw_blur, redaction_mode=redaction_mode)
+    detector_options = dict(detector_options or {})
+    if detector_options.pop('motion_gating', None):
+        # Every segment would learn its own background from its first frame on, so the frames after each boundary
+        # would be gated differently than in a serial run.
+        print("Motion gating is not supported for segment-parallel processing and has been disabled.")
+    if detect_interval > 1:
+        align = detect_interval
+    elif detector_options.get('roi_search'):
+        align = detector_options.get('full_scan_interval', 10)
+    else:
+        align = 1
+    ranges = split_frame_ranges(total_frames, workers, align=align)
+    temp_dir = tempfile.mkdtemp(prefix='fdsw_segments_')
+    print(f"Processing {video_path} as {len(ranges)} segments of ~{total_frames // len(ranges)} frames")
+
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [executor.submit(_process_segment, video_path, first, end,
+                                       os.path.join(temp_dir, f'segment_{i:04d}.avi'), settings, opencv_threads,
+                                       detector_options, detect_interval, backend)
+                       for i, (first, end) in enumerate(ranges)]
+            segments = [future.result() for future in futures]
+        frames = _join_segments(segments, video_path_out, fps, (W, H))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    parallel_seconds = time.perf_counter() - start
+
+    report = {'frames': frames, 'segments': len(ranges), 'parallel_seconds': parallel_seconds}
+    print(f"Segment-parallel run: {frames} frames in {parallel_seconds:.2f}s ({frames / parallel_seconds:.2f} fps)")
+
+    if compare_serial:
+        root, ext = os.path.splitext(video_path_out)
+        serial_path_out = f'{root}_serial{ext}'
+        start = time.perf_counter()
+        face_detector = wrap_detector(create_detector(backend, settings, **detector_options), detect_interval)
+        serial_frames = detect_over_video_file(face_detector, video_path, serial_path_out)
+        serial_seconds = time.perf_counter() - start
+        mismatches = compare_boundary_frames(video_path_out, serial_path_out, [first for first, _ in ranges[1:]])
+        report.update({'serial_frames': serial_frames, 'serial_seconds': serial_seconds,
+                       'speedup': serial_seconds / parallel_seconds, 'boundary_mismatches': mismatches})
+        print(f"Serial run: {serial_frames} frames in {serial_seconds:.2f}s, "
+              f"speedup {report['speedup']:.2f}x on {len(ranges)} workers")
+        if mismatches or serial_frames != frames:
+            print(f"Warning: output differs from the serial run at frames {mismatches}")
+        else:
+            print("Boundary frames match the serial run.")
+    return report
@@ -6,22 +6,73 @@ Date: 12-19-23
 Description:
     This module defines the DetectorSettings class, responsible for creating a graphical user interface (GUI) to configure
     settings for face detection, such as enabling/disabling detection bounding boxes and applying blurring effects.
-    It uses the customtkinter library for GUI development and incorporates a basic frontal face detector.
+    It uses the customtkinter library for GUI development and builds the selected detector backend through the
+    detector registry. Detectors are built and warmed up on a background thread so the window is usable right away
+    and the detector is ready by the time the first detection is requested, and are handed out through a DetectorPool
+    so concurrent processing paths each get their own instance.
 
 Classes:
 - DetectorSettings: A class representing the GUI for configuring face detection settings.
 
 Dependencies:
 - customtkinter as ctk: A customized version of the tkinter library for GUI development.
-- face_detection_package.frontal_face_detector: Module containing the FrontalFaceDetector class for face detection.
+- face_detection_package.detector_registry: Module used to select and build detector backends.
+- face_detection_package.detector_pool: Module providing the pool detectors are handed out from.
+- face_detection_package.detector_profiles: Module loading the tuned detector profiles of the deployment.
+
+Constants:
+- DETECTION_RESOLUTIONS: Detection resolution choices mapped to the frame width detection runs at (None for full).
+- DETECT_INTERVALS: Detection interval choices mapped to the number of frames between full detections.
+- SKIP_THRESHOLDS: Unchanged frame skipping choices mapped to the change threshold of the frame_skipping module.
+- MOTION_GATING: Motion gating choices mapped to the background subtractor of the Haar detector (None for off).
+- REDACTION_STYLES: Blur style choices mapped to the redaction modes of the rendering module.
+- OUTPUT_FORMATS: Output format choices mapped to the (writer backend, fourcc) of the output_writers module.
+- SIDECAR_OUTPUTS: Detect-only output choices (post-processing version) mapped to the formats of the sidecar module.
+- METRICS_EXPORTS: Metrics export choices mapped to the export formats of the metrics module (None for off).
+- NO_PROFILE: Profile choice that uses the default settings of the selected backend.
 
 Attributes:
 - draw_box (bool): Indicates whether to display detection bounding boxes.
 - draw_blur (bool): Indicates whether to apply blurring effects to detections.
+- detection_width (int): Width frames are downscaled to before detection (None for full resolution).
+- detect_interval (int): Number of video frames between full detections (faces are tracked in between).
+- skip_threshold (float): Change below which video frames reuse the previous detections (0 to detect every frame).
+- motion_gating (str): Background subtractor limiting detection to moving regions ('mog2' or 'knn', None for off).
+- redaction_mode (str): The redaction mode applied to detections when draw_blur is set.
+- show_fps (bool): Indicates whether to draw the processing frame rate onto processed frames.
+- low_latency (bool): Indicates whether realtime feeds only detect over the newest frame, dropping stale ones.
+- use_cache (bool): Indicates whether processed files reuse detections from the detection cache.
+- tile_images (bool): Indicates whether large images are searched in overlapping tiles.
+- output_writer (str): The writer backend processed videos and recordings are saved with.
+- output_fourcc (str): The codec used by the 'video' writer backend.
+- sidecar_format (str): If set, processed files only get a detection sidecar of this format (None to render them).
+- metrics_format (str): Format live metrics are exported in ('json' or 'prometheus', None for off).
+- backend (str): Name of the selected detector backend.
+- profile (str): Name of the selected detector profile (None for the default settings of the backend).
+- profile_options (dict): The detector options of the selected profile.
 """
 
+import threading
+import time
 import customtkinter as ctk
-from face_detection_package.frontal_face_detector import FrontalFaceDetector
+from face_detection_package.detector_registry import (DEFAULT_BACKEND, available_backends, display_name,
+                                                      backend_from_display_name)
+from face_detection_package.detector_pool import DetectorPool
+from face_detection_package.detector_profiles import PROFILES_FILE, get_profile, load_profiles
+
+DETECTION_RESOLUTIONS = {'Full': None, '1280 px': 1280, '960 px': 960, '640 px': 640}
+DETECT_INTERVALS = {'Every frame': 1, 'Every 2nd': 2, 'Every 5th': 5, 'Every 10th': 10}
+SKIP_THRESHOLDS = {'Off': 0.0, 'Strict': 2.0, 'Normal': 4.0, 'Aggressive': 8.0}
+# Kept in sync with FrontalFaceDetector.MOTION_SUBTRACTORS; only the Haar backend uses it.
+MOTION_GATING = {'Off': None, 'MOG2': 'mog2', 'KNN': 'knn'}
+# Kept in sync with rendering.REDACTION_MODES; not imported from there so OpenCV is not loaded with the window.
+REDACTION_STYLES = {'Blur': 'blur', 'Fast Blur': 'fast_blur', 'Pixelate': 'pixelate', 'Solid Fill': 'fill'}
+OUTPUT_FORMATS = {'MP4 (mp4v)': ('video', 'mp4v'), 'AVI (MJPG)': ('video', 'MJPG'),
+                  'MP4 (ffmpeg H.264)': ('ffmpeg', 'mp4v'), 'JPEG Sequence': ('jpeg', 'mp4v')}
+# Kept in sync with sidecar.SIDECAR_FORMATS.
+SIDECAR_OUTPUTS = {'Detections Only (JSONL)': 'jsonl', 'Detections Only (NumPy)': 'npz'}
+METRICS_EXPORTS = {'Off': None, 'JSON': 'json', 'Prometheus': 'prometheus'}
+NO_PROFILE = 'Default settings'
 
 
 class DetectorSettings(ctk.CTkFrame):
@@ -48,8 +99,11 @@ class DetectorSettings(ctk.CTkFrame):
         self.settings_label = ctk.CTkLabel(self.settings_frame, text='Settings', font=('Roboto', 20, 'bold'),
                                            bg_color=self.gui_red, text_color='white')
 
-        self.detector_label = ctk.CTkLabel(self.settings_frame, text="Basic Frontal Face Detector",
-                                           font=('Roboto', 14, 'bold', 'italic'), text_color='white')
+        self.detector_menu = ctk.CTkOptionMenu(self.settings_frame,
+                                               values=[display_name(name) for name in available_backends()],
+                                               width=220, fg_color=self.gui_blue, button_color=self.gui_blue,
+                                               font=('Roboto', 14, 'bold', 'italic'), command=self.update_backend)
+        self.detector_menu.set(display_name(DEFAULT_BACKEND))
 
         self.effects_label = ctk.CTkLabel(self.settings_frame, text='Effects:', font=('Roboto', 14), text_color='white')
 
@@ -61,6 +115,91 @@ class DetectorSettings(ctk.CTkFrame):
                                        font=('Roboto', 12),
                                        text_color='white', border_color=self.gui_blue)
 
+        self.redaction_frame = ctk.CTkFrame(self.settings_frame, fg_color='transparent')
+        self.redaction_label = ctk.CTkLabel(self.redaction_frame, text='Blur Style:', font=('Roboto', 14),
+                                            text_color='white')
+        self.redaction_menu = ctk.CTkOptionMenu(self.redaction_frame, values=list(REDACTION_STYLES),
+                                                width=100, fg_color=self.gui_blue, button_color=self.gui_blue,
+                                                font=('Roboto', 12), command=self.update_redaction_mode)
+        self.redaction_menu.set('Blur')
+
+        self.output_frame = ctk.CTkFrame(self.settings_frame, fg_color='transparent')
+        self.output_label = ctk.CTkLabel(self.output_frame, text='Output Format:', font=('Roboto', 14),
+                                         text_color='white')
+        # Only files can be processed without writing media; realtime feeds always record.
+        output_choices = list(OUTPUT_FORMATS) + (list(SIDECAR_OUTPUTS) if self.parent.version == 'pp' else [])
+        self.output_menu = ctk.CTkOptionMenu(self.output_frame, values=output_choices,
+                                             width=160, fg_color=self.gui_blue, button_color=self.gui_blue,
+                                             font=('Roboto', 12), command=self.update_output_format)
+        self.output_menu.set('MP4 (mp4v)')
+
+        self.fps_cb = ctk.CTkCheckBox(self.settings_frame, text='Show FPS', fg_color=self.gui_blue,
+                                      font=('Roboto', 12), text_color='white', border_color=self.gui_blue)
+
+        self.low_latency_cb = ctk.CTkCheckBox(self.settings_frame, text='Low Latency (Skip Stale Frames)',
+                                              fg_color=self.gui_blue, font=('Roboto', 12), text_color='white',
+                                              border_color=self.gui_blue)
+
+        self.cache_cb = ctk.CTkCheckBox(self.settings_frame, text='Cache Detections', fg_color=self.gui_blue,
+                                        font=('Roboto', 12), text_color='white', border_color=self.gui_blue)
+
+        self.tile_cb = ctk.CTkCheckBox(self.settings_frame, text='Tile Large Images', fg_color=self.gui_blue,
+                                       font=('Roboto', 12), text_color='white', border_color=self.gui_blue)
+
+        self.metrics_frame = ctk.CTkFrame(self.settings_frame, fg_color='transparent')
+        self.metrics_label = ctk.CTkLabel(self.metrics_frame, text='Export Metrics:', font=('Roboto', 14),
+                                          text_color='white')
+        self.metrics_menu = ctk.CTkOptionMenu(self.metrics_frame, values=list(METRICS_EXPORTS),
+                                              width=100, fg_color=self.gui_blue, button_color=self.gui_blue,
+                                              font=('Roboto', 12), command=self.update_metrics_format)
+        self.metrics_menu.set('Off')
+
+        self.resolution_frame = ctk.CTkFrame(self.settings_frame, fg_color='transparent')
+        self.resolution_label = ctk.CTkLabel(self.resolution_frame, text='Detection Resolution:', font=('Roboto', 14),
+                                             text_color='white')
+        self.resolution_menu = ctk.CTkOptionMenu(self.resolution_frame, values=list(DETECTION_RESOLUTIONS),
+                                                 width=100, fg_color=self.gui_blue, button_color=self.gui_blue,
+                                                 font=('Roboto', 12), command=self.update_detection_resolution)
+        self.resolution_menu.set('Full')
+
+        self.interval_frame = ctk.CTkFrame(self.settings_frame, fg_color='transparent')
+        self.interval_label = ctk.CTkLabel(self.interval_frame, text='Detect In Videos:', font=('Roboto', 14),
+                                           text_color='white')
+        self.interval_menu = ctk.CTkOptionMenu(self.interval_frame, values=list(DETECT_INTERVALS),
+                                               width=100, fg_color=self.gui_blue, button_color=self.gui_blue,
+                                               font=('Roboto', 12), command=self.update_detect_interval)
+        self.interval_menu.set('Every frame')
+
+        self.skip_frame = ctk.CTkFrame(self.settings_frame, fg_color='transparent')
+        self.skip_label = ctk.CTkLabel(self.skip_frame, text='Skip Unchanged Frames:', font=('Roboto', 14),
+                                       text_color='white')
+        self.skip_menu = ctk.CTkOptionMenu(self.skip_frame, values=list(SKIP_THRESHOLDS),
+                                           width=100, fg_color=self.gui_blue, button_color=self.gui_blue,
+                                           font=('Roboto', 12), command=self.update_skip_threshold)
+        self.skip_menu.set('Off')
+
+        self.motion_frame = ctk.CTkFrame(self.settings_frame, fg_color='transparent')
+        self.motion_label = ctk.CTkLabel(self.motion_frame, text='Motion Gating:', font=('Roboto', 14),
+                                         text_color='white')
+        self.motion_menu = ctk.CTkOptionMenu(self.motion_frame, values=list(MOTION_GATING),
+                                             width=100, fg_color=self.gui_blue, button_color=self.gui_blue,
+                                             font=('Roboto', 12), command=self.update_motion_gating)
+        self.motion_menu.set('Off')
+
+        # Profiles written by the autotuner for this deployment; the menu is only shown when there are any.
+        try:
+            profiles = load_profiles(PROFILES_FILE)
+        except Exception as e:
+            print(f"Error loading detector profiles from {PROFILES_FILE}: {e}")
+            profiles = {'default': None, 'profiles': {}}
+        self.profile_frame = ctk.CTkFrame(self.settings_frame, fg_color='transparent')
+        self.profile_label = ctk.CTkLabel(self.profile_frame, text='Profile:', font=('Roboto', 14),
+                                          text_color='white')
+        self.profile_menu = ctk.CTkOptionMenu(self.profile_frame, values=[NO_PROFILE] + list(profiles['profiles']),
+                                              width=140, fg_color=self.gui_blue, button_color=self.gui_blue,
+                                              font=('Roboto', 12), command=self.update_profile)
+        self.profile_menu.set(NO_PROFILE)
+
         self.bottom_border_lbl = ctk.CTkLabel(self.settings_frame, text='', bg_color=self.gui_red, text_color='white')
 
         # create the grid
@@ -70,20 +209,49 @@ class DetectorSettings(ctk.CTkFrame):
         # Set the default effect and face detector settings.
         self.draw_box = True
         self.draw_blur = False
+        self.redaction_mode = REDACTION_STYLES['Blur']
+        self.show_fps = False
+        self.low_latency = False
+        self.use_cache = False
+        self.tile_images = False
+        self.output_writer, self.output_fourcc = OUTPUT_FORMATS['MP4 (mp4v)']
+        self.sidecar_format = None
+        self.metrics_format = METRICS_EXPORTS['Off']
+        self.detection_width = DETECTION_RESOLUTIONS['Full']
+        self.detect_interval = DETECT_INTERVALS['Every frame']
+        self.skip_threshold = SKIP_THRESHOLDS['Off']
+        self.motion_gating = MOTION_GATING['Off']
 
-        # Initialize face detector
-        self.haar_detector = FrontalFaceDetector(self)
+        # Detectors are built per (backend, static mode, options) when first needed and reused afterwards.
+        self.backend = DEFAULT_BACKEND
+        self.profile = None
+        self.profile_options = {}
+        self.detector_pool = DetectorPool(self)
+        self.face_detector = None
 
-        # Set the default face detector
-        self.face_detector = self.haar_detector  # Set the default detector
+        # Start with the deployment's default profile when there is one.
+        if profiles['default'] in profiles['profiles']:
+            self.profile_menu.set(profiles['default'])
+            self.update_profile(profiles['default'])
+        else:
+            # Build and warm up the default face detector without holding up the window
+            self.start_warm_up()
 
         # Create IntVar to track the state of checkboxes
         self.bbox_var = ctk.IntVar(value=1)
         self.blur_var = ctk.IntVar(value=0)
+        self.fps_var = ctk.IntVar(value=0)
+        self.low_latency_var = ctk.IntVar(value=0)
+        self.cache_var = ctk.IntVar(value=0)
+        self.tile_var = ctk.IntVar(value=0)
 
         # Connect checkbox variables to their respective callbacks
         self.bbox_cb.configure(variable=self.bbox_var, command=self.update_checkbox)
         self.blur_cb.configure(variable=self.blur_var, command=self.update_checkbox)
+        self.fps_cb.configure(variable=self.fps_var, command=self.update_checkbox)
+        self.low_latency_cb.configure(variable=self.low_latency_var, command=self.update_checkbox)
+        self.cache_cb.configure(variable=self.cache_var, command=self.update_checkbox)
+        self.tile_cb.configure(variable=self.tile_var, command=self.update_checkbox)
 
         self.static_mode_flag = False  # Default value, change as needed
 
@@ -99,11 +267,44 @@ class DetectorSettings(ctk.CTkFrame):
         # settings layout
         self.settings_frame.grid(row=0, column=0, columnspan=3, sticky='nsew', pady=(0, 5), padx=(5, 5))
         self.settings_label.pack(fill='both', pady=(0, 10), ipady=15)
-        # Add a label for the detector
-        self.detector_label.pack(pady=(20, 0), padx=(20, 0), anchor='w')
+        # Add the detector selection
+        self.detector_menu.pack(pady=(20, 0), padx=(20, 0), anchor='w')
+        if len(self.profile_menu.cget('values')) > 1:
+            self.profile_frame.pack(pady=(10, 0), padx=(20, 0), anchor='w')
+            self.profile_label.pack(side='left')
+            self.profile_menu.pack(side='left', padx=(10, 0))
         self.effects_label.pack(pady=(20, 0), padx=(20, 0), anchor='w')
         self.bbox_cb.pack(pady=10, padx=(20, 0), anchor='w')
         self.blur_cb.pack(pady=10, padx=(20, 0), anchor='w')
+        self.redaction_frame.pack(pady=(0, 0), padx=(20, 0), anchor='w')
+        self.redaction_label.pack(side='left')
+        self.redaction_menu.pack(side='left', padx=(10, 0))
+        self.output_frame.pack(pady=(10, 0), padx=(20, 0), anchor='w')
+        self.output_label.pack(side='left')
+        self.output_menu.pack(side='left', padx=(10, 0))
+        self.fps_cb.pack(pady=(10, 0), padx=(20, 0), anchor='w')
+        if self.parent.version == 'rf':
+            # Only realtime feeds can fall behind the source.
+            self.low_latency_cb.pack(pady=(10, 0), padx=(20, 0), anchor='w')
+        else:
+            # Only files can be processed again with the same content.
+            self.cache_cb.pack(pady=(10, 0), padx=(20, 0), anchor='w')
+            self.tile_cb.pack(pady=(10, 0), padx=(20, 0), anchor='w')
+        self.metrics_frame.pack(pady=(10, 0), padx=(20, 0), anchor='w')
+        self.metrics_label.pack(side='left')
+        self.metrics_menu.pack(side='left', padx=(10, 0))
+        self.resolution_frame.pack(pady=(10, 0), padx=(20, 0), anchor='w')
+        self.resolution_label.pack(side='left')
+        self.resolution_menu.pack(side='left', padx=(10, 0))
+        self.interval_frame.pack(pady=(10, 0), padx=(20, 0), anchor='w')
+        self.interval_label.pack(side='left')
+        self.interval_menu.pack(side='left', padx=(10, 0))
+        self.skip_frame.pack(pady=(10, 0), padx=(20, 0), anchor='w')
+        self.skip_label.pack(side='left')
+        self.skip_menu.pack(side='left', padx=(10, 0))
+        self.motion_frame.pack(pady=(10, 0), padx=(20, 0), anchor='w')
+        self.motion_label.pack(side='left')
+        self.motion_menu.pack(side='left', padx=(10, 0))
         self.bottom_border_lbl.pack(fill='both', side='bottom')
 
     def update_checkbox(self) -> None:
@@ -115,5 +316,235 @@ class DetectorSettings(ctk.CTkFrame):
         """
         self.draw_box = bool(self.bbox_var.get())
         self.draw_blur = bool(self.blur_var.get())
+        self.show_fps = bool(self.fps_var.get())
+        self.low_latency = bool(self.low_latency_var.get())
+        self.use_cache = bool(self.cache_var.get())
+        self.tile_images = bool(self.tile_var.get())
         print(f'draw box set to {self.draw_box}')
         print(f'draw blur set to {self.draw_blur}')
+        print(f'show fps set to {self.show_fps}')
+        print(f'low latency set to {self.low_latency}')
+        print(f'use cache set to {self.use_cache}')
+        print(f'tile images set to {self.tile_images}')
+
+    def update_redaction_mode(self, choice: str) -> None:
+        """
+        Update how blurred detections are redacted based on the selected option.
+
+        Args:
+            choice (str): The selected blur style option.
+
+        Returns:
+            None
+        """
+        self.redaction_mode = REDACTION_STYLES[choice]
+        print(f'redaction mode set to {self.redaction_mode}')
+
+    def update_output_format(self, choice: str) -> None:
+        """
+        Update the writer processed videos and recordings are saved with (or the detection sidecar format in
+        detect-only mode) based on the selected option.
+
+        Args:
+            choice (str): The selected output format option.
+
+        Returns:
+            None
+        """
+        self.sidecar_format = SIDECAR_OUTPUTS.get(choice)
+        if self.sidecar_format:
+            print(f'detect only, sidecar format set to {self.sidecar_format}')
+            return
+        self.output_writer, self.output_fourcc = OUTPUT_FORMATS[choice]
+        print(f'output writer set to {self.output_writer} ({self.output_fourcc})')
+
+    def update_metrics_format(self, choice: str) -> None:
+        """
+        Update the format live metrics are exported in based on the selected option.
+
+        Args:
+            choice (str): The selected metrics export option.
+
+        Returns:
+            None
+        """
+        self.metrics_format = METRICS_EXPORTS[choice]
+        print(f'metrics format set to {self.metrics_format}')
+
+    def update_detection_resolution(self, choice: str) -> None:
+        """
+        Update the resolution the face detector runs at based on the selected option.
+
+        Args:
+            choice (str): The selected detection resolution option.
+
+        Returns:
+            None
+        """
+        self.detection_width = DETECTION_RESOLUTIONS[choice]
+        print(f'detection width set to {self.detection_width}')
+        self.start_warm_up()
+
+    def update_detect_interval(self, choice: str) -> None:
+        """
+        Update how often the full detector runs over video frames based on the selected option.
+
+        Args:
+            choice (str): The selected detection interval option.
+
+        Returns:
+            None
+        """
+        self.detect_interval = DETECT_INTERVALS[choice]
+        print(f'detect interval set to {self.detect_interval}')
+
+    def update_skip_threshold(self, choice: str) -> None:
+        """
+        Update how much a video frame must change before the detector runs on it again based on the selected option.
+
+        Args:
+            choice (str): The selected unchanged frame skipping option.
+
+        Returns:
+            None
+        """
+        self.skip_threshold = SKIP_THRESHOLDS[choice]
+        print(f'skip threshold set to {self.skip_threshold}')
+
+    def update_motion_gating(self, choice: str) -> None:
+        """
+        Update whether detection is limited to moving regions, and the background subtractor finding them, based on
+        the selected option.
+
+        Args:
+            choice (str): The selected motion gating option.
+
+        Returns:
+            None
+        """
+        self.motion_gating = MOTION_GATING[choice]
+        print(f'motion gating set to {self.motion_gating}')
+        self.start_warm_up()
+
+    def update_backend(self, choice: str) -> None:
+        """
+        Update the selected detector backend based on the selected option.
+
+        Args:
+            choice (str): The display name of the selected backend.
+
+        Returns:
+            None
+        """
+        backend = backend_from_display_name(choice)
+        if backend != self.backend and self.profile is not None:
+            # A profile's options were tuned for its own backend.
+            self.profile, self.profile_options = None, {}
+            self.profile_menu.set(NO_PROFILE)
+        self.backend = backend
+        print(f'detector backend set to {self.backend}')
+        self.start_warm_up()
+
+    def update_profile(self, choice: str) -> None:
+        """
+        Update the selected detector profile based on the selected option. A profile selects its backend along with
+        the detector options it was tuned with.
+
+        Args:
+            choice (str): The name of the selected profile, or NO_PROFILE for the backend's default settings.
+
+        Returns:
+            None
+        """
+        if choice == NO_PROFILE:
+            self.profile, self.profile_options = None, {}
+            print('detector profile cleared')
+        else:
+            try:
+                backend, options = get_profile(PROFILES_FILE, choice)
+            except Exception as e:
+                print(f"Error loading detector profile {choice}: {e}")
+                self.profile_menu.set(self.profile or NO_PROFILE)
+                return
+            if backend not in available_backends():
+                print(f"Detector profile {choice} needs the unavailable {backend} backend.")
+                self.profile_menu.set(self.profile or NO_PROFILE)
+                return
+            self.profile, self.profile_options, self.backend = choice, options, backend
+            self.detector_menu.set(display_name(backend))
+            print(f'detector profile set to {choice} ({backend})')
+        self.start_warm_up()
+
+    def start_warm_up(self) -> None:
+        """
+        Build and warm up the detectors of the selected backend on a background thread.
+
+        Returns:
+            None
+        """
+        # The post-processing version needs both the image (static) and video detectors.
+        static_modes = (False, True) if self.parent.version == 'pp' else (False,)
+        threading.Thread(target=self.warm_up, args=(self.backend, static_modes), name='detector-warm-up',
+                         daemon=True).start()
+
+    def warm_up(self, backend: str, static_modes: tuple) -> None:
+        """
+        Build the detectors of a backend and run them once on a blank frame so that imports, model loading and
+        OpenCV's first-call setup are done before the first detection is requested.
+
+        Args:
+            backend (str): The name of the backend to warm up.
+            static_modes (tuple): The static modes to build detectors for.
+
+        Returns:
+            None
+        """
+        try:
+            import numpy as np
+            start = time.perf_counter()
+            for static_mode in static_modes:
+                self.detector_pool.warm(backend, static_mode, np.zeros((240, 320, 3), dtype=np.uint8),
+                                        **self.detector_options())
+            print(f'{backend} detector warmed up in {time.perf_counter() - start:.2f}s')
+        except Exception as e:
+            print(f"Error warming up {backend} detector: {e}")
+
+    def detector_options(self) -> dict:
+        """
+        Get the detector constructor options of the current settings.
+
+        Returns:
+            dict: The detector options.
+        """
+        options = dict(self.profile_options)
+        # A detection resolution chosen in the settings overrides the profile's.
+        if self.detection_width is not None or 'detection_width' not in options:
+            options['detection_width'] = self.detection_width
+        options['motion_gating'] = self.motion_gating
+        return options
+
+    def get_detector(self, static_mode: bool = False):
+        """
+        Get a detector of the selected backend for exclusive use, building it the first time it is requested. A
+        request made while the detector is being warmed up waits for it instead of building another.
+
+        Args:
+            static_mode (bool): True for still images, False for videos and realtime feeds.
+
+        Returns:
+            The detector. It must be given back with release_detector() when processing is done.
+        """
+        self.face_detector = self.detector_pool.acquire(self.backend, static_mode, **self.detector_options())
+        return self.face_detector
+
+    def release_detector(self, detector) -> None:
+        """
+        Give a detector obtained from get_detector() back to the pool.
+
+        Args:
+            detector: The detector.
+
+        Returns:
+            None
+        """
+        self.detector_pool.release(detector)
@@ -0,0 +1,183 @@
+"""
+Module: sidecar.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides the detection sidecar files written in detect-only mode, where the faces found in a video or
+    image are saved instead of being drawn onto re-encoded media. A sidecar holds the frame index, timestamp, boxes
+    and (when the detector has them) scores of every processed frame, either as JSON Lines (one object per frame after
+    a metadata line, easy to stream and grep) or as a compressed NumPy archive (the most compact, loadable without
+    parsing).
+
+    JSONL layout:
+        {"source": ..., "fps": ..., "frame_size": [w, h]}
+        {"frame": 0, "time": 0.0, "boxes": [[x, y, w, h], ...], "scores": [...]}
+
+    NPZ layout:
+        detections: (N,) DETECTION_DTYPE records of every frame, in frame order.
+        offsets: (F + 1,) start of the records of each frame in detections.
+        frames, timestamps: (F,) frame index and timestamp in seconds of each frame.
+        source, fps, frame_size: The metadata.
+
+Classes:
+- SidecarWriter: Writes the detections of consecutive frames to a sidecar file.
+
+Functions:
+- sidecar_extension(sidecar_format) -> str: Get the file extension of a sidecar format.
+- read_sidecar(path) -> tuple: Read the metadata and per-frame detections of a sidecar file.
+
+Constants:
+- SIDECAR_FORMATS: The available sidecar formats.
+- DEFAULT_SIDECAR_FORMAT: The sidecar format used when none is selected.
+- SCORE_DECIMALS: Number of decimals scores are rounded to in JSONL sidecars.
+"""
+
+import json
+
+import numpy as np
+
+from face_detection_package.detections import DETECTION_DTYPE, Detections
+
+SIDECAR_FORMATS = ('jsonl', 'npz')
+DEFAULT_SIDECAR_FORMAT = 'jsonl'
+SCORE_DECIMALS = 4
+
+
+def sidecar_extension(sidecar_format: str = DEFAULT_SIDECAR_FORMAT) -> str:
+    """
+    Get the file extension of a sidecar format.
+
+    Args:
+        sidecar_format (str): The sidecar format ('jsonl' or 'npz').
+
+    Raises:
+        ValueError: If the format is unknown.
+
+    Returns:
+        str: The extension including the leading dot.
+    """
+    if sidecar_format not in SIDECAR_FORMATS:
+        raise ValueError(f"Unknown sidecar format '{sidecar_format}'. Available formats: {', '.join(SIDECAR_FORMATS)}")
+    return f'.{sidecar_format}'
+
+
+class SidecarWriter:
+    """
+    Writes the detections of consecutive frames to a JSONL or NPZ sidecar file. JSONL lines are written as frames
+    arrive; NPZ records are kept in memory (a few bytes per face) and saved when the writer is closed.
+    """
+
+    def __init__(self, path: str, sidecar_format: str = DEFAULT_SIDECAR_FORMAT, source: str = None,
+                 fps: float = None, frame_size: tuple = None):
+        """
+        Initialize the SidecarWriter instance.
+
+        Args:
+            path (str): The sidecar file path.
+            sidecar_format (str): The sidecar format ('jsonl' or 'npz').
+            source (str): The path of the processed media.
+            fps (float): The frame rate of the processed video (None for images).
+            frame_size (tuple): The (width, height) of the processed frames.
+
+        Raises:
+            ValueError: If the format is unknown.
+
+        Returns:
+            None
+        """
+        sidecar_extension(sidecar_format)
+        self.path = path
+        self.sidecar_format = sidecar_format
+        self.metadata = {'source': source, 'fps': fps, 'frame_size': list(frame_size) if frame_size else None}
+        self.frames_written = 0
+        self._file = None
+        self._records, self._frames, self._timestamps = [], [], []
+        if sidecar_format == 'jsonl':
+            self._file = open(path, 'w', encoding='utf-8')
+            self._file.write(json.dumps(self.metadata) + '\n')
+
+    def __enter__(self) -> 'SidecarWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def write(self, frame_index: int, timestamp: float, detections: Detections) -> None:
+        """
+        Add the detections of a frame.
+
+        Args:
+            frame_index (int): The index of the frame in the video (0 for images).
+            timestamp (float): The time of the frame in seconds.
+            detections (Detections): The faces found in the frame.
+
+        Returns:
+            None
+        """
+        if self._file is not None:
+            line = {'frame': frame_index, 'time': round(timestamp, 6), 'boxes': detections.boxes.tolist()}
+            if detections.scores is not None:
+                line['scores'] = np.round(detections.scores.astype(float), SCORE_DECIMALS).tolist()
+            self._file.write(json.dumps(line, separators=(',', ':')) + '\n')
+        else:
+            self._records.append(detections.to_structured())
+            self._frames.append(frame_index)
+            self._timestamps.append(timestamp)
+        self.frames_written += 1
+
+    def close(self) -> None:
+        """
+        Finish the sidecar file.
+
+        Returns:
+            None
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        elif self.sidecar_format == 'npz' and self._records is not None:
+            counts = [len(records) for records in self._records]
+            offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            detections = np.concatenate(self._records) if self._records else np.empty(0, dtype=DETECTION_DTYPE)
+            # np.savez adds the extension when it is missing, so write through an open file to keep the exact path.
+            with open(self.path, 'wb') as file:
+                np.savez_compressed(file, detections=detections, offsets=offsets,
+                                    frames=np.asarray(self._frames, dtype=np.int64),
+                                    timestamps=np.asarray(self._timestamps, dtype=np.float64),
+                                    source=np.asarray(self.metadata['source'] or ''),
+                                    fps=np.asarray(self.metadata['fps'] or 0.0, dtype=np.float64),
+                                    frame_size=np.asarray(self.metadata['frame_size'] or (0, 0), dtype=np.int64))
+            self._records = None
+
+
+def read_sidecar(path: str) -> tuple:
+    """
+    Read the metadata and per-frame detections of a sidecar file.
+
+    Args:
+        path (str): The path of a .jsonl or .npz sidecar.
+
+    Returns:
+        tuple: The metadata dict and a list of (frame index, timestamp, Detections) tuples in frame order.
+    """
+    frames = []
+    if path.lower().endswith('.npz'):
+        with np.load(path) as data:
+            frame_size = data['frame_size'].tolist()
+            metadata = {'source': str(data['source']) or None, 'fps': float(data['fps']) or None,
+                        'frame_size': frame_size if any(frame_size) else None}
+            detections, offsets = data['detections'], data['offsets']
+            for i, (frame_index, timestamp) in enumerate(zip(data['frames'].tolist(), data['timestamps'].tolist())):
+                frames.append((frame_index, timestamp,
+                               Detections.from_structured(detections[offsets[i]:offsets[i + 1]])))
+        return metadata, frames
+
+    with open(path, encoding='utf-8') as file:
+        metadata = json.loads(file.readline())
+        for line in file:
+            record = json.loads(line)
+            frames.append((record['frame'], record['time'],
+                           Detections(record['boxes'] or None, record.get('scores'))))
+    return metadata, frames
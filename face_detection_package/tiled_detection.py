@@ -0,0 +1,273 @@
+"""
+Module: tiled_detection.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides a TiledDetector class for very large images (survey stills of 50-100 megapixels). Running a
+    detector over the whole image at once is slow for the Haar cascade, which searches every scale up to the image
+    size, and loses small faces with the face mesh, which downsamples its input. The tiled detector instead splits the
+    image into overlapping tiles and detects faces in them on a pool of threads (OpenCV and MediaPipe release the GIL
+    while they run), each using a detector acquired from a DetectorPool. Tiles are views into the image, so no copy
+    of the image is made. Faces larger than the overlap can be cut by every tile they fall on, so a downscaled
+    overview of the whole image is searched as well. The boxes are mapped back to image coordinates and merged across
+    tile seams: overlapping boxes are reduced with non-maximum suppression and boxes lying mostly inside a kept box
+    (a face cut by a seam) are dropped.
+
+    Every call records the number of tiles, the time taken and the peak memory: the peak of the memory traced by
+    tracemalloc during the detection (NumPy and OpenCV output arrays) and the peak resident set size of the process.
+
+Classes:
+- TiledDetector: Detects faces in large images tile by tile on a thread pool.
+
+Functions:
+- tile_grid(width, height, tile_size, overlap) -> list: Get the corners of overlapping tiles covering an image.
+- merge_detections(parts, iou_threshold, containment) -> Detections: Merge detections found in overlapping regions.
+- peak_rss_bytes() -> int: Get the peak resident set size of the process.
+
+Constants:
+- TILE_SIZE: Default side of a tile in pixels.
+- TILE_OVERLAP: Default overlap of neighbouring tiles in pixels.
+- MERGE_IOU: Overlap above which two boxes from different tiles are counted as the same face.
+- MERGE_CONTAINMENT: Fraction of a box inside a larger kept box above which it is counted as a cut copy of that face.
+"""
+
+import math
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from face_detection_package.box_utils import containment_matrix, non_max_suppression
+from face_detection_package.detections import Detections
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TILE_SIZE = 1024
+TILE_OVERLAP = 128
+MERGE_IOU = 0.3
+MERGE_CONTAINMENT = 0.7
+
+
+def tile_grid(width: int, height: int, tile_size: int = TILE_SIZE, overlap: int = TILE_OVERLAP) -> list:
+    """
+    Get the corners of overlapping tiles covering an image. The fewest tiles that overlap by at least the overlap are
+    spread evenly over each side, so all tiles have the same size (the cascade's results depend slightly on the size
+    of the image it searches, and small leftover tiles at the edges lose faces).
+
+    Args:
+        width (int): The image width.
+        height (int): The image height.
+        tile_size (int): The side of a tile.
+        overlap (int): The overlap of neighbouring tiles.
+
+    Raises:
+        ValueError: If the overlap is not smaller than the tile size.
+
+    Returns:
+        list: The x1, y1, x2, y2 corners of every tile, row by row.
+    """
+    if overlap >= tile_size:
+        raise ValueError(f"The tile overlap ({overlap}) must be smaller than the tile size ({tile_size}).")
+
+    def starts(length: int) -> list:
+        if length <= tile_size:
+            return [0]
+        count = math.ceil((length - overlap) / (tile_size - overlap))
+        return [round(i * (length - tile_size) / (count - 1)) for i in range(count)]
+
+    return [(x, y, min(width, x + tile_size), min(height, y + tile_size))
+            for y in starts(height) for x in starts(width)]
+
+
+def merge_detections(parts: list, iou_threshold: float = MERGE_IOU,
+                     containment: float = MERGE_CONTAINMENT) -> Detections:
+    """
+    Merge detections found in overlapping regions of an image.
+
+    Args:
+        parts (list): The Detections of every region, already in image coordinates.
+        iou_threshold (float): Boxes overlapping a better box by more than this are removed.
+        containment (float): Boxes with more than this fraction of their area inside a larger kept box are removed.
+
+    Returns:
+        Detections: The merged detections.
+    """
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return Detections()
+    boxes = np.concatenate([part.boxes for part in parts])
+    scores = np.concatenate([part.scores for part in parts]) if all(p.scores is not None for p in parts) else None
+    landmarks = None
+    if all(part.landmarks is not None for part in parts) and len({part.landmarks.shape[1:] for part in parts}) == 1:
+        landmarks = np.concatenate([part.landmarks for part in parts])
+    merged = Detections(boxes, scores, landmarks)
+    merged = merged.select(non_max_suppression(merged.boxes, merged.scores, iou_threshold))
+    # Drop boxes of faces cut by a tile edge whose whole face was found by another tile or the overview.
+    areas = merged.boxes[:, 2].astype(float) * merged.boxes[:, 3]
+    inside = containment_matrix(merged.boxes, merged.boxes) > containment
+    inside &= areas[None, :] > areas[:, None]
+    return merged.select(~inside.any(axis=1))
+
+
+def peak_rss_bytes() -> int:
+    """
+    Get the peak resident set size of the process so far.
+
+    Returns:
+        int: The peak resident set size in bytes, or None where it cannot be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _offset(detections: Detections, x: float, y: float, scale: float = 1.0) -> Detections:
+    boxes = detections.boxes.astype(float) * scale
+    boxes[:, :2] += (x, y)
+    landmarks = None if detections.landmarks is None else detections.landmarks * scale + (x, y)
+    return Detections(np.round(boxes), detections.scores, landmarks)
+
+
+class TiledDetector:
+    """
+    Detects faces in large images by running pooled detectors on overlapping tiles in parallel threads.
+    """
+    # Attributes that change the detections (part of the detection cache key, along with the wrapped detector).
+    CACHE_PARAMETERS = ('tile_size', 'overlap', 'overview')
+
+    def __init__(self, face_detector, detector_pool=None, backend: str = None, detector_options: dict = None,
+                 tile_size: int = TILE_SIZE, overlap: int = TILE_OVERLAP, workers: int = None,
+                 overview: bool = True):
+        """
+        Initialize the TiledDetector instance.
+
+        Args:
+            face_detector: The detector used for images that fit in one tile and for the overview. Also used for the
+                           tiles, one at a time, when no pool is given.
+            detector_pool (DetectorPool): The pool the tile threads acquire their detectors from.
+            backend (str): The backend of the pooled detectors.
+            detector_options (dict): The constructor options of the pooled detectors.
+            tile_size (int): The side of a tile in pixels.
+            overlap (int): The overlap of neighbouring tiles in pixels (faces up to this size are never cut by every
+                           tile they fall on).
+            workers (int): The number of tile threads (defaults to the number of cores).
+            overview (bool): Whether to also search a downscaled copy of the whole image for faces larger than the
+                             overlap.
+
+        Raises:
+            ValueError: If the overlap is not smaller than the tile size.
+
+        Returns:
+            None
+        """
+        if overlap >= tile_size:
+            raise ValueError(f"The tile overlap ({overlap}) must be smaller than the tile size ({tile_size}).")
+        self.face_detector = face_detector
+        self.detector_pool = detector_pool
+        self.backend = backend
+        self.detector_options = detector_options or {}
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.workers = max(1, workers or os.cpu_count() or 1) if detector_pool is not None else 1
+        self.overview = overview
+        self.version_name = f"{face_detector.version_name} (tiled {tile_size}px)"
+        self.last_report = None
+
+    @property
+    def settings(self):
+        return self.face_detector.settings
+
+    def reset(self, start_index: int = 0) -> None:
+        """
+        Reset the wrapped detector.
+
+        Args:
+            start_index (int): The index of the next frame that will be passed in.
+
+        Returns:
+            None
+        """
+        if hasattr(self.face_detector, 'reset'):
+            self.face_detector.reset(start_index)
+
+    def _detect_tile(self, image: np.ndarray, tile: tuple) -> Detections:
+        x1, y1, x2, y2 = tile
+        if self.detector_pool is None:
+            return _offset(self.face_detector.detect_faces(image[y1:y2, x1:x2]), x1, y1)
+        with self.detector_pool.detector(self.backend, True, **self.detector_options) as detector:
+            return _offset(detector.detect_faces(image[y1:y2, x1:x2]), x1, y1)
+
+    def _detect_overview(self, image: np.ndarray) -> Detections:
+        height, width = image.shape[:2]
+        scale = self.tile_size / max(width, height)
+        small = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+        return _offset(self.face_detector.detect_faces(small), 0, 0, 1 / scale)
+
+    def detect_faces(self, image: np.ndarray) -> Detections:
+        """
+        Detect faces in an image, tile by tile when it is larger than one tile.
+
+        Args:
+            image (np.ndarray): The input image (BGR format). It is not modified.
+
+        Returns:
+            Detections: The merged detections in image coordinates.
+        """
+        height, width = image.shape[:2]
+        if max(width, height) <= self.tile_size:
+            return self.face_detector.detect_faces(image)
+
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        tiles = tile_grid(width, height, self.tile_size, self.overlap)
+        try:
+            if self.detector_pool is None:
+                # A single detector cannot be used by several threads at once.
+                parts = [self._detect_overview(image)] if self.overview else []
+                parts += [self._detect_tile(image, tile) for tile in tiles]
+            else:
+                with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tile') as executor:
+                    futures = [executor.submit(self._detect_tile, image, tile) for tile in tiles]
+                    # The overview runs on the calling thread while the tiles are being searched.
+                    parts = [self._detect_overview(image)] if self.overview else []
+                    parts += [future.result() for future in futures]
+            detections = merge_detections(parts)
+            traced_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        self.last_report = {'tiles': len(tiles), 'workers': self.workers, 'faces': len(detections),
+                            'seconds': time.perf_counter() - start, 'image_bytes': image.nbytes,
+                            'traced_peak_bytes': traced_peak, 'peak_rss_bytes': peak_rss_bytes()}
+        return detections
+
+    def report(self) -> str:
+        """
+        Get a one line report of the last tiled detection.
+
+        Returns:
+            str: The number of tiles, faces, time taken and peak memory.
+        """
+        report = self.last_report
+        if report is None:
+            return "Tiled detection: no image was large enough to be tiled."
+        rss = report['peak_rss_bytes']
+        return (f"Tiled detection: {report['tiles']} tiles of {self.tile_size}px ({self.overlap}px overlap) on "
+                f"{report['workers']} threads, {report['faces']} faces in {report['seconds']:.2f}s | image "
+                f"{report['image_bytes'] / 2 ** 20:.1f} MiB, peak traced memory "
+                f"{report['traced_peak_bytes'] / 2 ** 20:.1f} MiB, peak process memory "
+                f"{'n/a' if rss is None else f'{rss / 2 ** 20:.1f} MiB'}")
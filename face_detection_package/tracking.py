@@ -0,0 +1,198 @@
+"""
+Module: tracking.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    This module provides a TrackingDetector class that wraps a face detector so that the full detector only runs on
+    every Nth frame of a video or feed. Between those frames the current boxes are carried forward with sparse
+    (Lucas-Kanade) optical flow of corner points inside each box. When too few of a box's points can be followed the
+    full detector runs again on that same frame, so boxes and blurs stay continuous across frames. Scheduled
+    detections reset the wrapped detector so that one searching around previous faces scans the full frame.
+
+    Full detections are scheduled on absolute frame indices (multiples of the interval) so that a stream processed in
+    aligned pieces (see segment_processing) comes out the same as one processed from the start.
+
+Classes:
+- TrackingDetector: Runs a detector every N frames and tracks its boxes in between.
+
+Functions:
+- wrap_detector(face_detector, detect_interval) -> object: Wrap a detector for tracking when the interval is above 1.
+
+Constants:
+- LK_PARAMS: Parameters of the pyramidal Lucas-Kanade optical flow.
+"""
+
+import cv2
+import numpy as np
+from face_detection_package.detections import Detections
+from face_detection_package.frame_buffers import reuse_buffer
+
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+
+class TrackingDetector:
+    """
+    Runs a face detector every N frames and carries its boxes forward with sparse optical flow in between.
+    """
+    # Attributes that change the detections (part of the detection cache key, along with the wrapped detector).
+    CACHE_PARAMETERS = ('detect_interval', 'min_track_quality', 'max_corners')
+
+    def __init__(self, face_detector, detect_interval: int = 5, min_track_quality: float = 0.5,
+                 max_corners: int = 30, start_index: int = 0):
+        """
+        Initialize the TrackingDetector instance.
+
+        Args:
+            face_detector: The detector whose detect_faces method runs the full detection.
+            detect_interval (int): The full detector runs on frames whose index is a multiple of this.
+            min_track_quality (float): The fraction of a box's points that must be followed to keep tracking it.
+            max_corners (int): The maximum number of corner points tracked inside each box.
+            start_index (int): The index of the first frame that will be passed in.
+
+        Returns:
+            None
+        """
+        self.face_detector = face_detector
+        self.detect_interval = max(1, detect_interval)
+        self.min_track_quality = min_track_quality
+        self.max_corners = max_corners
+        self.version_name = f"{face_detector.version_name} (tracked, detect every {self.detect_interval})"
+        self.detections = 0
+        self.tracked_frames = 0
+        self.start_index = start_index
+        self._spare_gray = None
+        self._mask = None
+        self.reset()
+
+    @property
+    def settings(self):
+        return self.face_detector.settings
+
+    @property
+    def counters(self) -> dict:
+        return {'tracked_frames': self.tracked_frames}
+
+    def reset(self, start_index: int = None) -> None:
+        """
+        Forget the tracked boxes so that the next frame runs the full detector.
+
+        Args:
+            start_index (int): The index of the next frame that will be passed in (defaults to the start index
+                               the tracker was created with).
+
+        Returns:
+            None
+        """
+        self.frame_index = self.start_index if start_index is None else start_index
+        self.boxes = np.empty((0, 4), dtype=int)
+        self.points = []
+        self.prev_gray = None
+
+    def release_buffers(self) -> None:
+        """
+        Drop the reused grayscale and mask buffers, along with those of the wrapped detector.
+
+        Returns:
+            None
+        """
+        self._spare_gray = None
+        self._mask = None
+        if hasattr(self.face_detector, 'release_buffers'):
+            self.face_detector.release_buffers()
+
+    def _seed_points(self, gray: np.ndarray, box) -> np.ndarray:
+        x, y, w, h = box
+        mask = self._mask = reuse_buffer(self._mask, gray.shape)
+        mask.fill(0)
+        mask[y:y + h, x:x + w] = 255
+        points = cv2.goodFeaturesToTrack(gray, maxCorners=self.max_corners, qualityLevel=0.01, minDistance=3,
+                                         mask=mask)
+        return points if points is not None else np.empty((0, 1, 2), dtype=np.float32)
+
+    def _detect(self, frame: np.ndarray, gray: np.ndarray, scheduled: bool) -> None:
+        if scheduled and hasattr(self.face_detector, 'reset'):
+            self.face_detector.reset()
+        self.boxes = self.face_detector.detect_faces(frame).boxes
+        self.points = [self._seed_points(gray, box) for box in self.boxes]
+        self.detections += 1
+
+    def _track(self, gray: np.ndarray) -> bool:
+        """
+        Move every box by the median flow of its points.
+
+        Returns:
+            bool: True if every box was tracked with enough quality, False if a full detection is needed.
+        """
+        frame_h, frame_w = gray.shape
+        boxes, points = [], []
+        for box, old_points in zip(self.boxes, self.points):
+            if len(old_points) == 0:
+                return False
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, old_points, None, **LK_PARAMS)
+            good = status.reshape(-1) == 1
+            if good.mean() < self.min_track_quality:
+                return False
+            old_good = old_points[good].reshape(-1, 2)
+            new_good = new_points[good].reshape(-1, 2)
+
+            x, y, w, h = box
+            dx, dy = np.median(new_good - old_good, axis=0)
+            scale = 1.0
+            if len(old_good) >= 2:
+                old_spread = np.median(np.linalg.norm(old_good - np.median(old_good, axis=0), axis=1))
+                new_spread = np.median(np.linalg.norm(new_good - np.median(new_good, axis=0), axis=1))
+                if old_spread > 0:
+                    scale = float(np.clip(new_spread / old_spread, 0.8, 1.25))
+            cx, cy = x + w / 2 + dx, y + h / 2 + dy
+            w, h = w * scale, h * scale
+            x1, y1 = max(0, int(round(cx - w / 2))), max(0, int(round(cy - h / 2)))
+            x2, y2 = min(frame_w, int(round(cx + w / 2))), min(frame_h, int(round(cy + h / 2)))
+            if x2 <= x1 or y2 <= y1:
+                return False
+            boxes.append([x1, y1, x2 - x1, y2 - y1])
+            points.append(new_good.reshape(-1, 1, 2))
+
+        self.boxes = np.array(boxes, dtype=int).reshape(-1, 4)
+        # Re-seed boxes that have lost half of their points so tracking does not thin out.
+        self.points = [p if len(p) >= self.max_corners // 2 else self._seed_points(gray, b)
+                       for p, b in zip(points, self.boxes)]
+        return True
+
+    def detect_faces(self, frame: np.ndarray) -> Detections:
+        """
+        Detect faces in a frame, running the full detector on scheduled frames or when tracking fails.
+
+        Args:
+            frame (np.ndarray): The input frame (BGR format). It is not modified.
+
+        Returns:
+            Detections: The detected or tracked face boxes.
+        """
+        # Two grayscale buffers take turns: the previous frame's is still needed for the optical flow.
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._spare_gray)
+        scheduled = self.prev_gray is None or self.frame_index % self.detect_interval == 0
+        if scheduled or not self._track(gray):
+            self._detect(frame, gray, scheduled)
+        else:
+            self.tracked_frames += 1
+        self._spare_gray, self.prev_gray = self.prev_gray, gray
+        self.frame_index += 1
+        return Detections(self.boxes)
+
+
+def wrap_detector(face_detector, detect_interval: int = 1, start_index: int = 0):
+    """
+    Wrap a detector in a TrackingDetector when it should not run on every frame.
+
+    Args:
+        face_detector: The detector to wrap.
+        detect_interval (int): Run the full detector every this many frames (1 runs it on every frame).
+        start_index (int): The index of the first frame that will be passed in.
+
+    Returns:
+        The TrackingDetector, or the detector itself when detect_interval is 1 or less.
+    """
+    if detect_interval and detect_interval > 1:
+        return TrackingDetector(face_detector, detect_interval, start_index=start_index)
+    return face_detector
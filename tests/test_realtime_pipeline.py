@@ -0,0 +1,103 @@
+"""
+Module: test_realtime_pipeline.py
+Author: Jacob Pitsenberger
+Date: 10/17/26
+
+Description:
+    Regression tests for the RealtimePipeline stages. A fake capture and a detector that raises part way through the
+    feed check that a stage ending early never leaves the other stages (and run()) waiting on a full queue.
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_detection_package.detections import Detections
+from face_detection_package.headless_settings import HeadlessSettings
+from face_detection_package.realtime_pipeline import RealtimePipeline
+
+# Seconds run() may take before the pipeline is considered hung.
+RUN_TIMEOUT = 10.0
+
+
+class FakeCapture:
+    """A capture that returns the same small frame forever."""
+
+    def read(self, image=None):
+        if image is None:
+            image = np.zeros((48, 64, 3), dtype=np.uint8)
+        return True, image
+
+    def release(self):
+        pass
+
+
+class RaisingDetector:
+    """A detector that finds no faces and raises on a given call."""
+
+    def __init__(self, fail_on: int):
+        self.settings = HeadlessSettings()
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def detect_faces(self, frame):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise RuntimeError('boom')
+        return Detections()
+
+
+class RecordingWriter:
+    """A writer that keeps count of the frames written to it."""
+
+    def __init__(self, fail_on: int = None):
+        self.fail_on = fail_on
+        self.written = 0
+
+    def write(self, frame):
+        self.written += 1
+        if self.written == self.fail_on:
+            raise RuntimeError('disk full')
+
+
+class RealtimePipelineTest(unittest.TestCase):
+
+    def _run(self, pipeline: RealtimePipeline) -> dict:
+        result = {}
+        with mock.patch('cv2.imshow'), mock.patch('cv2.waitKey', return_value=-1), \
+                mock.patch('builtins.print'):
+            thread = threading.Thread(target=lambda: result.update(stats=pipeline.run()), daemon=True)
+            thread.start()
+            thread.join(RUN_TIMEOUT)
+        self.assertFalse(thread.is_alive(), 'run() did not return after a stage failed')
+        self.assertFalse(any(stage.is_alive() for stage in pipeline._threads))
+        return result['stats']
+
+    def test_detector_error_ends_the_feed(self):
+        detector = RaisingDetector(fail_on=3)
+        writer = RecordingWriter()
+        pipeline = RealtimePipeline(FakeCapture(), detector, writer, queue_size=2)
+        self._run(pipeline)
+        self.assertEqual(detector.calls, 3)
+        # The two frames detected before the error are recorded.
+        self.assertGreaterEqual(writer.written, 2)
+
+    def test_detector_error_in_latest_frame_mode_ends_the_feed(self):
+        pipeline = RealtimePipeline(FakeCapture(), RaisingDetector(fail_on=3), RecordingWriter(), queue_size=2,
+                                    latest_frame_only=True)
+        self._run(pipeline)
+
+    def test_writer_error_ends_the_feed(self):
+        pipeline = RealtimePipeline(FakeCapture(), RaisingDetector(fail_on=0), RecordingWriter(fail_on=2),
+                                    queue_size=2)
+        self._run(pipeline)
+
+
+if __name__ == '__main__':
+    unittest.main()